@@ -0,0 +1,29 @@
+# Generated by Django 6.1.2 on 2026-10-17 22:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("db", "0002_alter_card_set_alter_screenshot_set"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="screenshot",
+            name="content_hash",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="screenshot",
+            name="template_version",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="screenshot",
+            index=models.Index(
+                fields=["content_hash"], name="idx_screenshots_content_hash"
+            ),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from datetime import datetime
 import logging
+import threading
 
 from django.db import models
 
@@ -112,6 +113,10 @@ class Screenshot(models.Model):
     )
     name = models.TextField(unique=True, null=True, blank=True)
     processed = models.BooleanField(default=False)
+    # Hash of the file contents and the template pack it was recognized
+    # against; together they let unchanged files skip recognition
+    content_hash = models.CharField(max_length=64, null=True, blank=True)
+    template_version = models.CharField(max_length=64, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def cards(self):
@@ -124,6 +129,7 @@ class Screenshot(models.Model):
             models.Index(fields=["account"], name="idx_screenshots_account"),
             models.Index(fields=["timestamp"], name="idx_screenshots_timestamp"),
             models.Index(fields=["processed"], name="idx_screenshots_processed"),
+            models.Index(fields=["content_hash"], name="idx_screenshots_content_hash"),
         ]
 
     def __str__(self):
@@ -180,6 +186,82 @@ class Card(models.Model):
         return f"Card {self.pk} - {self.name} ({self.set})"
 
 
+class CardIdentityCache:
+    """
+    Process-wide (code, set) -> (card id, rarity) map used when storing results
+
+    There are only a few thousand distinct cards, so the whole table is read
+    once per processing job with preload() and kept current as cards are
+    inserted or upgraded through ensure().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cards = {}
+
+    def preload(self):
+        """Replace the map with the current contents of the cards table"""
+        cards = {
+            (code, card_set): (pk, rarity)
+            for pk, code, card_set, rarity in Card.objects.values_list(
+                "pk", "code", "set", "rarity"
+            )
+        }
+        with self._lock:
+            self._cards = cards
+
+    def ensure(self, wanted: dict) -> dict:
+        """
+        Return card ids for the wanted cards, inserting any that don't exist
+
+        Args:
+            wanted: {(code, set): {"name", "image_path", "rarity"}} for the new
+                card's fields. A known card still at the default "1D" rarity
+                is upgraded to a more specific wanted rarity.
+
+        Returns:
+            dict: {(code, set): card id}
+        """
+        with self._lock:
+            missing = [key for key in wanted if key not in self._cards]
+            if missing:
+                # Cards inserted since preload(), e.g. by another job
+                self._load(missing)
+
+            new_cards = [
+                Card(code=code, set=card_set, **wanted[(code, card_set)])
+                for code, card_set in missing
+                if (code, card_set) not in self._cards
+            ]
+            if new_cards:
+                # Another writer may insert the same card first; those rows
+                # are skipped here and picked up by the reload below.
+                Card.objects.bulk_create(new_cards, ignore_conflicts=True)
+                self._load([(card.code, card.set) for card in new_cards])
+
+            upgrades = {}
+            for key, fields in wanted.items():
+                pk, rarity = self._cards[key]
+                if rarity == "1D" and fields["rarity"] != "1D":
+                    upgrades.setdefault(fields["rarity"], []).append(pk)
+                    self._cards[key] = (pk, fields["rarity"])
+            for rarity, pks in upgrades.items():
+                Card.objects.filter(pk__in=pks).update(rarity=rarity)
+
+            return {key: self._cards[key][0] for key in wanted}
+
+    def _load(self, keys: list):
+        for pk, code, card_set, rarity in Card.objects.filter(
+            code__in={code for code, _ in keys},
+            set__in={card_set for _, card_set in keys},
+        ).values_list("pk", "code", "set", "rarity"):
+            self._cards[(code, card_set)] = (pk, rarity)
+
+
+# Shared by every ScreenshotProcessingWorker in the process
+card_identities = CardIdentityCache()
+
+
 class ScreenshotCard(models.Model):
     screenshot = models.ForeignKey(
         Screenshot, on_delete=models.CASCADE, db_column="screenshot_id"
@@ -15,6 +15,7 @@ from PyQt6.QtWidgets import (
     QLineEdit,
     QComboBox,
     QCheckBox,
+    QDoubleSpinBox,
     QProgressBar,
     QTextEdit,
     QFormLayout,
@@ -359,6 +360,96 @@ class ScreenshotProcessingDialog(QDialog):
             self.process_btn.setEnabled(True)
 
 
+class RematchScreenshotsDialog(QDialog):
+    """Dialog for choosing which screenshots to re-match after a template update"""
+
+    rematch_started = pyqtSignal(
+        dict
+    )  # Signal emitted with the selection (sets, max_confidence, missing_cards)
+
+    def __init__(self, parent=None, default_confidence: float = 0.5):
+        super().__init__(parent)
+        self.setWindowTitle(self.tr("Re-match Screenshots"))
+        self.setMinimumWidth(420)
+        self._default_confidence = default_confidence
+        self._setup_ui()
+
+    def _setup_ui(self):
+        """Set up the user interface"""
+        from app.db.models import CardSet
+
+        main_layout = QVBoxLayout()
+
+        description = QLabel(
+            self.tr(
+                "Re-runs recognition only for screenshots that were matched against "
+                "older card art and have a low-confidence card or a card slot with "
+                "no match (either condition is enough). Choosing a set limits "
+                "this to that set's screenshots; with neither condition checked, "
+                "all of its screenshots are re-matched."
+            )
+        )
+        description.setWordWrap(True)
+        main_layout.addWidget(description)
+
+        options_layout = QFormLayout()
+
+        self.set_combo = QComboBox()
+        self.set_combo.addItem(self.tr("Any set"), None)
+        for value, label in CardSet.choices:
+            self.set_combo.addItem(f"{label} ({value})", value)
+        options_layout.addRow(self.tr("Screenshots of set:"), self.set_combo)
+
+        confidence_layout = QHBoxLayout()
+        self.confidence_check = QCheckBox(self.tr("A card matched below"))
+        self.confidence_check.setChecked(True)
+        self.confidence_spin = QDoubleSpinBox()
+        self.confidence_spin.setRange(0.0, 1.0)
+        self.confidence_spin.setSingleStep(0.05)
+        self.confidence_spin.setDecimals(2)
+        self.confidence_spin.setValue(self._default_confidence)
+        self.confidence_check.toggled.connect(self.confidence_spin.setEnabled)
+        confidence_layout.addWidget(self.confidence_check)
+        confidence_layout.addWidget(self.confidence_spin)
+        confidence_layout.addStretch()
+        options_layout.addRow(self.tr("Confidence:"), confidence_layout)
+
+        self.missing_check = QCheckBox(self.tr("Card slots with no match"))
+        self.missing_check.setChecked(True)
+        options_layout.addRow(self.tr("Empty slots:"), self.missing_check)
+
+        main_layout.addLayout(options_layout)
+
+        button_box = QDialogButtonBox()
+        start_btn = button_box.addButton(
+            self.tr("Re-match"), QDialogButtonBox.ButtonRole.AcceptRole
+        )
+        cancel_btn = button_box.addButton(
+            self.tr("Cancel"), QDialogButtonBox.ButtonRole.RejectRole
+        )
+        start_btn.clicked.connect(self._start_rematch)
+        cancel_btn.clicked.connect(self.reject)
+        main_layout.addWidget(button_box)
+
+        self.setLayout(main_layout)
+
+    def _start_rematch(self):
+        """Emit the selection and close"""
+        set_code = self.set_combo.currentData()
+        self.rematch_started.emit(
+            {
+                "sets": [set_code] if set_code else None,
+                "max_confidence": (
+                    self.confidence_spin.value()
+                    if self.confidence_check.isChecked()
+                    else None
+                ),
+                "missing_cards": self.missing_check.isChecked(),
+            }
+        )
+        self.accept()
+
+
 class PreferencesDialog(QDialog):
     """Dialog for managing application preferences"""
 
@@ -417,6 +508,42 @@ class PreferencesDialog(QDialog):
             "Debug/max_cores": self.tr(
                 "Override the maximum number of cores used for processing. Set to 0 to use system default."
             ),
+            "Debug/recognition_backend": self.tr(
+                "Run card recognition in threads or in separate processes. Processes use more memory at startup but scale better on many-core systems."
+            ),
+            "Debug/match_strategy": self.tr(
+                "How card slots are compared with card art. Cascade narrows the candidates with a quick low-resolution pass before the full comparison."
+            ),
+            "Debug/cascade_top_k": self.tr(
+                "Cascade only: number of closest cards by image hash that are compared at low resolution."
+            ),
+            "Debug/cascade_shortlist": self.tr(
+                "Cascade only: maximum number of cards compared at full resolution."
+            ),
+            "Debug/cascade_margin": self.tr(
+                "Cascade only: cards scoring more than this below the best low-resolution score are not compared at full resolution."
+            ),
+            "Debug/template_precision": self.tr(
+                "Precision of the card art kept in memory for matching. Float16 and Int8 use a half or a quarter of the memory; the best candidates are still compared at full precision."
+            ),
+            "Debug/projection_dims": self.tr(
+                "Compare cards in a compressed space with this many dimensions, learned from your card art. Set to 0 to compare full images."
+            ),
+            "Debug/projection_margin": self.tr(
+                "When the two best cards in the compressed space are closer than this, they are compared again using full images."
+            ),
+            "Debug/slot_embeddings": self.tr(
+                "Keep a compact fingerprint of every recognized card slot in the data folder, so results can be re-checked later without reading the screenshots again."
+            ),
+            "Debug/screenshot_decoder": self.tr(
+                "Library used to read screenshot files. OpenCV is usually faster; Pillow is the long-standing default."
+            ),
+            "Debug/set_lock": self.tr(
+                "Match the clearest card of each screenshot first and look for the other cards in its set only, since a pack holds cards of one set."
+            ),
+            "Debug/pack_priors": self.tr(
+                "Compare each card slot first with the sets and rarities your recorded packs show at that slot, and only with the rest when the match is uncertain."
+            ),
         }
 
         keys = self._settings.settings.allKeys()
@@ -480,6 +607,18 @@ class PreferencesDialog(QDialog):
                     "watch_directory": self.tr("Watch Directory"),
                     "check_interval": self.tr("Check Interval (min)"),
                     "max_cores": self.tr("Max Cores"),
+                    "recognition_backend": self.tr("Recognition Backend"),
+                    "match_strategy": self.tr("Match Strategy"),
+                    "cascade_top_k": self.tr("Cascade Candidates"),
+                    "cascade_shortlist": self.tr("Cascade Shortlist"),
+                    "cascade_margin": self.tr("Cascade Margin"),
+                    "template_precision": self.tr("Template Precision"),
+                    "projection_dims": self.tr("Projection Dimensions"),
+                    "projection_margin": self.tr("Projection Margin"),
+                    "slot_embeddings": self.tr("Keep Slot Embeddings"),
+                    "screenshot_decoder": self.tr("Screenshot Decoder"),
+                    "pack_priors": self.tr("Use Pack Structure"),
+                    "set_lock": self.tr("Lock Screenshot Set"),
                 }
                 display_name = setting_name_translations.get(setting_name, setting_name)
                 label = QLabel(display_name)
@@ -516,6 +655,51 @@ class PreferencesDialog(QDialog):
                     for code, name in languages.items():
                         combo.addItem(name, code)
 
+                    index = combo.findData(str(value))
+                    if index >= 0:
+                        combo.setCurrentIndex(index)
+
+                    row_layout.addWidget(combo)
+                    input_widget = combo
+                elif key == "Debug/recognition_backend":
+                    combo = QComboBox()
+                    combo.addItem(self.tr("Threads"), "threads")
+                    combo.addItem(self.tr("Processes"), "processes")
+
+                    index = combo.findData(str(value))
+                    if index >= 0:
+                        combo.setCurrentIndex(index)
+
+                    row_layout.addWidget(combo)
+                    input_widget = combo
+                elif key == "Debug/match_strategy":
+                    combo = QComboBox()
+                    combo.addItem(self.tr("Best Sets"), "sets")
+                    combo.addItem(self.tr("Cascade"), "cascade")
+
+                    index = combo.findData(str(value))
+                    if index >= 0:
+                        combo.setCurrentIndex(index)
+
+                    row_layout.addWidget(combo)
+                    input_widget = combo
+                elif key == "Debug/screenshot_decoder":
+                    combo = QComboBox()
+                    combo.addItem(self.tr("Pillow"), "pil")
+                    combo.addItem(self.tr("OpenCV"), "opencv")
+
+                    index = combo.findData(str(value))
+                    if index >= 0:
+                        combo.setCurrentIndex(index)
+
+                    row_layout.addWidget(combo)
+                    input_widget = combo
+                elif key == "Debug/template_precision":
+                    combo = QComboBox()
+                    combo.addItem(self.tr("Float32"), "float32")
+                    combo.addItem(self.tr("Float16"), "float16")
+                    combo.addItem(self.tr("Int8"), "int8")
+
                     index = combo.findData(str(value))
                     if index >= 0:
                         combo.setCurrentIndex(index)
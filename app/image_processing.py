@@ -7,16 +7,345 @@ This module provides card identification from screenshots using OpenCV.
 
 import cv2
 import numpy as np
+import io
 import os
+import re
+import sys
 import json
+import time
+import hashlib
+import functools
+import itertools
 import imagehash
-from typing import List, Dict, Any, Tuple
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Dict, Any, Tuple, Iterable, Iterator
 from PIL import Image
 import logging
 import threading
 
 logger = logging.getLogger(__name__)
 
+CARD_IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+# Precompiled templates live in <card_imgs>/.template_pack: one shard per set
+# under sets/<set>/, and the combined pack the processor maps, assembled from
+# the shards. Bump the version whenever the stored vectors or hashes are
+# computed differently.
+TEMPLATE_PACK_DIR = ".template_pack"
+TEMPLATE_PACK_VERSION = 1
+
+# Detailed-search strategy. "sets" correlates every card of the best few sets
+# by pHash; "cascade" takes the top_k cards by pHash, narrows them to a
+# shortlist at low resolution and only correlates the shortlist at full
+# resolution. Cards scoring more than margin below the best low-resolution
+# score are dropped from the shortlist.
+DEFAULT_MATCH_OPTIONS = {
+    "strategy": "sets",
+    "top_k": 64,
+    "shortlist": 8,
+    "margin": 0.1,
+    "precision": "float32",
+    "projection_dims": 0,
+    "projection_margin": 0.05,
+    "slot_embeddings": False,
+    "decoder": "pil",
+    "pack_priors": False,
+    "set_lock": True,
+}
+
+# With "float16" or "int8" precision the "sets" strategy scans a quantized
+# copy of the template matrix (int8 with a scale per row) and re-scores only
+# its best RESCORE_CANDIDATES cards per set against the float32 vectors.
+RESCORE_CANDIDATES = 3
+
+# With projection_dims > 0 the "sets" strategy compares cards in a PCA space
+# fitted over the template library and stored next to the template pack.
+# The full-resolution vectors only break ties: when the top two projected
+# scores are within projection_margin, the best RESCORE_CANDIDATES are
+# re-scored at full resolution, otherwise only the winner is (for an exact
+# confidence).
+
+# The cascade's low-resolution stage averages 4x4 blocks of the 92x128
+# matching resolution, i.e. compares cards at 23x32.
+LOW_RES_FACTOR = 4
+
+# With slot_embeddings enabled every recognized card also carries its slot's
+# pHash and its low-resolution region vector (int8 with a scale), for storage
+# in a SlotEmbeddingStore. match_slot_embeddings() re-scores them.
+
+# Screenshots are decoded with PIL ("pil") or with cv2.imdecode ("opencv"),
+# which skips PIL's intermediate image and swaps to RGB in place.
+SCREENSHOT_DECODERS = ("pil", "opencv")
+
+# With pack_priors enabled and a PackPriors set on the processor, the "sets"
+# strategy (float32, without projection) first compares a slot only with the
+# cards of the sets and rarities seen at its position in recorded packs. The
+# slot is compared with all of its candidate sets when that match scores
+# below PRIOR_MIN_CONFIDENCE or within PRIOR_MIN_MARGIN of the runner-up.
+# A set or rarity counts as seen at a position from PRIOR_MIN_SHARE of its
+# slots on; positions with fewer than PRIOR_MIN_SLOTS recorded slots have no
+# prior.
+PRIOR_MIN_CONFIDENCE = 0.7
+PRIOR_MIN_MARGIN = 0.1
+PRIOR_MIN_SHARE = 0.01
+PRIOR_MIN_SLOTS = 50
+
+# With set_lock enabled, each screenshot's slot with the clearest pHash set
+# lead is matched first. When it scores at least SET_LOCK_CONFIDENCE, the
+# screenshot's other slots search only its set, plus the promo sets (set
+# codes starting with PROMO_SET_PREFIX) among their candidates. A locked
+# slot scoring below SET_LOCK_MIN_CONFIDENCE is searched again across its
+# usual candidates.
+SET_LOCK_CONFIDENCE = 0.8
+SET_LOCK_MIN_CONFIDENCE = 0.75
+PROMO_SET_PREFIX = "P-"
+
+RARITY_PATTERN = re.compile(r"\(([^)]+)\)")
+
+# Cards are kept in this rarity order within each set, so the cards of
+# neighbouring rarities are one contiguous block of template rows
+RARITY_ORDER = ("1D", "2D", "3D", "4D", "1S", "2S", "3S", "CR")
+
+
+def rarity_rank(card_name: str, set_name: str) -> int:
+    """Position of a card's rarity in RARITY_ORDER, from the names.py mapping"""
+    try:
+        from app import names
+    except ImportError:
+        return 0
+
+    display_name = names.cards.get(card_name) or names.cards.get(
+        f"{set_name}_{card_name}", ""
+    )
+    match = RARITY_PATTERN.search(display_name)
+    rarity = match.group(1) if match else "1D"
+    return RARITY_ORDER.index(rarity) if rarity in RARITY_ORDER else len(RARITY_ORDER)
+
+
+def get_peak_memory_mb() -> float:
+    """Peak resident memory of this process in MB, or None if unavailable"""
+    try:
+        if os.name == "nt":
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            ctypes.windll.psapi.GetProcessMemoryInfo(
+                ctypes.windll.kernel32.GetCurrentProcess(),
+                ctypes.byref(counters),
+                counters.cb,
+            )
+            return counters.PeakWorkingSetSize / (1024 * 1024)
+
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except Exception:
+        return None
+
+
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def pack_phash_bits(bits: np.ndarray) -> np.ndarray:
+    """Pack (N, 64) boolean pHash rows (imagehash bit order) into uint64 values"""
+    bits = np.asarray(bits, dtype=bool).reshape(-1, 64)
+    return np.packbits(bits, axis=1).view(">u8").ravel().astype(np.uint64)
+
+
+# Rows 0-7 of the unnormalized DCT-II basis for 32 samples, the scaling used
+# by scipy.fftpack.dct: X[k] = 2 * sum(x[n] * cos(pi * k * (2n + 1) / 64))
+_PHASH_DCT = 2.0 * np.cos(
+    np.pi * np.arange(8)[:, np.newaxis] * (2 * np.arange(32) + 1) / 64
+)
+
+
+def phash_batch(images: List[np.ndarray]) -> np.ndarray:
+    """
+    imagehash.phash of many images at once, as packed uint64 values
+
+    Bit-compatible with imagehash (and so with phashes.json): the grayscale
+    conversion and 32x32 Lanczos resize are still done by PIL, whose
+    fixed-point arithmetic cv2 does not reproduce. Only the low-frequency DCT
+    block, the median and the bit packing run batched in numpy. A hash with a
+    coefficient on its median, where float rounding could flip the bit, is
+    recomputed with imagehash itself.
+    """
+    if not len(images):
+        return np.empty(0, dtype=np.uint64)
+
+    pixels = np.empty((len(images), 32, 32), dtype=np.float64)
+    for i, image in enumerate(images):
+        gray = Image.fromarray(image).convert("L")
+        pixels[i] = np.asarray(gray.resize((32, 32), Image.Resampling.LANCZOS))
+
+    low_freq = (_PHASH_DCT @ pixels @ _PHASH_DCT.T).reshape(len(images), 64)
+    median = np.median(low_freq, axis=1, keepdims=True)
+    hashes = pack_phash_bits(low_freq > median)
+
+    gap = np.abs(low_freq - median).min(axis=1)
+    for i in np.flatnonzero(gap <= 1e-9 * np.abs(low_freq).max(axis=1)):
+        hashes[i] = int(str(imagehash.phash(Image.fromarray(images[i]))), 16)
+    return hashes
+
+
+def popcount64(values: np.ndarray) -> np.ndarray:
+    """Number of set bits in each uint64 value"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    # numpy < 2.0: count per byte with a lookup table
+    counts = _POPCOUNT_TABLE[np.ascontiguousarray(values).view(np.uint8)]
+    return counts.reshape(*values.shape, 8).sum(axis=-1, dtype=np.uint8)
+
+
+@functools.lru_cache(maxsize=32)
+def screenshot_layout(width: int, height: int) -> Dict[str, Any]:
+    """
+    Slot geometry for screenshots of one resolution, computed once per size
+
+    The S4T layout is designed at 240x227 and scaled to the screenshot. A
+    row holds 2 or 3 cards, told apart by probing a strip at its left edge:
+    the strip shows background when the row is centred with 2 cards.
+
+    Returns:
+        Dict with the scaled "top_probe" and "bottom_probe" strips (None when
+        outside the screenshot), the (x, y, width, height) slot boxes of each
+        row by card count ("top" and "bottom": {2: ..., 3: ...}), and
+        "empty_probes": the centre box (x0, y0, x1, y1) of each slot box that
+        _is_empty_card_region looks at. Shared between callers; don't modify.
+    """
+    # Base resolution that the original coordinates were designed for (240x227)
+    base_w, base_h = 240, 227
+
+    # Calculate scaling factors
+    scale_x = width / base_w
+    scale_y = height / base_h
+
+    def scale_pos(pos):
+        x, y, w, h = pos
+        return (
+            int(round(x * scale_x)),
+            int(round(y * scale_y)),
+            int(round(w * scale_x)),
+            int(round(h * scale_y)),
+        )
+
+    def probe(pos):
+        x, y, w, h = scale_pos(pos)
+        return (x, y, w, h) if y + h <= height and x + w <= width else None
+
+    top = {
+        2: (
+            (39, 5, 75, 106),  # position 1
+            (124, 5, 75, 106),  # position 2
+        ),
+        3: (
+            (0, 5, 75, 106),  # position 1
+            (81, 5, 75, 106),  # position 2
+            (164, 5, 75, 106),  # position 3
+        ),
+    }
+    bottom = {
+        2: (
+            (39, 121, 75, 106),  # position 4
+            (124, 121, 75, 106),  # position 5
+        ),
+        3: (
+            (0, 121, 75, 106),  # position 4
+            (81, 121, 75, 106),  # position 5
+            (164, 121, 75, 106),  # position 6
+        ),
+    }
+    layout = {
+        "top_probe": probe((0, 8, 30, 50)),
+        "bottom_probe": probe((0, 124, 30, 50)),
+        "top": {n: tuple(map(scale_pos, row)) for n, row in top.items()},
+        "bottom": {n: tuple(map(scale_pos, row)) for n, row in bottom.items()},
+        "empty_probes": {},
+    }
+
+    # A 20x20 box at the centre of each slot, as far as it is on screen
+    half = 10
+    for row in (*layout["top"].values(), *layout["bottom"].values()):
+        for x, y, w, h in row:
+            slot_w = max(min(x + w, width) - x, 0)
+            slot_h = max(min(y + h, height) - y, 0)
+            center_x = x + slot_w // 2
+            center_y = y + slot_h // 2
+            x0 = max(center_x - half, x)
+            y0 = max(center_y - half, y)
+            x1 = min(center_x + half, x + slot_w)
+            y1 = min(center_y + half, y + slot_h)
+            layout["empty_probes"][(x, y, w, h)] = (
+                (x0, y0, x1, y1) if x1 > x0 and y1 > y0 else None
+            )
+    return layout
+
+
+class PackPriors:
+    """
+    Sets and rarities that recorded packs show at each slot position
+
+    Built from (position, set, rarity, count) rows, e.g. the recognized cards
+    in the database grouped by those fields.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[int, str, str, int]]):
+        totals = {}
+        set_counts = {}
+        rarity_counts = {}
+        for position, set_name, rarity, count in rows:
+            totals[position] = totals.get(position, 0) + count
+            key = (position, set_name)
+            set_counts[key] = set_counts.get(key, 0) + count
+            key = (position, rarity or "1D")
+            rarity_counts[key] = rarity_counts.get(key, 0) + count
+
+        self.sets = {}
+        self.rarities = {}
+        for position, total in totals.items():
+            if total < PRIOR_MIN_SLOTS:
+                continue
+            minimum = total * PRIOR_MIN_SHARE
+            self.sets[position] = frozenset(
+                s for (p, s), n in set_counts.items() if p == position and n >= minimum
+            )
+            self.rarities[position] = frozenset(
+                r
+                for (p, r), n in rarity_counts.items()
+                if p == position and n >= minimum
+            )
+
+    def __bool__(self):
+        return bool(self.sets)
+
+    def __repr__(self):
+        return "PackPriors({})".format(
+            ", ".join(
+                f"{position}: {sorted(self.rarities[position])}"
+                for position in sorted(self.rarities)
+            )
+        )
+
 
 class ImageProcessor:
     """
@@ -26,104 +355,348 @@ class ImageProcessor:
     """
 
     _init_lock = threading.Lock()
-    _phashes_lock = threading.Lock()
+    _pack_lock = threading.Lock()
 
-    def __init__(self, card_imgs_dir: str = "card_imgs"):
-        """Initialize the image processor"""
+    def __init__(
+        self,
+        card_imgs_dir: str = "card_imgs",
+        index: Dict[str, Any] = None,
+        match_options: Dict[str, Any] = None,
+    ):
+        """
+        Initialize the image processor
+
+        Args:
+            card_imgs_dir: Directory containing one sub-directory of card art per set
+            index: Prebuilt template index (see _build_index). When given, the card
+                art is not decoded; used by recognition worker processes.
+            match_options: Overrides for DEFAULT_MATCH_OPTIONS
+        """
         self.card_imgs_dir = card_imgs_dir
+        self.match_options = {**DEFAULT_MATCH_OPTIONS, **(match_options or {})}
+        # Serializes template (re)loads only. Recognition never takes this lock;
+        # it reads from the immutable template index swapped in by
+        # _rebuild_vectorized_data.
         self._lock = threading.RLock()
+        self.match_width, self.match_height = 92, 128
+
+        # Fingerprint of the template pack currently loaded
+        self.template_version = None
+        # Low-resolution templates for match_slot_embeddings, built on first use
+        self._low_res_cache = None
+        # PackPriors used when the pack_priors option is on; set by the caller
+        self.pack_priors = None
+        # Card slots matched and templates compared with them in the detailed
+        # search, since the processor was created
+        self._stats_lock = threading.Lock()
+        self.search_stats = {"slots": 0, "templates": 0}
+
+        if index is not None:
+            self.card_names = self._load_card_names()
+            self._index = index
+            return
 
         with ImageProcessor._init_lock:
-            self.card_database = self._load_card_database()
             self.card_names = self._load_card_names()
 
-            # Pre-calculated templates for performance
-            self.color_templates = {}
-            self.phash_templates = {}
-
-            # Vectorized data structures for performance
-            self.phash_matrix = None
-            self.phash_metadata = []
-            self.template_vectors = (
-                {}
-            )  # {set_name: {'matrix': np.array, 'metadata': list}}
-            self.match_width, self.match_height = 92, 128
+            # Vectorized data structures for performance. Replaced as a whole
+            # on reload so concurrent readers always see a consistent set.
+            self._index = self._build_index(None, [], None)
+
+            self._prepare_templates()
+
+    @staticmethod
+    def _build_index(
+        phashes: np.ndarray,
+        phash_metadata: list,
+        vectors: np.ndarray,
+        low_res_vectors: np.ndarray = None,
+        quantized_vectors: np.ndarray = None,
+        quantized_scales: np.ndarray = None,
+        projection: np.ndarray = None,
+        embeddings: np.ndarray = None,
+    ) -> Dict[str, Any]:
+        """
+        Bundle the vectorized template data into a read-only index
 
-            if self.card_database:
-                self._prepare_templates()
+        phash_metadata must be grouped by set. The set boundaries are recorded
+        as offsets so per-set reductions run as a single numpy call, and as
+        (start, stop) ranges so a forced set is a plain slice of the templates.
+        The per-set template matrices are views of those rows of vectors.
+        """
+        set_names = []
+        set_offsets = []
+        for row, (set_name, _) in enumerate(phash_metadata):
+            if not set_names or set_names[-1] != set_name:
+                set_names.append(set_name)
+                set_offsets.append(row)
+        set_ranges = {
+            set_name: (start, stop)
+            for set_name, start, stop in zip(
+                set_names, set_offsets, set_offsets[1:] + [len(phash_metadata)]
+            )
+        }
+
+        template_vectors = {}
+        if vectors is not None:
+            for set_name, (start, stop) in set_ranges.items():
+                template_vectors[set_name] = {
+                    "matrix": vectors[start:stop],
+                    "metadata": tuple(card for _, card in phash_metadata[start:stop]),
+                }
 
-    def _load_phashes(self) -> bool:
+        for array in (
+            phashes,
+            vectors,
+            low_res_vectors,
+            quantized_vectors,
+            quantized_scales,
+            projection,
+            embeddings,
+        ):
+            if array is not None:
+                array.setflags(write=False)
+        for data in template_vectors.values():
+            data["matrix"].setflags(write=False)
+        return {
+            "phashes": phashes,
+            "phash_metadata": tuple(phash_metadata),
+            "vectors": vectors,
+            "low_res_vectors": low_res_vectors,
+            "quantized_vectors": quantized_vectors,
+            "quantized_scales": quantized_scales,
+            "projection": projection,
+            "embeddings": embeddings,
+            "set_names": tuple(set_names),
+            "set_offsets": np.array(set_offsets, dtype=np.intp),
+            "set_ranges": set_ranges,
+            # Template masks per exclusion list, filled on first use. 5/6-card
+            # packs always exclude A4b, so that mask is built up front.
+            "exclusion_masks": {
+                frozenset(["A4b"]): ImageProcessor._exclusion_mask(
+                    set_ranges, len(phash_metadata), ["A4b"]
+                )
+            },
+            "template_vectors": template_vectors,
+            # (start, stop) row runs of each set's cards of given rarities,
+            # filled on first use by _rarity_runs
+            "rarity_runs": {},
+        }
+
+    @staticmethod
+    def _exclusion_mask(set_ranges: dict, count: int, exclude_sets) -> np.ndarray:
+        """Boolean mask of the templates that are not in any of exclude_sets"""
+        mask = np.ones(count, dtype=bool)
+        for set_name in exclude_sets:
+            if set_name in set_ranges:
+                start, stop = set_ranges[set_name]
+                mask[start:stop] = False
+        mask.setflags(write=False)
+        return mask
+
+    @property
+    def phashes(self) -> np.ndarray:
+        """Template pHashes as one uint64 per template, grouped by set"""
+        return self._index["phashes"]
+
+    @property
+    def phash_metadata(self) -> tuple:
+        return self._index["phash_metadata"]
+
+    @property
+    def template_vectors(self) -> Dict[str, Dict[str, Any]]:
+        """{set_name: {'matrix': np.array, 'metadata': list}}"""
+        return self._index["template_vectors"]
+
+    def _load_phashes(self) -> Dict[str, Dict[str, imagehash.ImageHash]]:
         """Load pHashes from phashes.json if it exists"""
+        phash_templates = {}
         hash_file = os.path.join(self.card_imgs_dir, "phashes.json")
         if not os.path.exists(hash_file):
-            return False
+            return phash_templates
 
         try:
             with open(hash_file, "r", encoding="utf-8") as f:
                 data = json.load(f)
                 for set_name, cards in data.items():
-                    if set_name not in self.phash_templates:
-                        self.phash_templates[set_name] = {}
+                    if set_name not in phash_templates:
+                        phash_templates[set_name] = {}
                     for card_name, hex_hash in cards.items():
-                        self.phash_templates[set_name][card_name] = (
-                            imagehash.hex_to_hash(hex_hash)
+                        phash_templates[set_name][card_name] = imagehash.hex_to_hash(
+                            hex_hash
                         )
             logger.info(f"Loaded pHashes from {hash_file}")
-            return True
         except Exception as e:
             logger.error(f"Failed to load pHashes from {hash_file}: {e}")
-            return False
+        return phash_templates
 
-    def _save_phashes(self):
-        """Save pHashes to phashes.json"""
-        hash_file = os.path.join(self.card_imgs_dir, "phashes.json")
-        try:
-            data = {}
-            for set_name, cards in self.phash_templates.items():
-                data[set_name] = {}
-                for card_name, h in cards.items():
-                    data[set_name][card_name] = str(h)
-
-            with open(hash_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
-            logger.info(f"Saved pHashes to {hash_file}")
-        except Exception as e:
-            logger.error(f"Failed to save pHashes to {hash_file}: {e}")
+    def _scan_card_files(self) -> List[Dict[str, Any]]:
+        """List every card image along with the file stats that key the template pack"""
+        files = []
 
-    def _load_card_database(self) -> Dict[str, Dict[str, np.ndarray]]:
-        """Load all card images from the card_imgs directory"""
-        card_db = {}
+        if not os.path.isdir(self.card_imgs_dir):
+            logger.warning(f"Card images directory not found: {self.card_imgs_dir}")
+            return files
 
-        if not os.path.exists(self.card_imgs_dir):
-            print(f"Card images directory not found: {self.card_imgs_dir}")
-            return card_db
+        def card_order(entry):
+            return rarity_rank(os.path.splitext(entry.name)[0], set_name), entry.name
 
-        # Walk through all subdirectories (sets)
-        for set_name in os.listdir(self.card_imgs_dir):
+        # Walk through all subdirectories (sets), sorted so each set's cards are
+        # contiguous in the pack
+        for set_name in sorted(os.listdir(self.card_imgs_dir)):
             set_path = os.path.join(self.card_imgs_dir, set_name)
 
-            if not os.path.isdir(set_path):
+            # Skip the template pack itself
+            if set_name.startswith(".") or not os.path.isdir(set_path):
                 continue
 
-            # Initialize set in database
-            if set_name not in card_db:
-                card_db[set_name] = {}
+            with os.scandir(set_path) as it:
+                for entry in sorted(it, key=card_order):
+                    if not entry.name.lower().endswith(CARD_IMAGE_EXTENSIONS):
+                        continue
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    files.append(
+                        {
+                            "set": set_name,
+                            "card": os.path.splitext(entry.name)[0],
+                            "file": entry.name,
+                            "mtime_ns": stat.st_mtime_ns,
+                            "size": stat.st_size,
+                        }
+                    )
 
-            # Load all card images in this set
-            for card_file in os.listdir(set_path):
-                if card_file.lower().endswith((".png", ".jpg", ".jpeg", ".webp")):
-                    card_name = os.path.splitext(card_file)[0]
-                    card_path = os.path.join(set_path, card_file)
+        return files
 
-                    try:
-                        # Load and preprocess the card image
-                        card_image = self._load_and_preprocess_card(card_path)
-                        if card_image is not None:
-                            card_db[set_name][card_name] = card_image
-                    except Exception as e:
-                        print(f"Error loading card {card_name} from {set_name}: {e}")
+    def _template_pack_path(self, *parts: str) -> str:
+        return os.path.join(self.card_imgs_dir, TEMPLATE_PACK_DIR, *parts)
 
-        return card_db
+    def _shard_path(self, set_name: str, *parts: str) -> str:
+        return self._template_pack_path("sets", set_name, *parts)
+
+    @staticmethod
+    def _same_files(entries: List[Dict[str, Any]], files: List[Dict[str, Any]]):
+        """Whether stored pack entries still describe the scanned card files"""
+        return [(e["set"], e["file"], e["mtime_ns"], e["size"]) for e in entries] == [
+            (f["set"], f["file"], f["mtime_ns"], f["size"]) for f in files
+        ]
+
+    @staticmethod
+    def _pack_fingerprint(entries: List[Dict[str, Any]]) -> str:
+        """Identify a template pack by its format version and source file stats"""
+        digest = hashlib.sha1(f"v{TEMPLATE_PACK_VERSION}".encode())
+        for entry in entries:
+            digest.update(
+                f"{entry['set']}/{entry['file']}:{entry['mtime_ns']}:{entry['size']}\n".encode()
+            )
+        return digest.hexdigest()[:16]
+
+    def _load_template_pack(self, set_name: str = None) -> Dict[str, Any]:
+        """
+        Memory-map the on-disk template pack, or one set's shard of it when
+        set_name is given. Returns None if it can't be used.
+        """
+        if set_name is None:
+            manifest_file = self._template_pack_path("pack.json")
+        else:
+            manifest_file = self._shard_path(set_name, "shard.json")
+        if not os.path.exists(manifest_file):
+            return None
+        pack_dir = os.path.dirname(manifest_file)
+
+        try:
+            with open(manifest_file, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+
+            if manifest.get("version") != TEMPLATE_PACK_VERSION or manifest.get(
+                "match_size"
+            ) != [self.match_width, self.match_height]:
+                logger.info(f"{manifest_file} is from an older format, rebuilding")
+                return None
+
+            entries = manifest["entries"]
+            vectors = np.load(
+                os.path.join(pack_dir, manifest["vectors"]), mmap_mode="r"
+            )
+            phashes = np.load(
+                os.path.join(pack_dir, manifest["phashes"]), mmap_mode="r"
+            )
+            if len(vectors) != len(entries) or len(phashes) != len(entries):
+                logger.warning(f"{manifest_file} is inconsistent, rebuilding")
+                return None
+
+            return {
+                "fingerprint": manifest["fingerprint"],
+                "entries": entries,
+                "vectors": vectors,
+                "phashes": phashes,
+            }
+        except Exception as e:
+            logger.error(f"Failed to load template pack from {manifest_file}: {e}")
+            return None
+
+    def _save_template_pack(
+        self,
+        entries: List[Dict[str, Any]],
+        vectors_file: str,
+        phashes: np.ndarray,
+        set_name: str = None,
+    ) -> str:
+        """
+        Publish a template pack (or one set's shard when set_name is given)
+        whose vectors were streamed to vectors_file
+
+        Returns:
+            str: Path of the published vectors file (vectors_file if publishing failed)
+        """
+        if set_name is None:
+            pack_dir = self._template_pack_path()
+            manifest_file = os.path.join(pack_dir, "pack.json")
+        else:
+            pack_dir = self._shard_path(set_name)
+            manifest_file = os.path.join(pack_dir, "shard.json")
+        fingerprint = self._pack_fingerprint(entries)
+        vectors_name = f"vectors-{fingerprint}.npy"
+        phashes_name = f"phashes-{fingerprint}.npy"
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+
+        try:
+            # Data files are named after the fingerprint so a pack that another
+            # processor still has mapped is never overwritten in place.
+            phashes_file = os.path.join(pack_dir, phashes_name)
+            with open(phashes_file + suffix, "wb") as f:
+                np.save(f, phashes)
+            os.replace(phashes_file + suffix, phashes_file)
+            os.replace(vectors_file, os.path.join(pack_dir, vectors_name))
+            vectors_file = os.path.join(pack_dir, vectors_name)
+
+            manifest = {
+                "version": TEMPLATE_PACK_VERSION,
+                "fingerprint": fingerprint,
+                "match_size": [self.match_width, self.match_height],
+                "vectors": vectors_name,
+                "phashes": phashes_name,
+                "entries": entries,
+            }
+            with open(manifest_file + suffix, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            os.replace(manifest_file + suffix, manifest_file)
+            logger.info(f"Saved template pack {fingerprint} to {pack_dir}")
+        except Exception as e:
+            logger.error(f"Failed to save template pack to {pack_dir}: {e}")
+            return vectors_file
+
+        # Remove data files from earlier packs. Files still mapped by another
+        # processor can't be removed on Windows; they are retried next time.
+        for name in os.listdir(pack_dir):
+            if name.endswith(".npy") and name not in (vectors_name, phashes_name):
+                try:
+                    os.remove(os.path.join(pack_dir, name))
+                except OSError:
+                    pass
+
+        return vectors_file
 
     def _load_card_names(self) -> Dict[str, str]:
         """Load card names mapping from names.py"""
@@ -153,6 +726,11 @@ class ImageProcessor:
             # Fallback to original name if not found
             return card_name
 
+    def _card_rarity(self, card_name: str, set_name: str) -> str:
+        """Rarity code from the card's display name, "1D" when it has none"""
+        match = RARITY_PATTERN.search(self._get_display_name(card_name, set_name))
+        return match.group(1) if match else "1D"
+
     def _load_and_preprocess_card(self, card_path: str) -> np.ndarray:
         """Load and preprocess a single card image at full resolution"""
         try:
@@ -177,21 +755,71 @@ class ImageProcessor:
     def _preprocess_screenshot(self, screenshot_path: str) -> np.ndarray:
         """Load and preprocess a screenshot image"""
         try:
-            # Load image
-            with Image.open(screenshot_path) as pil_image:
-                image = np.array(pil_image)
-
-            # Convert to RGB if needed (from RGBA)
-            if len(image.shape) == 3 and image.shape[2] == 4:  # RGBA
-                image = cv2.cvtColor(image, cv2.COLOR_RGBA2RGB)
-            elif len(image.shape) == 2:  # Grayscale
-                image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
-
-            return image
+            with open(screenshot_path, "rb") as f:
+                return self.decode_screenshot(f.read())
         except Exception as e:
             print(f"Error processing screenshot {screenshot_path}: {e}")
             return None
 
+    def decode_screenshot(self, data: bytes) -> np.ndarray:
+        """
+        Decode an encoded screenshot into an RGB array, with the configured decoder
+
+        Raises:
+            Exception: If the data is not a readable image
+        """
+        if self.match_options["decoder"] == "opencv":
+            return self._decode_screenshot_opencv(data)
+        return self._decode_screenshot_pil(data)
+
+    @staticmethod
+    def _decode_screenshot_pil(data: bytes) -> np.ndarray:
+        with Image.open(io.BytesIO(data)) as pil_image:
+            image = np.array(pil_image)
+        return ImageProcessor.screenshot_array(image)
+
+    @staticmethod
+    def _decode_screenshot_opencv(data: bytes) -> np.ndarray:
+        # IMREAD_COLOR also expands grayscale and palette images and drops
+        # alpha, so the result is always 3-channel 8-bit
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError("Unreadable image data")
+        # OpenCV decodes to BGR; swap the channels within the same buffer
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+
+    @staticmethod
+    def screenshot_array(image: np.ndarray) -> np.ndarray:
+        """
+        Return a decoded screenshot as the RGB array matching expects
+
+        RGB uint8 arrays are returned as they are, without copying, as long
+        as their pixels are laid out contiguously within each row (crops of a
+        larger image are fine). RGBA and grayscale arrays are converted, and
+        other layouts (e.g. a channel-reversed view) are copied.
+
+        Raises:
+            ValueError: If the array is not an 8-bit image
+        """
+        image = np.asarray(image)
+        if image.dtype != np.uint8 or image.ndim not in (2, 3):
+            raise ValueError(
+                f"Expected an 8-bit image array, got {image.dtype} {image.shape}"
+            )
+
+        # Convert to RGB if needed (from RGBA)
+        if image.ndim == 3 and image.shape[2] == 4:  # RGBA
+            return cv2.cvtColor(image, cv2.COLOR_RGBA2RGB)
+        elif image.ndim == 2:  # Grayscale
+            return cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+        if image.shape[2] != 3:
+            raise ValueError(f"Expected an RGB image array, got shape {image.shape}")
+
+        # OpenCV needs contiguous pixels within a row
+        if image.strides[2] != 1 or image.strides[1] != 3:
+            image = np.ascontiguousarray(image)
+        return image
+
     def load_card_templates(self, template_dir: str):
         """
         Load card templates from directory
@@ -209,13 +837,12 @@ class ImageProcessor:
                         f"Template directory not found: {template_dir}"
                     )
 
-                # Update card_imgs_dir and reload database
+                # Update card_imgs_dir and reload the templates
                 self.card_imgs_dir = template_dir
-                self.card_database = self._load_card_database()
+                self._prepare_templates()
 
-                if self.card_database:
-                    self._prepare_templates()  # Optimization: Pre-calculate versions
-                    template_count = self.get_template_count()
+                template_count = self.get_template_count()
+                if template_count:
                     logger.debug(f"Successfully loaded {template_count} card templates")
                     self.loaded = True
                 else:
@@ -225,84 +852,399 @@ class ImageProcessor:
                 logger.error(f"Failed to load card templates: {e}")
                 raise
 
+    def refresh_templates(self) -> bool:
+        """
+        Pick up card art added or changed since the templates were loaded
+
+        Only the shards of sets whose art changed are rebuilt. Recognition
+        carries on with the current templates until the new index is swapped in.
+
+        Returns:
+            bool: True if the loaded templates changed
+        """
+        with self._lock, ImageProcessor._init_lock:
+            previous_version = self.template_version
+            self._prepare_templates()
+            return self.template_version != previous_version
+
     def _prepare_templates(self):
-        """Pre-calculate versions of all templates and compute pHashes"""
-        self.color_templates = {}
-        self.phash_templates = {}
-
-        logger.info("Preparing templates and computing pHashes")
-
-        # Try to load existing hashes
-        self._load_phashes()
-        new_hashes_computed = False
-
-        for set_name, cards in self.card_database.items():
-            self.color_templates[set_name] = {}
-            if set_name not in self.phash_templates:
-                self.phash_templates[set_name] = {}
-
-            for card_name, template in cards.items():
-                # 1. Matching resolution color template
-                small = cv2.resize(template, (self.match_width, self.match_height))
-                self.color_templates[set_name][card_name] = small
-
-                # 2. pHash (computed from full image for better accuracy)
-                if card_name not in self.phash_templates[set_name]:
-                    template_pil = Image.fromarray(template)
-                    self.phash_templates[set_name][card_name] = imagehash.phash(
-                        template_pil
+        """
+        Load the templates from the template pack, rebuilding only the shards
+        of sets whose card art was added or changed since the pack was written
+        """
+        started = time.perf_counter()
+        files = self._scan_card_files()
+        if not files:
+            return
+
+        pack = self._load_template_pack()
+        if pack is not None and self._same_files(pack["entries"], files):
+            if pack["fingerprint"] == self.template_version:
+                # Already loaded
+                return
+            entries = pack["entries"]
+            vectors = pack["vectors"]
+            phashes = pack["phashes"]
+            fingerprint = pack["fingerprint"]
+        else:
+            files_by_set = {}
+            for entry in files:
+                files_by_set.setdefault(entry["set"], []).append(entry)
+
+            shards = []
+            known_hashes = None
+            for set_name, set_files in files_by_set.items():
+                shard = self._load_template_pack(set_name)
+                if shard is None or not self._same_files(shard["entries"], set_files):
+                    if known_hashes is None:
+                        known_hashes = self._load_phashes()
+                    shard = self._build_shard(
+                        set_name, set_files, [shard, pack], known_hashes
                     )
-                    new_hashes_computed = True
+                shards.append(shard)
+            pack = None
+
+            # Assemble the combined pack from the shards, set by set
+            entries = [entry for shard in shards for entry in shard["entries"]]
+            os.makedirs(self._template_pack_path(), exist_ok=True)
+            suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+            vectors_file = self._template_pack_path("vectors" + suffix)
+            vectors = np.lib.format.open_memmap(
+                vectors_file,
+                mode="w+",
+                dtype=np.float32,
+                shape=(len(entries), self.match_width * self.match_height * 3),
+            )
+            row = 0
+            for shard in shards:
+                vectors[row : row + len(shard["entries"])] = shard["vectors"]
+                row += len(shard["entries"])
+            vectors.flush()
+            del vectors
+            phashes = np.concatenate(
+                [np.asarray(shard["phashes"]) for shard in shards]
+            ).astype(np.uint64)
+            del shards
+
+            with ImageProcessor._pack_lock:
+                vectors_file = self._save_template_pack(entries, vectors_file, phashes)
+            fingerprint = self._pack_fingerprint(entries)
+            vectors = np.load(vectors_file, mmap_mode="r")
+
+            peak_memory = get_peak_memory_mb()
+            if peak_memory is not None:
+                logger.info(
+                    f"Template preparation finished, peak memory {peak_memory:.0f} MB"
+                )
 
-        if new_hashes_computed:
-            self._save_phashes()
+        projection = None
+        if entries and self.match_options["projection_dims"] > 0:
+            projection = self._prepare_projection(fingerprint, vectors)
 
-        self._rebuild_vectorized_data()
+        self._rebuild_vectorized_data(entries, vectors, phashes, projection)
+        self.template_version = fingerprint
+        logger.info(
+            f"Loaded {len(entries)} templates (pack {fingerprint}) "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
 
-        # Clear large full-size caches to save memory
-        self.card_database = {}
-        self.color_templates = {}
+    def _build_shard(
+        self,
+        set_name: str,
+        files: List[Dict[str, Any]],
+        sources: List[Dict[str, Any]],
+        known_hashes: Dict[str, Dict[str, imagehash.ImageHash]],
+    ) -> Dict[str, Any]:
+        """
+        Write the template shard of one set and return it memory-mapped
 
-    def _rebuild_vectorized_data(self):
-        """Build vectorized data structures for faster matching"""
-        # 1. Rebuild pHash matrix
-        phash_list = []
-        self.phash_metadata = []
+        Rows for art that is unchanged in one of the sources (the set's old
+        shard or the old combined pack) are copied; only new or changed card
+        art is decoded and hashed.
+        """
+        cached = {}
+        for source in reversed(sources):
+            if source is None:
+                continue
+            for row, entry in enumerate(source["entries"]):
+                if entry["set"] == set_name:
+                    cached[entry["file"]] = (source, row, entry)
+
+        stale = [
+            entry
+            for entry in files
+            if entry["file"] not in cached
+            or (cached[entry["file"]][2]["mtime_ns"], cached[entry["file"]][2]["size"])
+            != (entry["mtime_ns"], entry["size"])
+        ]
+        logger.info(
+            f"Preparing templates and computing pHashes for {len(stale)} "
+            f"of {len(files)} card images in {set_name}"
+        )
+        stale_files = {entry["file"] for entry in stale}
+
+        # Stream every card through decode -> hash -> resize -> normalize
+        # straight into a file-backed matrix, so only one full-resolution
+        # image is ever held in memory.
+        os.makedirs(self._shard_path(set_name), exist_ok=True)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        vectors_file = self._shard_path(set_name, "vectors" + suffix)
+        vectors = np.lib.format.open_memmap(
+            vectors_file,
+            mode="w+",
+            dtype=np.float32,
+            shape=(len(files), self.match_width * self.match_height * 3),
+        )
+        phashes = np.empty(len(files), np.uint64)
+        entries = []
+
+        for entry in files:
+            row = len(entries)
+            if entry["file"] not in stale_files:
+                source, source_row, _ = cached[entry["file"]]
+                vectors[row] = source["vectors"][source_row]
+                phashes[row] = source["phashes"][source_row]
+                entries.append(entry)
+                continue
 
-        for set_name, cards in self.phash_templates.items():
-            for card_name, h in cards.items():
-                phash_list.append(h.hash.flatten())
-                self.phash_metadata.append((set_name, card_name))
+            card_path = os.path.join(self.card_imgs_dir, set_name, entry["file"])
+            template = self._load_and_preprocess_card(card_path)
+            if template is None:
+                continue
 
-        if phash_list:
-            self.phash_matrix = np.array(phash_list)
+            # 1. pHash (computed from full image for better accuracy). Hashes
+            # from phashes.json stay authoritative for art that isn't in a
+            # pack yet, so recognition results don't shift after upgrading.
+            known_hash = known_hashes.get(set_name, {}).get(entry["card"])
+            if known_hash is None or entry["file"] in cached:
+                phashes[row] = phash_batch([template])[0]
+            else:
+                phashes[row] = int(str(known_hash), 16)
+
+            # 2. Normalized matching-resolution color template
+            vectors[row] = self._normalize_region(template)
+            del template
+            entries.append(entry)
+
+        if len(entries) < len(files):
+            # Some images failed to decode; drop the unused tail rows
+            trimmed_file = self._shard_path(set_name, "trimmed" + suffix)
+            with open(trimmed_file, "wb") as f:
+                np.save(f, vectors[: len(entries)])
+            del vectors
+            os.replace(trimmed_file, vectors_file)
         else:
-            self.phash_matrix = None
+            vectors.flush()
+            del vectors
+        phashes = phashes[: len(entries)]
+
+        with ImageProcessor._pack_lock:
+            vectors_file = self._save_template_pack(
+                entries, vectors_file, phashes, set_name=set_name
+            )
+        return {
+            "fingerprint": self._pack_fingerprint(entries),
+            "entries": entries,
+            "vectors": np.load(vectors_file, mmap_mode="r"),
+            "phashes": phashes,
+        }
+
+    def _rebuild_vectorized_data(
+        self,
+        entries: List[Dict[str, Any]],
+        vectors: np.ndarray,
+        phashes: np.ndarray,
+        projection: Tuple[np.ndarray, np.ndarray] = None,
+    ):
+        """Build vectorized data structures for faster matching"""
+        # 1. Packed pHashes, one uint64 per template
+        phash_metadata = [(entry["set"], entry["card"]) for entry in entries]
+        if not entries:
+            phashes = vectors = None
+
+        # 2. Template matrices for detailed search. Entries are sorted by set,
+        # so each set is a contiguous block of rows (a view, not a copy).
+        # The cascade also needs every template at low resolution.
+        low_res_vectors = None
+        if vectors is not None and self.match_options["strategy"] == "cascade":
+            low_res_vectors = self._downsample_vectors(vectors)
+
+        # 3. Reduced-precision copy for the "sets" scan; the float32 vectors
+        # stay memory-mapped and are only read back for re-scoring.
+        quantized_vectors = quantized_scales = None
+        if vectors is not None and self.match_options["precision"] != "float32":
+            quantized_vectors, quantized_scales = self._quantize_vectors(
+                vectors, self.match_options["precision"]
+            )
+
+        # Single reference assignment: in-flight recognitions keep the index
+        # they started with, new ones pick up the rebuilt one.
+        self._index = self._build_index(
+            phashes,
+            phash_metadata,
+            vectors,
+            low_res_vectors,
+            quantized_vectors,
+            quantized_scales,
+            *(projection or (None, None)),
+        )
+
+    def _prepare_projection(
+        self, fingerprint: str, vectors: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Load the PCA projection of a template pack, fitting it if needed
 
-        # 2. Rebuild template matrices for detailed search
-        self.template_vectors = {}
+        The projection is stored next to the pack under the pack fingerprint,
+        so it is refitted whenever card art is added or changed.
 
+        Returns:
+            Tuple of the (D x k) projection matrix and the (N x k) projected
+            templates
+        """
+        dims = self.match_options["projection_dims"]
+        projection_file = self._template_pack_path(
+            f"projection-{fingerprint}-{dims}.npy"
+        )
+        embeddings_file = self._template_pack_path(
+            f"embeddings-{fingerprint}-{dims}.npy"
+        )
+        if os.path.exists(projection_file) and os.path.exists(embeddings_file):
+            try:
+                return (
+                    np.load(projection_file, mmap_mode="r"),
+                    np.load(embeddings_file, mmap_mode="r"),
+                )
+            except Exception as e:
+                logger.warning(f"Failed to load template projection, refitting: {e}")
+
+        started = time.perf_counter()
+        projection, embeddings = self._fit_projection(vectors, dims)
         logger.info(
-            f"Vectorizing templates at {self.match_width}x{self.match_height}..."
+            f"Fitted {projection.shape[1]}-dimensional template projection "
+            f"in {time.perf_counter() - started:.1f}s"
         )
-        for set_name, cards in self.color_templates.items():
-            vectors = []
-            metadata = []
-            for card_name, color_img in cards.items():
-                # Normalize (already resized in _prepare_templates)
-                vec = color_img.astype(np.float32).flatten()
-                vec -= np.mean(vec)
-                norm = np.linalg.norm(vec)
-                if norm > 0:
-                    vec /= norm
-                vectors.append(vec)
-                metadata.append(card_name)
-
-            if vectors:
-                self.template_vectors[set_name] = {
-                    "matrix": np.array(vectors),
-                    "metadata": metadata,
-                }
+
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            for path, array in (
+                (projection_file, projection),
+                (embeddings_file, embeddings),
+            ):
+                with open(path + suffix, "wb") as f:
+                    np.save(f, array)
+                os.replace(path + suffix, path)
+        except Exception as e:
+            logger.error(f"Failed to save template projection: {e}")
+        return projection, embeddings
+
+    @staticmethod
+    def _fit_projection(
+        vectors: np.ndarray, dims: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Fit an (uncentered) PCA projection to the template vectors
+
+        With far fewer templates than dimensions, the principal directions are
+        found from the N x N Gram matrix instead of the D x D covariance. The
+        Gram matrix is accumulated block by block so the memory-mapped
+        vectors are never loaded whole. Dot products in the projected space
+        approximate the normalized correlation of the full vectors.
+        """
+        count = len(vectors)
+        block = 512
+        gram = np.empty((count, count), dtype=np.float64)
+        for i in range(0, count, block):
+            rows_i = np.asarray(vectors[i : i + block])
+            for j in range(i, count, block):
+                rows_j = rows_i if j == i else np.asarray(vectors[j : j + block])
+                product = rows_i @ rows_j.T
+                gram[i : i + len(rows_i), j : j + len(rows_j)] = product
+                gram[j : j + len(rows_j), i : i + len(rows_i)] = product.T
+
+        eigenvalues, eigenvectors = np.linalg.eigh(gram)
+        order = np.argsort(eigenvalues)[::-1][:dims]
+        order = order[eigenvalues[order] > eigenvalues.max() * 1e-10]
+        eigenvalues = eigenvalues[order]
+        eigenvectors = eigenvectors[:, order]
+
+        # Principal directions V = X^T U / sqrt(lambda); the templates
+        # projected onto them are simply U * sqrt(lambda).
+        weights = (eigenvectors / np.sqrt(eigenvalues)).astype(np.float32)
+        projection = np.zeros((vectors.shape[1], len(order)), dtype=np.float32)
+        for i in range(0, count, block):
+            projection += np.asarray(vectors[i : i + block]).T @ weights[i : i + block]
+        embeddings = (eigenvectors * np.sqrt(eigenvalues)).astype(np.float32)
+        return projection, embeddings
+
+    def _normalize_region(self, image: np.ndarray) -> np.ndarray:
+        """Resize an RGB image to matching resolution as a zero-mean unit vector"""
+        small = cv2.resize(image, (self.match_width, self.match_height))
+        vec = small.astype(np.float32).flatten()
+        vec -= np.mean(vec)
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec /= norm
+        return vec
+
+    def _downsample_vectors(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Area-downsample normalized vectors by LOW_RES_FACTOR and renormalize
+
+        Works on the stored matching-resolution vectors, so templates and
+        queries are reduced exactly the same way without touching card art.
+        """
+        f = LOW_RES_FACTOR
+        h, w = self.match_height // f, self.match_width // f
+        low_res = np.empty((len(vectors), h * w * 3), dtype=np.float32)
+        for start in range(0, len(vectors), 512):
+            block = np.asarray(vectors[start : start + 512]).reshape(-1, h, f, w, f, 3)
+            block = block.mean(axis=(2, 4)).reshape(len(block), -1)
+            block -= block.mean(axis=1, keepdims=True)
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            norms[norms == 0] = 1
+            low_res[start : start + len(block)] = block / norms
+        return low_res
+
+    @staticmethod
+    def _quantize_vectors(
+        vectors: np.ndarray, precision: str
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Reduced-precision copy of the template vectors
+
+        Returns the quantized matrix and a float32 scale per row: int8 rows
+        are scaled so their largest magnitude maps to 127, float16 rows keep
+        a scale of 1.
+        """
+        dtype = np.int8 if precision == "int8" else np.float16
+        quantized = np.empty(vectors.shape, dtype=dtype)
+        scales = np.ones(len(vectors), dtype=np.float32)
+        for start in range(0, len(vectors), 512):
+            block = np.asarray(vectors[start : start + 512])
+            if dtype is np.int8:
+                peak = np.abs(block).max(axis=1)
+                peak[peak == 0] = 1
+                block_scales = (peak / 127).astype(np.float32)
+                scales[start : start + len(block)] = block_scales
+                block = np.rint(block / block_scales[:, np.newaxis])
+            quantized[start : start + len(block)] = block
+        return quantized, scales
+
+    @staticmethod
+    def _quantized_scores(
+        matrix: np.ndarray, scales: np.ndarray, q_vecs: np.ndarray
+    ) -> np.ndarray:
+        """Approximate matrix @ q_vecs.T for a quantized matrix, 64 rows at a time"""
+        scores = np.empty((len(matrix), len(q_vecs)), dtype=np.float32)
+        q_t = np.ascontiguousarray(q_vecs.T)
+        # Widening a small block keeps the float32 temporary small while the
+        # product still runs through BLAS
+        for start in range(0, len(matrix), 64):
+            block = matrix[start : start + 64].astype(np.float32)
+            scores[start : start + len(block)] = block @ q_t
+        scores *= scales[:, np.newaxis]
+        return scores
 
     def process_screenshot(
         self, image_path: str, force_set: str = None
@@ -317,101 +1259,322 @@ class ImageProcessor:
         Returns:
             List[Dict]: List of identified cards with positions and confidence scores
         """
-        with self._lock:
-            if not self.phash_templates:
-                raise RuntimeError(
-                    "Card templates not loaded. Call load_card_templates() first."
-                )
+        return self.process_screenshots([image_path], [force_set])[0]
 
-            try:
-                logger.debug(f"Processing screenshot: {image_path}")
-                if force_set:
-                    logger.debug(f"Force set requested: {force_set}")
+    def process_screenshot_bytes(
+        self, data: bytes, force_set: str = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Process an encoded screenshot (PNG, JPEG, ...) held in memory
 
-                # Load and preprocess screenshot
-                screenshot = self._preprocess_screenshot(image_path)
+        Returns:
+            List[Dict]: As returned by process_screenshot
+        """
+        return next(self.iter_process([data], [force_set]))
 
-                if screenshot is None:
-                    logger.warning(f"Failed to load screenshot: {image_path}")
-                    return []
+    def process_screenshot_array(
+        self, image: np.ndarray, force_set: str = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Process a decoded screenshot
 
-                logger.debug(f"Screenshot loaded: {screenshot.shape}")
+        Args:
+            image: RGB uint8 array of shape (height, width, 3); RGBA and
+                grayscale arrays are converted. See screenshot_array for when
+                the pixels are used without copying.
+            force_set: If provided, only search within this set
 
-                # Detect card positions using fixed layout
-                card_positions = self._detect_card_positions(screenshot)
+        Returns:
+            List[Dict]: As returned by process_screenshot
+        """
+        return next(self.iter_process([image], [force_set]))
 
-                num_cards = len(card_positions)
-                logger.debug(f"Detected {num_cards} card positions")
+    def iter_process(
+        self,
+        screenshots: Iterable[Any],
+        force_sets: Iterable[str] = None,
+        batch_size: int = 8,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Process a stream of screenshots, yielding each one's results in order
 
-                # If 4 cards, it's always A4b / Deluxe Pack Ex
-                # If 5 or 6 cards, it's guaranteed NOT to be A4b
-                forced_set = (
-                    force_set if force_set else ("A4b" if num_cards == 4 else None)
-                )
-                excluded_sets = ["A4b"] if num_cards in (5, 6) else []
+        Inputs may be file paths, encoded image bytes or decoded arrays, mixed
+        freely. They are read lazily, batch_size at a time, and each batch's
+        card slots are matched together as in process_screenshots. Inputs
+        that cannot be decoded yield an empty result.
 
-                if force_set:
-                    logger.debug(f"Set locked to {force_set}")
-                elif forced_set:
-                    logger.debug(
-                        f"Four-card pack detected, forcing set to {forced_set}"
-                    )
-                if excluded_sets:
-                    logger.debug(
-                        f"{num_cards}-card pack detected, excluding sets: {excluded_sets}"
-                    )
+        Args:
+            screenshots: Iterable of paths, bytes-like objects or arrays
+            force_sets: Optional iterable of per-screenshot sets to search
+                within, parallel to screenshots
+            batch_size: Screenshots matched together
+
+        Yields:
+            List[Dict]: Each screenshot's results, as returned by
+            process_screenshot
+        """
+        if force_sets is None:
+            force_sets = itertools.repeat(None)
+        inputs = zip(screenshots, force_sets)
+        while True:
+            batch = list(itertools.islice(inputs, max(1, batch_size)))
+            if not batch:
+                return
+            decoded, labels = [], []
+            for screenshot, _ in batch:
+                label = self._screenshot_label(screenshot)
+                try:
+                    decoded.append(self._load_screenshot(screenshot))
+                except Exception as e:
+                    logger.error(f"Failed to decode screenshot {label}: {e}")
+                    decoded.append(None)
+                labels.append(label)
+            yield from self.match_screenshots(
+                decoded, [force_set for _, force_set in batch], labels
+            )
 
-                # Identify all cards in a single pass
-                detected_cards = []
-                for i, (x, y, w, h) in enumerate(card_positions):
-                    logger.debug(f"Scanning card {i+1} at position ({x}, {y})")
-                    card_region = screenshot[y : y + h, x : x + w]
+    def _load_screenshot(self, screenshot: Any) -> np.ndarray:
+        """Turn a path, encoded bytes or an array into an RGB screenshot"""
+        if isinstance(screenshot, np.ndarray):
+            return self.screenshot_array(screenshot)
+        if isinstance(screenshot, (bytes, bytearray, memoryview)):
+            return self.decode_screenshot(screenshot)
+        with open(screenshot, "rb") as f:
+            return self.decode_screenshot(f.read())
+
+    @staticmethod
+    def _screenshot_label(screenshot: Any) -> str:
+        if isinstance(screenshot, np.ndarray):
+            return f"<array {'x'.join(map(str, screenshot.shape))}>"
+        if isinstance(screenshot, (bytes, bytearray, memoryview)):
+            return f"<{memoryview(screenshot).nbytes} bytes>"
+        return os.fspath(screenshot)
+
+    def process_screenshots(
+        self, image_paths: List[str], force_sets: List[str] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Process a batch of screenshots, matching all of their card slots together
 
-                    if self._is_empty_card_region(card_region):
-                        logger.debug(f"Skipping empty card slot at position {i+1}")
-                        continue
+        The card regions of every screenshot are gathered first so the detailed
+        search scores each candidate set with one matrix-matrix product instead
+        of one matrix-vector product per slot.
 
-                    # Use force_detailed=True for maximum accuracy since we're only scanning once.
-                    # This ensures we don't just rely on pHash which can have collisions.
-                    best_match = self._find_best_card_match(
-                        card_region,
-                        force_set=forced_set,
-                        exclude_sets=excluded_sets,
-                        force_detailed=True,
-                    )
+        Args:
+            image_paths: Paths to screenshot images
+            force_sets: Optional per-screenshot set to search within (None entries
+                search every set)
 
-                    if best_match and best_match["confidence"] > 0.2:
-                        # Get the display name for this card
-                        display_name = self._get_display_name(
-                            best_match["card_name"], best_match["card_set"]
-                        )
-                        logger.debug(
-                            f"Card {i+1}: {display_name} (confidence: {best_match['confidence']:.2f})"
-                        )
+        Returns:
+            List of per-screenshot results, in the order of image_paths, each as
+            returned by process_screenshot
+        """
+        if self._index["phashes"] is None:
+            raise RuntimeError(
+                "Card templates not loaded. Call load_card_templates() first."
+            )
+        screenshots = []
+        for image_path in image_paths:
+            logger.debug(f"Processing screenshot: {image_path}")
+            screenshots.append(self._preprocess_screenshot(image_path))
+        return self.match_screenshots(screenshots, force_sets, labels=image_paths)
 
-                        detected_cards.append(
-                            {
-                                "position": i + 1,
-                                "card_code": best_match["card_name"],
-                                "card_name": display_name,
-                                "card_set": best_match["card_set"],
-                                "confidence": best_match["confidence"],
-                                "x": x,
-                                "y": y,
-                                "width": w,
-                                "height": h,
-                            }
-                        )
-                    else:
-                        logger.debug(f"No card match found for position {i+1}")
+    def match_encoded_screenshots(
+        self,
+        datas: List[bytes],
+        force_sets: List[str] = None,
+        labels: List[str] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Decode and match a batch of encoded screenshot files
 
-                logger.debug(f"Found {len(detected_cards)} cards in {image_path}")
-                return detected_cards
+        Args:
+            datas: Encoded image file contents
+            force_sets: Optional per-screenshot set to search within
+            labels: Optional per-screenshot names used in log messages
+
+        Returns:
+            List of per-screenshot results, in the order of datas; None for
+            screenshots that could not be decoded
+        """
+        if labels is None:
+            labels = [f"screenshot {n}" for n in range(len(datas))]
+        screenshots = []
+        for data, label in zip(datas, labels):
+            try:
+                screenshots.append(self.decode_screenshot(data))
+            except Exception as e:
+                logger.error(f"Error decoding {label}: {e}")
+                screenshots.append(None)
+        results = self.match_screenshots(screenshots, force_sets, labels)
+        return [
+            None if screenshot is None else result
+            for screenshot, result in zip(screenshots, results)
+        ]
+
+    def match_screenshots(
+        self,
+        screenshots: List[np.ndarray],
+        force_sets: List[str] = None,
+        labels: List[str] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Match a batch of already decoded screenshots
+
+        Args:
+            screenshots: RGB screenshot arrays as returned by decode_screenshot
+                (None entries are treated as unreadable and match nothing)
+            force_sets: Optional per-screenshot set to search within
+            labels: Optional per-screenshot names used in log messages
 
+        Returns:
+            List of per-screenshot results, in the order of screenshots
+        """
+        # Take one snapshot of the template data for the whole batch so a
+        # concurrent reload cannot mix old and new templates between slots.
+        index = self._index
+        if index["phashes"] is None:
+            raise RuntimeError(
+                "Card templates not loaded. Call load_card_templates() first."
+            )
+        if force_sets is None:
+            force_sets = [None] * len(screenshots)
+        if labels is None:
+            labels = [f"screenshot {n}" for n in range(len(screenshots))]
+
+        slots = []
+        for screenshot_index, (screenshot, force_set, label) in enumerate(
+            zip(screenshots, force_sets, labels)
+        ):
+            try:
+                slots.extend(
+                    dict(slot, screenshot=screenshot_index)
+                    for slot in self._extract_card_slots(screenshot, force_set, label)
+                )
             except Exception as e:
-                logger.error(f"Failed to process screenshot {image_path}: {e}")
+                logger.error(f"Failed to process screenshot {label}: {e}")
                 raise
 
+        # Use force_detailed=True for maximum accuracy since we're only scanning once.
+        # This ensures we don't just rely on pHash which can have collisions.
+        features = {} if self.match_options["slot_embeddings"] and slots else None
+        matches = self._find_best_card_matches(
+            [slot["region"] for slot in slots],
+            force_sets=[slot["force_set"] for slot in slots],
+            exclude_sets=[slot["exclude_sets"] for slot in slots],
+            force_detailed=True,
+            index=index,
+            features=features,
+            positions=[slot["position"] for slot in slots],
+            screenshots=[slot["screenshot"] for slot in slots],
+        )
+        if features is not None:
+            embeddings, embedding_scales = self._quantize_vectors(
+                features["vectors"], "int8"
+            )
+
+        results = [[] for _ in screenshots]
+        for n, (slot, best_match) in enumerate(zip(slots, matches)):
+            position = slot["position"]
+            if best_match and best_match["confidence"] > 0.2:
+                # Get the display name for this card
+                display_name = self._get_display_name(
+                    best_match["card_name"], best_match["card_set"]
+                )
+                logger.debug(
+                    f"Card {position}: {display_name} (confidence: {best_match['confidence']:.2f})"
+                )
+
+                x, y, w, h = slot["box"]
+                results[slot["screenshot"]].append(
+                    {
+                        "position": position,
+                        "card_code": best_match["card_name"],
+                        "card_name": display_name,
+                        "card_set": best_match["card_set"],
+                        "confidence": best_match["confidence"],
+                        "x": x,
+                        "y": y,
+                        "width": w,
+                        "height": h,
+                    }
+                )
+                if features is not None:
+                    results[slot["screenshot"]][-1].update(
+                        phash=int(features["phashes"][n]),
+                        embedding=embeddings[n],
+                        embedding_scale=float(embedding_scales[n]),
+                    )
+            else:
+                logger.debug(f"No card match found for position {position}")
+
+        for label, detected_cards in zip(labels, results):
+            logger.debug(f"Found {len(detected_cards)} cards in {label}")
+        return results
+
+    def _extract_card_slots(
+        self, screenshot: np.ndarray, force_set: str = None, label: str = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Cut a decoded screenshot into its non-empty card slots
+
+        Returns:
+            List[Dict]: One entry per card slot with its 1-based position, box,
+            region pixels and the set restrictions implied by the pack layout
+        """
+        if force_set:
+            logger.debug(f"Force set requested: {force_set}")
+
+        if screenshot is None:
+            logger.warning(f"Failed to load screenshot: {label}")
+            return []
+
+        logger.debug(f"Screenshot loaded: {screenshot.shape}")
+
+        # Detect card positions using fixed layout
+        card_positions = self._detect_card_positions(screenshot)
+        empty_probes = screenshot_layout(*screenshot.shape[1::-1])["empty_probes"]
+
+        num_cards = len(card_positions)
+        logger.debug(f"Detected {num_cards} card positions")
+
+        # If 4 cards, it's always A4b / Deluxe Pack Ex
+        # If 5 or 6 cards, it's guaranteed NOT to be A4b
+        forced_set = force_set if force_set else ("A4b" if num_cards == 4 else None)
+        excluded_sets = ["A4b"] if num_cards in (5, 6) else []
+
+        if force_set:
+            logger.debug(f"Set locked to {force_set}")
+        elif forced_set:
+            logger.debug(f"Four-card pack detected, forcing set to {forced_set}")
+        if excluded_sets:
+            logger.debug(
+                f"{num_cards}-card pack detected, excluding sets: {excluded_sets}"
+            )
+
+        slots = []
+        for i, (x, y, w, h) in enumerate(card_positions):
+            logger.debug(f"Scanning card {i+1} at position ({x}, {y})")
+            card_region = screenshot[y : y + h, x : x + w]
+
+            center_box = empty_probes[(x, y, w, h)]
+            if center_box is not None and self._is_empty_color(
+                screenshot[center_box[1] : center_box[3], center_box[0] : center_box[2]]
+            ):
+                logger.debug(f"Skipping empty card slot at position {i+1}")
+                continue
+
+            slots.append(
+                {
+                    "position": i + 1,
+                    "box": (x, y, w, h),
+                    "region": card_region,
+                    "force_set": forced_set,
+                    "exclude_sets": excluded_sets,
+                }
+            )
+        return slots
+
     def _detect_card_positions(
         self, screenshot: np.ndarray
     ) -> List[Tuple[int, int, int, int]]:
@@ -425,87 +1588,38 @@ class ImageProcessor:
             List[Tuple]: List of (x, y, width, height) tuples for card positions
         """
         height, width = screenshot.shape[:2]
-
-        # Base resolution that the original coordinates were designed for (240x227)
-        base_w, base_h = 240, 227
-
-        # Calculate scaling factors
-        scale_x = width / base_w
-        scale_y = height / base_h
-
-        def scale_pos(pos):
-            x, y, w, h = pos
-            return (
-                int(round(x * scale_x)),
-                int(round(y * scale_y)),
-                int(round(w * scale_x)),
-                int(round(h * scale_y)),
-            )
+        layout = screenshot_layout(width, height)
 
         # #e7f0f7 in grayscale ≈ 239
         background_threshold = 235
 
         # Detect layout: check if there are 2 or 3 cards on top row
-        det_top_x, det_top_y, det_top_w, det_top_h = scale_pos((0, 8, 30, 50))
-
-        if det_top_y + det_top_h <= height and det_top_x + det_top_w <= width:
-            detection_region_top = screenshot[
-                det_top_y : det_top_y + det_top_h, det_top_x : det_top_x + det_top_w
-            ]
-            avg_color_top = np.mean(detection_region_top)
-
-            if avg_color_top > background_threshold:
-                # 2 cards on top row
-                top_base = [
-                    (39, 5, 75, 106),  # position 1
-                    (124, 5, 75, 106),  # position 2
-                ]
-            else:
-                # 3 cards on top row
-                top_base = [
-                    (0, 5, 75, 106),  # position 1
-                    (81, 5, 75, 106),  # position 2
-                    (164, 5, 75, 106),  # position 3
-                ]
-        else:
-            # Fallback to 3-card layout
-            top_base = [
-                (0, 5, 75, 106),
-                (81, 5, 75, 106),
-                (164, 5, 75, 106),
-            ]
-
-        top_row_positions = [scale_pos(p) for p in top_base]
+        top_cards = 3
+        if layout["top_probe"] is not None:
+            x, y, w, h = layout["top_probe"]
+            avg_color_top = self._mean_brightness(screenshot[y : y + h, x : x + w])
+            top_cards = 2 if avg_color_top > background_threshold else 3
 
         # Detect layout: check if there are 2 or 3 cards on bottom row
-        # Scale the detection rectangle: (x=0, y=124, w=30, h=50)
-        det_x, det_y, det_w, det_h = scale_pos((0, 124, 30, 50))
-
-        if det_y + det_h <= height and det_x + det_w <= width:
-            detection_region = screenshot[det_y : det_y + det_h, det_x : det_x + det_w]
-            avg_color = np.mean(detection_region)
-
-            if avg_color > background_threshold:
-                # 2 cards on bottom row
-                bottom_base = [
-                    (39, 121, 75, 106),  # position 4
-                    (124, 121, 75, 106),  # position 5
-                ]
-            else:
-                # 3 cards on bottom row
-                bottom_base = [
-                    (0, 121, 75, 106),  # position 4
-                    (81, 121, 75, 106),  # position 5
-                    (164, 121, 75, 106),  # position 6
-                ]
-        else:
-            # Fallback to 2-card layout
-            bottom_base = [(39, 121, 75, 106), (124, 121, 75, 106)]
-
-        bottom_positions = [scale_pos(p) for p in bottom_base]
-
+        # (2 when the detection strip falls outside the screenshot)
+        bottom_cards = 2
+        if layout["bottom_probe"] is not None:
+            x, y, w, h = layout["bottom_probe"]
+            avg_color = self._mean_brightness(screenshot[y : y + h, x : x + w])
+            bottom_cards = 2 if avg_color > background_threshold else 3
+
+        top_row_positions = list(layout["top"][top_cards])
+        bottom_positions = list(layout["bottom"][bottom_cards])
         return top_row_positions + bottom_positions
 
+    @staticmethod
+    def _mean_brightness(region: np.ndarray) -> float:
+        """Mean of all of an RGB region's channels, as np.mean(region)"""
+        if region.size == 0:
+            return float("nan")
+        # cv2.mean reads the view in place instead of casting it to float64
+        return sum(cv2.mean(region)[:3]) / 3
+
     def _is_empty_card_region(self, card_region: np.ndarray) -> bool:
         """
         Determine if a card region is an empty (unrendered) slot based on
@@ -529,20 +1643,103 @@ class ImageProcessor:
         if x1 <= x0 or y1 <= y0:
             return False
 
-        center_box = card_region[y0:y1, x0:x1]
-        avg_color = np.mean(center_box.reshape(-1, 3), axis=0)
+        return self._is_empty_color(card_region[y0:y1, x0:x1])
+
+    @staticmethod
+    def _is_empty_color(center_box: np.ndarray) -> bool:
+        """Whether a slot's centre box has the colour of an empty slot"""
+        avg_color = np.array(cv2.mean(center_box)[:3])
 
         empty_color = np.array([189, 206, 226], dtype=np.float32)  # #bdcee2
         distance = np.linalg.norm(avg_color - empty_color)
 
         return distance <= 20.0
 
+    def _search_phashes(
+        self,
+        query_hashes: np.ndarray,
+        force_set: str = None,
+        exclude_sets: List[str] = None,
+        top_k: int = 1,
+        index: Dict[str, Any] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Hamming search of a batch of query pHashes against every template
+
+        Args:
+            query_hashes: uint64 pHashes, one per query (see pack_phash_bits)
+            force_set: If provided, only score templates from this set
+            exclude_sets: If provided, do not score templates from these sets
+            top_k: Number of best template rows to return per query
+            index: Template index snapshot to search (defaults to the current one)
+
+        Returns:
+            Dict with "set_scores" (Q x S best score per set in index["set_names"]
+            order, -1 for filtered sets), "top_indices" (Q x top_k template rows,
+            best first) and "top_scores" (their similarity), or None if no
+            templates are eligible.
+        """
+        if index is None:
+            index = self._index
+        phashes = index["phashes"]
+        if phashes is None or not len(phashes):
+            return None
+
+        # Templates are grouped by set, so a forced set is a contiguous view
+        # and the other sets never get scored at all.
+        start = 0
+        if force_set:
+            if force_set not in index["set_ranges"]:
+                return None
+            start, stop = index["set_ranges"][force_set]
+            phashes = phashes[start:stop]
+
+        query_hashes = np.asarray(query_hashes, dtype=np.uint64).reshape(-1, 1)
+        distances = popcount64(phashes[np.newaxis, :] ^ query_hashes)
+        scores = 1.0 - distances / 64.0
+
+        if force_set:
+            set_scores = np.full((len(scores), len(index["set_names"])), -1.0)
+            set_scores[:, index["set_names"].index(force_set)] = scores.max(axis=1)
+        else:
+            if exclude_sets:
+                key = frozenset(exclude_sets)
+                mask = index["exclusion_masks"].get(key)
+                if mask is None:
+                    mask = self._exclusion_mask(
+                        index["set_ranges"], len(phashes), exclude_sets
+                    )
+                    index["exclusion_masks"][key] = mask
+                if not mask.any():
+                    return None
+                scores[:, ~mask] = -1.0
+            # Best score per set in one pass over the set-sorted rows
+            set_scores = np.maximum.reduceat(scores, index["set_offsets"], axis=1)
+
+        top_k = min(top_k, scores.shape[1])
+        if top_k == 1:
+            # argmax keeps the first template on ties, like a linear scan would
+            top = np.argmax(scores, axis=1)[:, np.newaxis]
+        elif top_k < scores.shape[1]:
+            top = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        else:
+            top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+
+        return {
+            "set_scores": set_scores,
+            "top_indices": np.take_along_axis(top, order, axis=1) + start,
+            "top_scores": np.take_along_axis(top_scores, order, axis=1),
+        }
+
     def _find_best_card_match(
         self,
         card_region: np.ndarray,
         force_set: str = None,
         force_detailed: bool = False,
         exclude_sets: List[str] = None,
+        index: Dict[str, Any] = None,
     ) -> Dict[str, Any]:
         """
         Find the best matching card in the database for a card region
@@ -552,116 +1749,743 @@ class ImageProcessor:
             force_set: If provided, only search within this set
             force_detailed: If True, always perform detailed search regardless of quick search confidence
             exclude_sets: If provided, do not search within these sets
+            index: Template index snapshot to search (defaults to the current one)
 
         Returns:
             Dict: Best match result with card_name, card_set, and confidence
         """
-        best_match = None
-        best_score = -1
+        return self._find_best_card_matches(
+            [card_region],
+            force_sets=[force_set],
+            exclude_sets=[exclude_sets],
+            force_detailed=force_detailed,
+            index=index,
+        )[0]
+
+    def _find_best_card_matches(
+        self,
+        card_regions: List[np.ndarray],
+        force_sets: List[str] = None,
+        exclude_sets: List[List[str]] = None,
+        force_detailed: bool = False,
+        index: Dict[str, Any] = None,
+        features: Dict[str, np.ndarray] = None,
+        positions: List[int] = None,
+        screenshots: List[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the best matching card for each of a batch of card regions
 
+        Args:
+            card_regions: Card image regions as numpy arrays
+            force_sets: Optional per-region set to search within
+            exclude_sets: Optional per-region sets not to search within
+            force_detailed: If True, always perform detailed search regardless of quick search confidence
+            index: Template index snapshot to search (defaults to the current one)
+            features: If given, filled with the regions' "phashes" and
+                low-resolution "vectors"
+            positions: Optional per-region slot position, for the pack priors
+            screenshots: Optional per-region screenshot number; regions of the
+                same screenshot are searched together with the set lock
+
+        Returns:
+            List[Dict]: Best match (card_name, card_set, confidence) per region,
+            or None where nothing matched
+        """
         # Multi-stage matching for better performance:
-        # 1. Quick search using pHash and Hamming distance to identify likely sets
-        # 2. Detailed search at full resolution within the candidate sets
+        # 1. Quick search using pHash and Hamming distance to identify likely
+        #    sets ("sets" strategy) or the top_k likely cards ("cascade")
+        # 2. Detailed search at full resolution within the candidate sets, or
+        #    within the cards that survive a low-resolution pass
+
+        if index is None:
+            index = self._index
+        phash_metadata = index["phash_metadata"]
+        cascade = (
+            self.match_options["strategy"] == "cascade"
+            and index["low_res_vectors"] is not None
+        )
+        timings = {}
+        scored = {"templates": 0}
+        stage_started = time.perf_counter()
 
-        # Ensure templates are prepared
-        with self._lock:
-            if not hasattr(self, "phash_templates") or not self.phash_templates:
-                self._prepare_templates()
+        count = len(card_regions)
+        if force_sets is None:
+            force_sets = [None] * count
+        if exclude_sets is None:
+            exclude_sets = [None] * count
 
         # Stage 1: Quick search using pHash
-        # Compute pHash for the region directly from the provided region
-        region_pil = Image.fromarray(card_region)
-        region_hash = imagehash.phash(region_pil)
+        # Compute pHashes for all regions directly from the provided regions
+        query_hashes = phash_batch(card_regions)
+
+        # Regions with the same set restrictions are searched as one batch
+        groups = {}
+        for i, (force_set, excluded) in enumerate(zip(force_sets, exclude_sets)):
+            groups.setdefault((force_set, tuple(excluded or ())), []).append(i)
 
         # Quick search to identify candidate sets and best card match
-        set_scores = {}
-        quick_best_match = None
-        quick_best_score = -1
-
-        if self.phash_matrix is not None:
-            # Filter indices based on force_set / exclude_sets
-            if force_set:
-                indices = [
-                    i for i, m in enumerate(self.phash_metadata) if m[0] == force_set
-                ]
-            elif exclude_sets:
-                indices = [
+        quick_matches = [None] * count
+        candidates = [[] for _ in range(count)]
+        # How far each region's best set leads the next one by pHash
+        set_margins = [0.0] * count
+        for (force_set, excluded), rows in groups.items():
+            search = self._search_phashes(
+                query_hashes[rows],
+                force_set=force_set,
+                exclude_sets=list(excluded),
+                top_k=self.match_options["top_k"] if cascade else 1,
+                index=index,
+            )
+            for n, i in enumerate(rows):
+                set_scores = {}
+                if search is not None:
+                    for s_name, score in zip(
+                        index["set_names"], search["set_scores"][n]
+                    ):
+                        if score > 0:
+                            set_scores[s_name] = float(score)
+                    top_set_scores = sorted(set_scores.values(), reverse=True)[:2]
+                    if top_set_scores:
+                        set_margins[i] = top_set_scores[0] - (
+                            top_set_scores[1] if len(top_set_scores) > 1 else 0.0
+                        )
+
+                    quick_score = search["top_scores"][n, 0]
+                    if quick_score >= 0:
+                        s_name, c_name = phash_metadata[search["top_indices"][n, 0]]
+                        quick_matches[i] = {
+                            "card_name": c_name,
+                            "card_set": s_name,
+                            "confidence": float(quick_score),
+                        }
+                if cascade:
+                    if search is not None:
+                        eligible = search["top_scores"][n] >= 0
+                        candidates[i] = search["top_indices"][n][eligible]
+                else:
+                    candidates[i] = self._candidate_sets(set_scores, force_set)
+        timings["pHash"] = time.perf_counter() - stage_started
+
+        # Optimization: If quick search is extremely confident, skip detailed search
+        # Only if not forced to do a detailed search
+        CONFIDENCE_THRESHOLD = 0.92  # Increased threshold for higher certainty
+        detailed = []
+        for i, quick_best_match in enumerate(quick_matches):
+            if (
+                not force_detailed
+                and quick_best_match
+                and quick_best_match["confidence"] >= CONFIDENCE_THRESHOLD
+            ):
+                logger.debug(
+                    f"Quick search extremely confident ({quick_best_match['confidence']:.3f}), skipping detailed search"
+                )
+            else:
+                detailed.append(i)
+
+        # Stage 2: Detailed search
+        detailed_matches = {}
+        all_vecs = None
+        if features is not None:
+            all_vecs = np.stack([self._normalize_region(r) for r in card_regions])
+            features["phashes"] = query_hashes
+            features["vectors"] = self._downsample_vectors(all_vecs)
+        if detailed:
+            # Normalize query regions at matching resolution for correlation
+            if all_vecs is not None:
+                q_vecs = all_vecs[detailed]
+            else:
+                q_vecs = np.stack(
+                    [self._normalize_region(card_regions[i]) for i in detailed]
+                )
+            q_rows = {i: n for n, i in enumerate(detailed)}
+
+            def search(regions, region_candidates):
+                """Detailed search of regions, each within its candidates"""
+                found = find(regions, region_candidates)
+                detailed_matches.update(zip(regions, found))
+
+            def find(regions, region_candidates):
+                """Best detailed match of each region within its candidates"""
+                region_vecs = q_vecs[[q_rows[i] for i in regions]]
+                if cascade:
+                    found = self._search_shortlist(
+                        region_vecs, region_candidates, index, timings, scored
+                    )
+                else:
+                    started = time.perf_counter()
+                    found = self._search_sets(
+                        region_vecs,
+                        region_candidates,
+                        index,
+                        scored,
+                        positions=(
+                            [positions[i] for i in regions] if positions else None
+                        ),
+                    )
+                    timings["full-res"] = (
+                        timings.get("full-res", 0.0) + time.perf_counter() - started
+                    )
+                return found
+
+            # Screenshots are single-set packs: search each screenshot's most
+            # distinctive slot first and, once it matches confidently, the
+            # other slots of the screenshot within its set and the promos only
+            leads = {}
+            if self.match_options["set_lock"] and screenshots is not None:
+                for i in detailed:
+                    if force_sets[i]:
+                        continue
+                    lead = leads.get(screenshots[i])
+                    if lead is None or set_margins[i] > set_margins[lead]:
+                        leads[screenshots[i]] = i
+            if leads:
+                stage_started = time.perf_counter()
+                search(list(leads.values()), [candidates[i] for i in leads.values()])
+                timings["lead slots"] = time.perf_counter() - stage_started
+
+            locked = {}
+            for screenshot, lead in leads.items():
+                lead_match = detailed_matches[lead]
+                if lead_match and lead_match["confidence"] >= SET_LOCK_CONFIDENCE:
+                    locked[screenshot] = [lead_match["card_set"]] + [
+                        s
+                        for s in index["set_names"]
+                        if s.startswith(PROMO_SET_PREFIX)
+                        and s != lead_match["card_set"]
+                    ]
+            lead_regions = set(leads.values())
+            locked_regions = []
+            locked_candidates = []
+            for i in detailed:
+                if i in lead_regions or screenshots is None:
+                    continue
+                lock_sets = locked.get(screenshots[i])
+                if lock_sets is None:
+                    continue
+                region_candidates = self._locked_candidates(
+                    candidates[i], lock_sets, index, cascade
+                )
+                if len(region_candidates):
+                    locked_regions.append(i)
+                    locked_candidates.append(region_candidates)
+            if locked_regions:
+                stage_started = time.perf_counter()
+                search(locked_regions, locked_candidates)
+                timings["locked slots"] = time.perf_counter() - stage_started
+
+                # Back to the wide search where the set looks wrong after all.
+                # The locked set is not always among a slot's candidates, so
+                # the wide match only replaces the locked one if it scores
+                # higher.
+                unlocked = [
                     i
-                    for i, m in enumerate(self.phash_metadata)
-                    if m[0] not in exclude_sets
+                    for i in locked_regions
+                    if not detailed_matches[i]
+                    or detailed_matches[i]["confidence"] < SET_LOCK_MIN_CONFIDENCE
                 ]
+                if unlocked:
+                    stage_started = time.perf_counter()
+                    for i, wide_match in zip(
+                        unlocked, find(unlocked, [candidates[i] for i in unlocked])
+                    ):
+                        locked_match = detailed_matches[i]
+                        if wide_match and (
+                            not locked_match
+                            or wide_match["confidence"] > locked_match["confidence"]
+                        ):
+                            detailed_matches[i] = wide_match
+                    timings["unlocked slots"] = time.perf_counter() - stage_started
+                logger.debug(
+                    f"Set lock: {len(locked)}/{len(leads)} screenshots locked; "
+                    f"lead slots {timings['lead slots'] / len(leads) * 1000:.2f}ms "
+                    f"per slot, {len(locked_regions)} locked slots "
+                    f"{timings['locked slots'] / len(locked_regions) * 1000:.2f}ms "
+                    f"per slot, {len(unlocked)} searched again unlocked"
+                )
+
+            remaining = [i for i in detailed if i not in detailed_matches]
+            if remaining:
+                stage_started = time.perf_counter()
+                search(remaining, [candidates[i] for i in remaining])
+                if leads:
+                    timings["other slots"] = time.perf_counter() - stage_started
+
+        best_matches = []
+        for i in range(count):
+            quick_best_match = quick_matches[i]
+            best_match = detailed_matches.get(i)
+            if i not in detailed_matches:
+                best_matches.append(quick_best_match)
+            # If detailed search found a better match or if we haven't found anything yet
+            elif best_match:
+                best_matches.append(best_match)
+            # Fallback to quick search result if detailed search failed but quick search had something
+            elif quick_best_match and quick_best_match["confidence"] > 0.2:
+                best_matches.append(quick_best_match)
             else:
-                indices = range(len(self.phash_metadata))
+                best_matches.append(None)
+
+        with self._stats_lock:
+            self.search_stats["slots"] += count
+            self.search_stats["templates"] += scored["templates"]
+        logger.debug(
+            f"Matched {count} card regions ({'cascade' if cascade else 'sets'}): "
+            + ", ".join(f"{stage} {t * 1000:.1f}ms" for stage, t in timings.items())
+            + f", {scored['templates'] / max(count, 1):.0f} templates per region"
+        )
+        return best_matches
 
-            if indices:
-                sub_matrix = self.phash_matrix[indices]
-                q_hash = region_hash.hash.flatten()
-                # Hamming distance: count non-matching bits
-                distances = np.count_nonzero(sub_matrix != q_hash, axis=1)
-                scores = 1.0 - (distances / 64.0)
+    def _search_sets(
+        self,
+        q_vecs: np.ndarray,
+        candidate_sets: List[List[str]],
+        index: Dict[str, Any],
+        scored: Dict[str, int],
+        positions: List[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Full-resolution correlation against every card of each region's candidate sets"""
+        if index["projection"] is not None:
+            return self._search_projected(q_vecs, candidate_sets, index, scored)
+
+        priors = self.pack_priors if self.match_options["pack_priors"] else None
+        if not priors or positions is None or index["quantized_vectors"] is not None:
+            best_matches, _ = self._score_sets(
+                q_vecs,
+                [[(s, None) for s in sets] for sets in candidate_sets],
+                index,
+                scored,
+            )
+            return best_matches
+
+        # Likely cards first: the candidate sets seen at the slot's position,
+        # and only their cards of the rarities seen there
+        searches = []
+        for sets, position in zip(candidate_sets, positions):
+            likely_sets = [s for s in sets if s in priors.sets.get(position, ())]
+            searches.append(
+                [(s, priors.rarities[position]) for s in likely_sets]
+                if likely_sets
+                else [(s, None) for s in sets]
+            )
+        best_matches, runners_up = self._score_sets(
+            q_vecs, searches, index, scored, runner_up=True
+        )
 
-                for i, score in enumerate(scores):
-                    meta_idx = indices[i]
-                    s_name, c_name = self.phash_metadata[meta_idx]
+        # Everything else only for the slots that match no likely card clearly
+        expand = [
+            n
+            for n, (best_match, runner_up, search) in enumerate(
+                zip(best_matches, runners_up, searches)
+            )
+            if search
+            and search[0][1] is not None
+            and (
+                best_match is None
+                or best_match["confidence"] < PRIOR_MIN_CONFIDENCE
+                or best_match["confidence"] - runner_up < PRIOR_MIN_MARGIN
+            )
+        ]
+        if expand:
+            found, _ = self._score_sets(
+                q_vecs[expand],
+                [[(s, None) for s in candidate_sets[n]] for n in expand],
+                index,
+                scored,
+            )
+            for n, best_match in zip(expand, found):
+                best_matches[n] = best_match
+        return best_matches
 
-                    if score > set_scores.get(s_name, 0):
-                        set_scores[s_name] = score
+    def _score_sets(
+        self,
+        q_vecs: np.ndarray,
+        searches: List[List[Tuple[str, frozenset]]],
+        index: Dict[str, Any],
+        scored: Dict[str, int],
+        runner_up: bool = False,
+    ) -> Tuple[List[Dict[str, Any]], List[float]]:
+        """
+        Best card per region among the (set, rarities) it searches
 
-                    if score > quick_best_score:
-                        quick_best_score = score
-                        quick_best_match = {
-                            "card_name": c_name,
-                            "card_set": s_name,
-                            "confidence": float(score),
-                        }
-        else:
-            # Fallback to slow loop if matrix not built (should not happen)
-            if force_set:
-                search_sets = [force_set]
+        rarities is None for all cards of the set. Rarity restrictions are
+        scored on the float32 vectors only.
+
+        Returns:
+            The best match per region, and with runner_up the best score of
+            any other card it was compared with (-1 when there was none)
+        """
+        template_vectors = index["template_vectors"]
+
+        # Gather every region that wants each set and score them together
+        set_rows = {}
+        for n, search in enumerate(searches):
+            for key in search:
+                set_rows.setdefault(key, []).append(n)
+
+        set_best = {}
+        for (search_set, rarities), rows in set_rows.items():
+            if search_set not in template_vectors:
+                continue
+
+            data = template_vectors[search_set]
+            if index["quantized_vectors"] is not None:
+                scored["templates"] += len(data["metadata"]) * len(rows)
+                for n, card_idx, max_val in zip(
+                    rows,
+                    *self._search_quantized_set(q_vecs[rows], search_set, index),
+                ):
+                    set_best[(n, search_set)] = (
+                        data["metadata"][card_idx],
+                        max_val,
+                        -1,
+                    )
+                continue
+
+            # Matrix-matrix multiplication for all cards in set and all
+            # regions at once. This computes normalized correlation
+            # (TM_CCOEFF_NORMED) because both sides are zero-centered and
+            # unit-normalized.
+            if rarities is None:
+                scores = data["matrix"] @ q_vecs[rows].T
+                cards = None
             else:
-                search_sets = [
-                    s
-                    for s in self.phash_templates.keys()
-                    if s not in (exclude_sets or [])
-                ]
+                runs = self._rarity_runs(search_set, rarities, index)
+                if not runs:
+                    continue
+                # One product per run of rows keeps the matrix slices views;
+                # with RARITY_ORDER a run usually covers several rarities
+                set_q_vecs = q_vecs[rows].T
+                scores = np.concatenate(
+                    [data["matrix"][start:stop] @ set_q_vecs for start, stop in runs]
+                )
+                cards = np.concatenate([np.arange(start, stop) for start, stop in runs])
+            scored["templates"] += len(scores) * len(rows)
+
+            max_idx = np.argmax(scores, axis=0)
+            columns = np.arange(len(rows))
+            max_vals = scores[max_idx, columns]
+            if runner_up and len(scores) > 1:
+                second_vals = np.partition(scores, -2, axis=0)[-2]
+            else:
+                second_vals = np.full(len(rows), -1, dtype=scores.dtype)
+            if cards is not None:
+                max_idx = cards[max_idx]
+            for n, card_idx, max_val, second_val in zip(
+                rows, max_idx, max_vals, second_vals
+            ):
+                set_best[(n, search_set)] = (
+                    data["metadata"][card_idx],
+                    max_val,
+                    second_val,
+                )
 
-            for set_name in search_sets:
-                if set_name not in self.phash_templates:
+        best_matches = []
+        runners_up = []
+        for n, search in enumerate(searches):
+            best_match = None
+            best_score = -1
+            second_score = -1
+            for search_set, _ in search:
+                if (n, search_set) not in set_best:
                     continue
+                card_name, max_val, second_val = set_best[(n, search_set)]
+                if max_val > best_score:
+                    second_score = max(second_score, best_score, second_val)
+                    best_score = max_val
+                    best_match = {
+                        "card_name": card_name,
+                        "card_set": search_set,
+                        "confidence": float(max_val),
+                    }
+                else:
+                    second_score = max(second_score, max_val)
+            best_matches.append(best_match)
+            runners_up.append(float(second_score))
+        return best_matches, runners_up
+
+    def _rarity_runs(
+        self, search_set: str, rarities: frozenset, index: Dict[str, Any]
+    ) -> Tuple[Tuple[int, int], ...]:
+        """(start, stop) runs of the set's template rows whose rarity is in rarities"""
+        key = (search_set, rarities)
+        runs = index["rarity_runs"].get(key)
+        if runs is None:
+            likely = [
+                self._card_rarity(card_name, search_set) in rarities
+                for card_name in index["template_vectors"][search_set]["metadata"]
+            ]
+            runs = []
+            for is_likely, group in itertools.groupby(
+                enumerate(likely), lambda x: x[1]
+            ):
+                group = list(group)
+                if is_likely:
+                    runs.append((group[0][0], group[-1][0] + 1))
+            runs = tuple(runs)
+            index["rarity_runs"][key] = runs
+        return runs
+
+    def _search_projected(
+        self,
+        q_vecs: np.ndarray,
+        candidate_sets: List[List[str]],
+        index: Dict[str, Any],
+        scored: Dict[str, int],
+    ) -> List[Dict[str, Any]]:
+        """
+        Match each region against its candidate sets in the PCA space
 
-                cards = self.phash_templates[set_name]
-                for card_name, template_hash in cards.items():
-                    # Hamming distance: lower is better. Max distance is 64 for 8x8 hash.
-                    distance = region_hash - template_hash
-                    # Convert to a confidence-like score (0 to 1)
-                    score = 1.0 - (distance / 64.0)
-
-                    if score > set_scores.get(set_name, 0):
-                        set_scores[set_name] = score
-
-                    if score > quick_best_score:
-                        quick_best_score = score
-                        quick_best_match = {
-                            "card_name": card_name,
-                            "card_set": set_name,
-                            "confidence": score,
-                        }
+        Only the projected winner, or the closest few when the top two are
+        within projection_margin, are re-scored at full resolution.
+        """
+        phash_metadata = index["phash_metadata"]
+        embeddings = index["embeddings"]
+        vectors = index["vectors"]
+        margin = self.match_options["projection_margin"]
+        q_projected = q_vecs @ index["projection"]
+
+        best_matches = []
+        for q_vec, q_low, sets in zip(q_vecs, q_projected, candidate_sets):
+            ranges = [index["set_ranges"][s] for s in sets if s in index["set_ranges"]]
+            if not ranges:
+                best_matches.append(None)
+                continue
+            rows = np.concatenate([np.arange(start, stop) for start, stop in ranges])
+            scores = embeddings[rows] @ q_low
+            scored["templates"] += len(rows)
+
+            keep = min(RESCORE_CANDIDATES, len(rows))
+            top = np.argsort(-scores, kind="stable")[:keep]
+            if len(top) > 1 and scores[top[0]] - scores[top[1]] >= margin:
+                top = top[:1]
+            exact = vectors[rows[top]] @ q_vec
+            best = np.argmax(exact)
+            s_name, c_name = phash_metadata[rows[top[best]]]
+            best_matches.append(
+                {
+                    "card_name": c_name,
+                    "card_set": s_name,
+                    "confidence": float(exact[best]),
+                }
+            )
+        return best_matches
 
-        # Optimization: If quick search is extremely confident, skip detailed search
-        # Only if not forced to do a detailed search
-        CONFIDENCE_THRESHOLD = 0.92  # Increased threshold for higher certainty
-        if (
-            not force_detailed
-            and quick_best_match
-            and quick_best_match["confidence"] >= CONFIDENCE_THRESHOLD
-        ):
-            logger.debug(
-                f"Quick search extremely confident ({quick_best_match['confidence']:.3f}), skipping detailed search"
+    def _search_quantized_set(
+        self, q_vecs: np.ndarray, search_set: str, index: Dict[str, Any]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Best card of one set per region using the quantized matrix
+
+        The best RESCORE_CANDIDATES cards by approximate score are re-scored
+        against the float32 vectors, so the winner and its confidence are
+        exact whenever the true best card makes that cut.
+
+        Returns:
+            Card index within the set and float32 score, per region
+        """
+        start, stop = index["set_ranges"][search_set]
+        scores = self._quantized_scores(
+            index["quantized_vectors"][start:stop],
+            index["quantized_scales"][start:stop],
+            q_vecs,
+        )
+
+        keep = min(RESCORE_CANDIDATES, len(scores))
+        if keep < len(scores):
+            top = np.argpartition(-scores, keep - 1, axis=0)[:keep]
+        else:
+            top = np.broadcast_to(np.arange(len(scores))[:, np.newaxis], scores.shape)
+        top = np.sort(top, axis=0)
+
+        candidates = np.unique(top)
+        exact = index["vectors"][start + candidates] @ q_vecs.T
+        positions = np.searchsorted(candidates, top)
+        exact_top = np.take_along_axis(exact, positions, axis=0)
+
+        best = np.argmax(exact_top, axis=0)
+        columns = np.arange(len(q_vecs))
+        return top[best, columns], exact_top[best, columns]
+
+    def _search_shortlist(
+        self,
+        q_vecs: np.ndarray,
+        candidate_rows: List[np.ndarray],
+        index: Dict[str, Any],
+        timings: Dict[str, float],
+        scored: Dict[str, int],
+    ) -> List[Dict[str, Any]]:
+        """
+        Cascade detailed search over each region's top pHash template rows
+
+        The candidates are scored at low resolution first; only the best
+        shortlist of them is correlated at full resolution.
+        """
+        phash_metadata = index["phash_metadata"]
+        shortlist_size = self.match_options["shortlist"]
+        margin = self.match_options["margin"]
+
+        stage_started = time.perf_counter()
+        low_res_vectors = index["low_res_vectors"]
+        shortlists = []
+        for q_low, rows in zip(self._downsample_vectors(q_vecs), candidate_rows):
+            if not len(rows):
+                shortlists.append(rows)
+                continue
+            scores = low_res_vectors[rows] @ q_low
+            scored["templates"] += len(rows)
+            keep = np.argsort(-scores, kind="stable")[:shortlist_size]
+            keep = keep[scores[keep] >= scores[keep[0]] - margin]
+            shortlists.append(rows[keep])
+        timings["low-res"] = (
+            timings.get("low-res", 0.0) + time.perf_counter() - stage_started
+        )
+
+        stage_started = time.perf_counter()
+        vectors = index["vectors"]
+        best_matches = []
+        for q_vec, rows in zip(q_vecs, shortlists):
+            if not len(rows):
+                best_matches.append(None)
+                continue
+            # Same normalized correlation as the "sets" strategy, on the
+            # shortlisted rows only
+            scores = vectors[rows] @ q_vec
+            best = np.argmax(scores)
+            s_name, c_name = phash_metadata[rows[best]]
+            best_matches.append(
+                {
+                    "card_name": c_name,
+                    "card_set": s_name,
+                    "confidence": float(scores[best]),
+                }
             )
-            return quick_best_match
+        timings["full-res"] = (
+            timings.get("full-res", 0.0) + time.perf_counter() - stage_started
+        )
+        return best_matches
+
+    def match_slot_embeddings(
+        self,
+        phashes: np.ndarray,
+        vectors: np.ndarray,
+        scales: np.ndarray,
+        force_sets: List[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Re-score stored slot embeddings against the loaded templates
 
-        # Stage 2: Detailed search at full resolution
-        # Determine candidate sets from quick search
+        Candidate sets come from the pHashes as in recognition. Within them the
+        slots are compared with the templates at low resolution, the
+        resolution the embeddings are kept at, so confidences run a little
+        higher than full-resolution ones.
+
+        Args:
+            phashes: uint64 slot pHashes
+            vectors: int8 low-resolution slot vectors, one row per slot
+            scales: float32 scale per row of vectors
+            force_sets: Optional per-slot set to search within
+
+        Returns:
+            List[Dict]: Best match (card_name, card_set, confidence) per slot,
+            or None where no set was eligible
+        """
+        index = self._index
+        if index["phashes"] is None:
+            raise RuntimeError(
+                "Card templates not loaded. Call load_card_templates() first."
+            )
+        low_res_vectors = index["low_res_vectors"]
+        if low_res_vectors is None:
+            cached = self._low_res_cache
+            if cached is None or cached[0] is not index:
+                cached = (index, self._downsample_vectors(index["vectors"]))
+                self._low_res_cache = cached
+            low_res_vectors = cached[1]
+
+        phash_metadata = index["phash_metadata"]
+        count = len(phashes)
+        if force_sets is None:
+            force_sets = [None] * count
+
+        best_matches = []
+        for block_start in range(0, count, 4096):
+            block = slice(block_start, min(block_start + 4096, count))
+            block_hashes = np.asarray(phashes[block], dtype=np.uint64)
+            block_sets = force_sets[block]
+            q_vecs = np.asarray(vectors[block], dtype=np.float32)
+            q_vecs *= np.asarray(scales[block], dtype=np.float32)[:, np.newaxis]
+
+            # Candidate sets from the pHashes, one search per forced set
+            rows_by_set = {}
+            for force_set in set(block_sets):
+                rows = [i for i, s in enumerate(block_sets) if s == force_set]
+                search = self._search_phashes(
+                    block_hashes[rows], force_set=force_set, index=index
+                )
+                if search is None:
+                    continue
+                for n, i in enumerate(rows):
+                    set_scores = {
+                        s_name: float(score)
+                        for s_name, score in zip(
+                            index["set_names"], search["set_scores"][n]
+                        )
+                        if score > 0
+                    }
+                    for s_name in self._candidate_sets(set_scores, force_set):
+                        rows_by_set.setdefault(s_name, []).append(i)
+
+            # One low-resolution product per candidate set
+            best_scores = np.full(len(q_vecs), -np.inf, dtype=np.float32)
+            best_rows = np.full(len(q_vecs), -1, dtype=np.intp)
+            for s_name, rows in rows_by_set.items():
+                if s_name not in index["set_ranges"]:
+                    continue
+                start, stop = index["set_ranges"][s_name]
+                rows = np.array(rows, dtype=np.intp)
+                scores = q_vecs[rows] @ low_res_vectors[start:stop].T
+                best = np.argmax(scores, axis=1)
+                best_score = scores[np.arange(len(rows)), best]
+                better = best_score > best_scores[rows]
+                best_scores[rows[better]] = best_score[better]
+                best_rows[rows[better]] = start + best[better]
+
+            for row, score in zip(best_rows, best_scores):
+                if row < 0:
+                    best_matches.append(None)
+                    continue
+                s_name, c_name = phash_metadata[row]
+                best_matches.append(
+                    {
+                        "card_name": c_name,
+                        "card_set": s_name,
+                        "confidence": float(score),
+                    }
+                )
+        return best_matches
+
+    @staticmethod
+    def _locked_candidates(
+        candidates, lock_sets: List[str], index: Dict[str, Any], cascade: bool
+    ):
+        """
+        A region's candidate sets, or cascade template rows, narrowed to the
+        locked set (lock_sets[0]) and those of the other lock_sets that were
+        already candidates
+        """
+        if not cascade:
+            return [s for s in lock_sets if s == lock_sets[0] or s in candidates]
+        keep = np.zeros(len(candidates), dtype=bool)
+        for set_name in lock_sets:
+            if set_name in index["set_ranges"]:
+                start, stop = index["set_ranges"][set_name]
+                keep |= (candidates >= start) & (candidates < stop)
+        return candidates[keep]
+
+    @staticmethod
+    def _candidate_sets(set_scores: Dict[str, float], force_set: str = None) -> list:
+        """Sets worth a detailed search, given each set's best pHash score"""
         candidate_sets = []
         if force_set:
             candidate_sets = [force_set]
@@ -677,86 +2501,7 @@ class ImageProcessor:
                 # Cap at 5 sets to maintain performance
                 if len(candidate_sets) >= 5:
                     break
-
-        # Upscale card region to match matching resolution for detailed matching
-        upscaled_region = cv2.resize(card_region, (self.match_width, self.match_height))
-
-        # Normalize query region for correlation
-        q_vec = upscaled_region.astype(np.float32).flatten()
-        q_vec -= np.mean(q_vec)
-        q_norm = np.linalg.norm(q_vec)
-        if q_norm > 0:
-            q_vec /= q_norm
-
-        # Detailed search in candidate sets
-        for search_set in candidate_sets:
-            if search_set not in self.template_vectors:
-                # Fallback if vectorized data not available
-                if (
-                    search_set in self.color_templates
-                    and self.color_templates[search_set]
-                ):
-                    for card_name, template_color in self.color_templates[
-                        search_set
-                    ].items():
-                        try:
-                            # Resize template if it doesn't match
-                            if template_color.shape[:2][::-1] != (
-                                self.match_width,
-                                self.match_height,
-                            ):
-                                template_color = cv2.resize(
-                                    template_color,
-                                    (self.match_width, self.match_height),
-                                )
-
-                            result = cv2.matchTemplate(
-                                upscaled_region,
-                                template_color,
-                                cv2.TM_CCOEFF_NORMED,
-                            )
-                            _, max_val, _, _ = cv2.minMaxLoc(result)
-
-                            if max_val > best_score:
-                                best_score = max_val
-                                best_match = {
-                                    "card_name": card_name,
-                                    "card_set": search_set,
-                                    "confidence": float(max_val),
-                                }
-                        except cv2.error:
-                            continue
-                continue
-
-            data = self.template_vectors[search_set]
-            matrix = data["matrix"]
-            metadata = data["metadata"]
-
-            # Matrix-vector multiplication for all cards in set
-            # This computes normalized correlation (TM_CCOEFF_NORMED)
-            # because both matrix and q_vec are zero-centered and unit-normalized.
-            scores = matrix @ q_vec
-
-            max_idx = np.argmax(scores)
-            max_val = scores[max_idx]
-
-            if max_val > best_score:
-                best_score = max_val
-                best_match = {
-                    "card_name": metadata[max_idx],
-                    "card_set": search_set,
-                    "confidence": float(max_val),
-                }
-
-        # If detailed search found a better match or if we haven't found anything yet
-        if best_match:
-            return best_match
-
-        # Fallback to quick search result if detailed search failed but quick search had something
-        if quick_best_match and quick_best_match["confidence"] > 0.2:
-            return quick_best_match
-
-        return None
+        return candidate_sets
 
     def get_template_count(self) -> int:
         """
@@ -765,11 +2510,7 @@ class ImageProcessor:
         Returns:
             int: Number of loaded card templates
         """
-        # Count templates across all sets
-        count = 0
-        for set_name, cards in self.phash_templates.items():
-            count += len(cards)
-        return count
+        return len(self.phash_metadata)
 
     def get_loaded_template_codes(self) -> List[str]:
         """
@@ -778,9 +2519,239 @@ class ImageProcessor:
         Returns:
             List[str]: List of card codes for loaded templates
         """
-        # Collect all card codes from all sets
-        codes = []
-        for set_name, cards in self.phash_templates.items():
-            for card_name in cards.keys():
-                codes.append(f"{set_name}_{card_name}")
-        return codes
+        return [
+            f"{set_name}_{card_name}" for set_name, card_name in self.phash_metadata
+        ]
+
+
+_shared_processors = {}
+_shared_processors_lock = threading.Lock()
+
+
+def get_shared_processor(
+    card_imgs_dir: str, match_options: Dict[str, Any] = None
+) -> ImageProcessor:
+    """
+    Long-lived ImageProcessor for card_imgs_dir, shared by every job
+
+    The first call loads the templates; later calls refresh them, which only
+    costs a directory scan unless card art was added. A processor with other
+    match options replaces the shared one.
+    """
+    key = os.path.abspath(card_imgs_dir)
+    options = {**DEFAULT_MATCH_OPTIONS, **(match_options or {})}
+    with _shared_processors_lock:
+        processor = _shared_processors.get(key)
+        if processor is not None and processor.match_options == options:
+            processor.refresh_templates()
+            return processor
+        processor = ImageProcessor(card_imgs_dir, match_options=options)
+        _shared_processors[key] = processor
+        return processor
+
+
+class SharedTemplateIndex:
+    """
+    Publishes an ImageProcessor's template index through shared memory
+
+    The packed pHashes and the template matrices are copied once into
+    multiprocessing.shared_memory blocks. Worker processes attach to the blocks
+    by name and wrap them in numpy arrays, so none of them decode card art or
+    hold a private copy of the matrices.
+    """
+
+    def __init__(self, processor: ImageProcessor):
+        self._blocks = []
+        index = processor._index
+        self.descriptor = {
+            "card_imgs_dir": str(processor.card_imgs_dir),
+            "match_options": processor.match_options,
+            "pack_priors": processor.pack_priors,
+            "phashes": self._publish(index["phashes"]),
+            "phash_metadata": index["phash_metadata"],
+            "vectors": None,
+            "vectors_file": None,
+            "low_res_vectors": (
+                self._publish(index["low_res_vectors"])
+                if index["low_res_vectors"] is not None
+                else None
+            ),
+            "quantized_vectors": None,
+            "quantized_scales": None,
+            "projection": None,
+            "embeddings": None,
+        }
+        if index["projection"] is not None:
+            self.descriptor["projection"] = self._publish(index["projection"])
+            self.descriptor["embeddings"] = self._publish(index["embeddings"])
+        if index["quantized_vectors"] is not None:
+            # Workers scan the quantized copy; the float32 rows they re-score
+            # are read from the memory-mapped template pack when there is one.
+            self.descriptor["quantized_vectors"] = self._publish(
+                index["quantized_vectors"]
+            )
+            self.descriptor["quantized_scales"] = self._publish(
+                index["quantized_scales"]
+            )
+            if isinstance(index["vectors"], np.memmap):
+                self.descriptor["vectors_file"] = index["vectors"].filename
+        if self.descriptor["vectors_file"] is None:
+            self.descriptor["vectors"] = self._publish(index["vectors"])
+
+    def _publish(self, array: np.ndarray) -> Tuple[str, tuple, str]:
+        """Copy an array into a new shared memory block"""
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        self._blocks.append(block)
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+        view[...] = array
+        return block.name, array.shape, array.dtype.str
+
+    def close(self):
+        """Release the shared memory blocks"""
+        for block in self._blocks:
+            try:
+                block.close()
+                block.unlink()
+            except FileNotFoundError:
+                pass
+        self._blocks = []
+
+
+# Per-process state for the recognition worker processes
+_worker_processor = None
+_worker_blocks = []
+
+
+def _attach_shared_array(spec: Tuple[str, tuple, str]) -> np.ndarray:
+    name, shape, dtype = spec
+    if sys.version_info >= (3, 13):
+        # The parent owns the block and unlinks it on shutdown
+        block = shared_memory.SharedMemory(name=name, track=False)
+    else:
+        # Spawned workers share the parent's resource tracker, so this
+        # registration is cleared by the parent's unlink.
+        block = shared_memory.SharedMemory(name=name)
+    _worker_blocks.append(block)
+    array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    array.setflags(write=False)
+    return array
+
+
+def _init_recognition_process(descriptor: Dict[str, Any]):
+    """ProcessPoolExecutor initializer: attach to the published templates"""
+    global _worker_processor
+
+    def attach(key):
+        spec = descriptor[key]
+        return _attach_shared_array(spec) if spec else None
+
+    if descriptor["vectors_file"]:
+        vectors = np.load(descriptor["vectors_file"], mmap_mode="r")
+    else:
+        vectors = attach("vectors")
+    index = ImageProcessor._build_index(
+        attach("phashes"),
+        descriptor["phash_metadata"],
+        vectors,
+        attach("low_res_vectors"),
+        attach("quantized_vectors"),
+        attach("quantized_scales"),
+        attach("projection"),
+        attach("embeddings"),
+    )
+    _worker_processor = ImageProcessor(
+        descriptor["card_imgs_dir"],
+        index=index,
+        match_options=descriptor["match_options"],
+    )
+    _worker_processor.pack_priors = descriptor["pack_priors"]
+
+
+def _recognize_in_process(image_path: str, force_set: str = None):
+    return _worker_processor.process_screenshot(image_path, force_set=force_set)
+
+
+def _recognize_batch_in_process(image_paths: List[str], force_sets: List[str]):
+    return _worker_processor.process_screenshots(image_paths, force_sets)
+
+
+def _match_batch_in_process(
+    screenshots: List[np.ndarray], force_sets: List[str], labels: List[str]
+):
+    return _worker_processor.match_screenshots(screenshots, force_sets, labels)
+
+
+def _match_encoded_batch_in_process(
+    datas: List[bytes], force_sets: List[str], labels: List[str]
+):
+    return _worker_processor.match_encoded_screenshots(datas, force_sets, labels)
+
+
+class ProcessPoolRecognizer:
+    """
+    Recognition backend that runs process_screenshot in worker processes
+
+    Exposes the same process_screenshot(s)/match_(encoded_)screenshots/
+    get_template_count interface as ImageProcessor so callers can use either
+    one. Decoding and pHashing run outside the GIL of the calling process;
+    match_encoded_screenshots also keeps the IPC down to the encoded files.
+    """
+
+    def __init__(self, processor: ImageProcessor, max_workers: int):
+        self._processor = processor
+        self._shared = SharedTemplateIndex(processor)
+        try:
+            # spawn avoids forking a process that is running Qt threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_recognition_process,
+                initargs=(self._shared.descriptor,),
+            )
+        except Exception:
+            self._shared.close()
+            raise
+
+    def process_screenshot(
+        self, image_path: str, force_set: str = None
+    ) -> List[Dict[str, Any]]:
+        return self._executor.submit(
+            _recognize_in_process, str(image_path), force_set
+        ).result()
+
+    def process_screenshots(
+        self, image_paths: List[str], force_sets: List[str] = None
+    ) -> List[List[Dict[str, Any]]]:
+        return self._executor.submit(
+            _recognize_batch_in_process, [str(p) for p in image_paths], force_sets
+        ).result()
+
+    def match_screenshots(
+        self,
+        screenshots: List[np.ndarray],
+        force_sets: List[str] = None,
+        labels: List[str] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        return self._executor.submit(
+            _match_batch_in_process, screenshots, force_sets, labels
+        ).result()
+
+    def match_encoded_screenshots(
+        self,
+        datas: List[bytes],
+        force_sets: List[str] = None,
+        labels: List[str] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        return self._executor.submit(
+            _match_encoded_batch_in_process, datas, force_sets, labels
+        ).result()
+
+    def get_template_count(self) -> int:
+        return self._processor.get_template_count()
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        """Stop the worker processes and release the shared templates"""
+        try:
+            self._executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+        finally:
+            self._shared.close()
@@ -45,11 +45,14 @@ from app.dialogs import (
     CardImageDialog,
     AccountCardListDialog,
     PreferencesDialog,
+    RematchScreenshotsDialog,
 )
 
 from app.workers import (
     CSVImportWorker,
     ScreenshotProcessingWorker,
+    ScreenshotRematchWorker,
+    REMATCH_CONFIDENCE,
     CardDataLoadWorker,
     CardArtDownloadWorker,
     VersionCheckWorker,
@@ -390,6 +393,11 @@ class MainWindow(QMainWindow):
         process_action.triggered.connect(self._on_process_screenshots)
         file_menu.addAction(process_action)
 
+        # Re-match Screenshots action
+        rematch_action = QAction(self.tr("Re-&match Screenshots"), self)
+        rematch_action.triggered.connect(self._on_rematch_screenshots)
+        file_menu.addAction(rematch_action)
+
         # Combined import action
         self.load_new_data_action = QAction(self.tr("&Load New Data"), self)
         self.load_new_data_action.triggered.connect(self._on_load_new_data)
@@ -2059,42 +2067,90 @@ class MainWindow(QMainWindow):
             worker = ScreenshotProcessingWorker(
                 directory_path=directory_path, overwrite=overwrite, task_id=task_id
             )
+            self._start_screenshot_worker(worker, task_id)
 
-            # Connect signals with task_id and worker
-            worker.signals.progress.connect(
-                lambda c, t, tid=task_id: self._on_screenshot_processing_progress(
-                    c, t, tid
-                )
-            )
-            worker.signals.status.connect(self._on_screenshot_processing_status)
-            worker.signals.result.connect(
-                lambda r, tid=task_id: self._on_screenshot_processing_result(r, tid)
+            self._update_status_message(
+                self.tr("Screenshot processing started in background")
             )
-            worker.signals.error.connect(
-                lambda e, tid=task_id: self._on_screenshot_processing_error(e, tid)
+
+        except Exception as e:
+            print(f"Error starting screenshot processing worker: {e}")
+            self._update_status_message(
+                self.tr("Error starting screenshot processing: %1").replace(
+                    "%1", str(e)
+                )
             )
-            worker.signals.finished.connect(
-                lambda w=worker: self._on_screenshot_processing_finished(w)
+
+    def _start_screenshot_worker(
+        self, worker: ScreenshotProcessingWorker, task_id: str
+    ):
+        """Wire a screenshot processing worker to the Processing tab and start it"""
+        # Connect signals with task_id and worker
+        worker.signals.progress.connect(
+            lambda c, t, tid=task_id: self._on_screenshot_processing_progress(c, t, tid)
+        )
+        worker.signals.status.connect(self._on_screenshot_processing_status)
+        worker.signals.result.connect(
+            lambda r, tid=task_id: self._on_screenshot_processing_result(r, tid)
+        )
+        worker.signals.error.connect(
+            lambda e, tid=task_id: self._on_screenshot_processing_error(e, tid)
+        )
+        worker.signals.finished.connect(
+            lambda w=worker: self._on_screenshot_processing_finished(w)
+        )
+
+        # Store worker for cancellation
+        self.active_workers.append(worker)
+
+        # Start worker
+        self.thread_pool.start(worker)
+
+        # Update task status and dashboard
+        self._update_task_status(task_id, "Running")
+        self._request_dashboard_update()
+
+    def _on_rematch_screenshots(self):
+        """Handle Re-match Screenshots action"""
+        screenshots_dir = self.settings.get_setting("General/screenshots_dir", "")
+        if not screenshots_dir or not os.path.isdir(screenshots_dir):
+            QMessageBox.warning(
+                self,
+                self.tr("Missing Screenshots Directory"),
+                self.tr(
+                    "Re-matching needs the screenshots directory. Process screenshots "
+                    "once or set it under File -> Preferences."
+                ),
             )
+            return
 
-            # Store worker for cancellation
-            self.active_workers.append(worker)
+        dialog = RematchScreenshotsDialog(self, default_confidence=REMATCH_CONFIDENCE)
+        dialog.rematch_started.connect(self._on_rematch_started)
+        dialog.exec()
 
-            # Start worker
-            self.thread_pool.start(worker)
+    def _on_rematch_started(self, selection: dict):
+        """Create and start a re-match worker for the selected screenshots"""
+        screenshots_dir = self.settings.get_setting("General/screenshots_dir", "")
+        try:
+            task_id = get_task_id()
+            self._add_processing_task(task_id, self.tr("Re-match Screenshots"))
 
-            # Update task status and dashboard
-            self._update_task_status(task_id, "Running")
-            self._request_dashboard_update()
+            worker = ScreenshotRematchWorker(
+                directory_path=screenshots_dir,
+                sets=selection.get("sets"),
+                max_confidence=selection.get("max_confidence"),
+                missing_cards=selection.get("missing_cards", False),
+                task_id=task_id,
+            )
+            self._start_screenshot_worker(worker, task_id)
 
             self._update_status_message(
-                self.tr("Screenshot processing started in background")
+                self.tr("Screenshot re-matching started in background")
             )
-
         except Exception as e:
-            print(f"Error starting screenshot processing worker: {e}")
+            logger.error(f"Error starting screenshot re-matching: {e}")
             self._update_status_message(
-                self.tr("Error starting screenshot processing: %1").replace(
+                self.tr("Error starting screenshot re-matching: %1").replace(
                     "%1", str(e)
                 )
             )
@@ -2126,6 +2182,30 @@ class MainWindow(QMainWindow):
             )
             if task_id:
                 self._update_task_status(task_id, "Completed", progress=100)
+
+            # Re-evaluate screenshots of the sets that gained card art and
+            # that matched poorly without it
+            new_set_ids = result.get("new_set_ids") if isinstance(result, dict) else []
+            screenshots_dir = self.settings.get_setting("General/screenshots_dir", "")
+            if (
+                new_set_ids
+                and screenshots_dir
+                and os.path.isdir(screenshots_dir)
+                and not any(
+                    isinstance(w, ScreenshotProcessingWorker)
+                    for w in self.active_workers
+                )
+            ):
+                from app.db.models import Screenshot
+
+                if Screenshot.objects.filter(processed=True).exists():
+                    self._on_rematch_started(
+                        {
+                            "sets": new_set_ids,
+                            "max_confidence": REMATCH_CONFIDENCE,
+                            "missing_cards": True,
+                        }
+                    )
         except Exception:
             self._update_status_message(self.tr("Card art download complete"))
             if task_id:
@@ -0,0 +1,204 @@
+"""
+Card Counter Slot Embeddings Module
+
+Sidecar storage for the features each recognized card slot was matched with:
+its pHash and its low-resolution normalized region vector. With these the
+whole collection can be re-scored against new card art or thresholds without
+decoding the screenshots again.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CHUNK_PREFIX = "slots-"
+CHUNK_SUFFIX = ".npz"
+
+
+class SlotEmbeddingStore:
+    """
+    Append-only store of per-slot pHashes and int8 region vectors
+
+    Every append() writes one chunk file of parallel arrays: screenshot name,
+    slot position, pHash, int8 vector and the vector's scale, along with the
+    names of the screenshots whose results the chunk replaces. load() reads
+    all chunks in the order they were written, drops the slots of replaced
+    screenshots from earlier chunks and keeps the latest record per
+    (screenshot, position), so re-processed screenshots replace all their
+    old slots, including those that no longer match. compact() folds the
+    chunks into one.
+    """
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+        self._lock = threading.Lock()
+
+    def _chunk_files(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        # Chunk names start with a nanosecond timestamp of the same width,
+        # so name order is write order
+        return sorted(
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.startswith(CHUNK_PREFIX) and name.endswith(CHUNK_SUFFIX)
+        )
+
+    def chunk_count(self) -> int:
+        return len(self._chunk_files())
+
+    def append(
+        self,
+        records: List[Tuple[str, int, int, np.ndarray, float]],
+        replaced: Iterable[str] = (),
+    ) -> int:
+        """
+        Write one chunk of (screenshot name, position, pHash, int8 vector,
+        scale) records
+
+        Args:
+            records: The slots to store
+            replaced: Screenshots whose earlier slots are all superseded,
+                e.g. because their results were stored again (with or
+                without records of their own in this chunk)
+
+        Returns:
+            int: Number of records written
+        """
+        arrays = {}
+        replaced = sorted(set(replaced))
+        if replaced:
+            arrays["replaced"] = np.array(replaced, dtype=str)
+        if records:
+            names, positions, phashes, vectors, scales = zip(*records)
+            arrays.update(
+                {
+                    "names": np.array(names, dtype=str),
+                    "positions": np.array(positions, dtype=np.uint8),
+                    "phashes": np.array(phashes, dtype=np.uint64),
+                    "vectors": np.stack(vectors).astype(np.int8, copy=False),
+                    "scales": np.array(scales, dtype=np.float32),
+                }
+            )
+        if arrays:
+            self._write_chunk(arrays)
+        return len(records)
+
+    def _write_chunk(self, arrays: Dict[str, np.ndarray]) -> str:
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            chunk_file = os.path.join(
+                self.directory,
+                f"{CHUNK_PREFIX}{time.time_ns():020d}-{os.getpid()}{CHUNK_SUFFIX}",
+            )
+            temp_file = chunk_file + f".{threading.get_ident()}.tmp"
+            with open(temp_file, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(temp_file, chunk_file)
+            return chunk_file
+
+    def load(self) -> Dict[str, np.ndarray]:
+        """
+        Read every stored slot
+
+        Returns:
+            Dict with "names", "positions", "phashes", "vectors" (int8) and
+            "scales" arrays, one row per (screenshot, position), or None if
+            nothing is stored
+        """
+        chunks = []
+        # Chunk number each screenshot's results were last replaced in
+        replaced_in = {}
+        for chunk_file in self._chunk_files():
+            try:
+                with np.load(chunk_file) as data:
+                    chunk = {key: data[key] for key in data.files}
+            except Exception as e:
+                logger.error(f"Failed to load slot embeddings from {chunk_file}: {e}")
+                continue
+            for name in chunk.pop("replaced", ()):
+                replaced_in[str(name)] = len(chunks)
+            chunk["chunk_numbers"] = np.full(len(chunk.get("names", ())), len(chunks))
+            chunks.append(chunk)
+        chunks = [chunk for chunk in chunks if "vectors" in chunk]
+        if not chunks:
+            return None
+
+        widths = {chunk["vectors"].shape[1] for chunk in chunks}
+        if len(widths) > 1:
+            # Written by a different matching resolution; keep the newest
+            width = chunks[-1]["vectors"].shape[1]
+            logger.warning(
+                f"Ignoring slot embeddings with a vector size other than {width}"
+            )
+            chunks = [chunk for chunk in chunks if chunk["vectors"].shape[1] == width]
+
+        slots = {
+            key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]
+        }
+
+        # Drop slots written before their screenshot's results were replaced
+        if replaced_in:
+            cutoffs = np.array(
+                [replaced_in.get(name, -1) for name in slots["names"].tolist()]
+            )
+            current = slots.pop("chunk_numbers") >= cutoffs
+            slots = {key: values[current] for key, values in slots.items()}
+            if not len(slots["names"]):
+                return None
+        else:
+            del slots["chunk_numbers"]
+
+        # Latest record wins: first occurrence of each key in reversed order
+        keys = np.rec.fromarrays(
+            [slots["names"][::-1], slots["positions"][::-1]], names="name,position"
+        )
+        _, first = np.unique(keys, return_index=True)
+        keep = np.sort(len(keys) - 1 - first)
+        return {key: values[keep] for key, values in slots.items()}
+
+    def compact(self) -> int:
+        """
+        Rewrite all chunks as one, dropping superseded records and the slots
+        the database no longer has a card for
+
+        Returns:
+            int: Number of slots kept
+        """
+        from app.db.models import ScreenshotCard
+
+        old_chunks = self._chunk_files()
+        if len(old_chunks) < 2:
+            return 0
+        slots = self.load()
+        if slots is not None:
+            stored = set(
+                ScreenshotCard.objects.values_list(
+                    "screenshot__name", "position"
+                ).iterator(chunk_size=5000)
+            )
+            keep = np.array(
+                [
+                    (name, position) in stored
+                    for name, position in zip(
+                        slots["names"].tolist(), slots["positions"].tolist()
+                    )
+                ],
+                dtype=bool,
+            )
+            slots = {key: values[keep] for key, values in slots.items()}
+        kept = 0 if slots is None else len(slots["names"])
+        if kept:
+            self._write_chunk(slots)
+        for chunk_file in old_chunks:
+            try:
+                os.remove(chunk_file)
+            except OSError:
+                pass
+        return kept
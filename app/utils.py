@@ -9,6 +9,7 @@ Utility functions for the Card Counter application including:
 """
 
 import os
+import hashlib
 import logging
 import tomllib
 import json
@@ -30,6 +31,18 @@ DEFAULT_SETTINGS = {
     "Screenshots/check_interval": 5,
     "Logging/enabled": False,
     "Debug/max_cores": 0,
+    "Debug/recognition_backend": "threads",
+    "Debug/match_strategy": "sets",
+    "Debug/cascade_top_k": 64,
+    "Debug/cascade_shortlist": 8,
+    "Debug/cascade_margin": 0.1,
+    "Debug/template_precision": "float32",
+    "Debug/projection_dims": 0,
+    "Debug/projection_margin": 0.05,
+    "Debug/slot_embeddings": False,
+    "Debug/screenshot_decoder": "pil",
+    "Debug/pack_priors": False,
+    "Debug/set_lock": True,
 }
 
 # Order in which sections should be displayed in the Preferences dialog
@@ -191,6 +204,16 @@ def extract_screenshot_date(filename: str):
         return None
 
 
+def screenshot_data_hash(data: bytes) -> str:
+    """
+    Fast hash of a screenshot file's contents.
+
+    Identical screenshots hash the same whatever they are named, so the hash
+    identifies both unchanged files and copies saved under other names.
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
 def _get_skipped_screenshots_path():
     return BASE_DIR / "data" / "skipped_screenshots.json"
 
@@ -306,6 +329,11 @@ class PortableSettings:
                 return int(value)
             except (ValueError, TypeError):
                 return default
+        if isinstance(default, float) and not isinstance(value, float):
+            try:
+                return float(value)
+            except (ValueError, TypeError):
+                return default
 
         return value
 
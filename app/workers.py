@@ -9,14 +9,16 @@ from PyQt6.QtCore import QRunnable, pyqtSignal, QObject, QCoreApplication
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 import os
+import re
 import csv
 import time
+import queue
 import logging
 import threading
 
 
-from django.db.models import Count, Q
-from django.db.models.functions import Lower
+from django.db.models import Case, Count, F, Max, Q, Value, When
+from django.db.models.functions import Coalesce, Greatest, Lower
 
 from app.utils import (
     PortableSettings,
@@ -24,10 +26,50 @@ from app.utils import (
     extract_screenshot_date,
     load_skipped_screenshots,
     record_skipped_screenshots,
+    screenshot_data_hash,
 )
 
 from django.db import transaction
 
+# Screenshots handed to one recognition call; their card slots are matched
+# together, which is cheaper than matching each screenshot on its own.
+RECOGNITION_BATCH_SIZE = 8
+
+# Recognition results are written by a single thread, up to WRITE_BATCH_SIZE
+# screenshots per transaction. Recognition threads block once
+# WRITE_QUEUE_SIZE results are waiting to be written.
+WRITE_BATCH_SIZE = 200
+WRITE_QUEUE_SIZE = 1000
+
+# Screenshots move through a pipeline of stages joined by bounded queues:
+# READ_THREADS threads read files and look them up in the database,
+# READ_BATCH_SIZE files per lookup, then decoding and matching threads take
+# over. The decode and match queues hold at most PIPELINE_QUEUE_SIZE
+# screenshots each, which bounds how far reading runs ahead.
+READ_THREADS = 2
+READ_BATCH_SIZE = 32
+PIPELINE_QUEUE_SIZE = 64
+
+# Planning looks up what the database knows about a directory's files this
+# many names per query, which keeps each query under SQLite's variable limit
+PLAN_LOOKUP_BATCH_SIZE = 500
+
+# How often queue depths are logged while a pipeline runs, in seconds
+PIPELINE_LOG_INTERVAL = 5.0
+
+# Slot embeddings are appended one chunk file per write batch and folded into
+# one file at the end of a run once there are more than this many chunks
+SLOT_EMBEDDING_MAX_CHUNKS = 64
+
+# Re-match jobs pick up screenshots with a card matched below this confidence
+REMATCH_CONFIDENCE = 0.5
+
+# Screenshots dated before this day predate S4T and are skipped
+S4T_CUTOFF = datetime(2025, 10, 28)
+
+# Rarity suffix of a display name, e.g. "Pikachu ex (4D)"
+RARITY_PATTERN = re.compile(r"\(([^)]+)\)")
+
 
 def get_max_thread_count():
     settings = PortableSettings()
@@ -41,6 +83,50 @@ def get_max_thread_count():
     return min(max(1, cpu_count - 1), 8)
 
 
+def get_recognition_backend():
+    """Return the configured recognition backend: "threads" or "processes"."""
+    settings = PortableSettings()
+    backend = settings.get_setting("Debug/recognition_backend", "threads")
+    return backend if backend in ("threads", "processes") else "threads"
+
+
+def get_match_options():
+    """Return the ImageProcessor match options configured in the Debug settings."""
+    settings = PortableSettings()
+    strategy = settings.get_setting("Debug/match_strategy", "sets")
+    precision = settings.get_setting("Debug/template_precision", "float32")
+    decoder = settings.get_setting("Debug/screenshot_decoder", "pil")
+    return {
+        "strategy": strategy if strategy in ("sets", "cascade") else "sets",
+        "top_k": max(1, settings.get_setting("Debug/cascade_top_k", 64)),
+        "shortlist": max(1, settings.get_setting("Debug/cascade_shortlist", 8)),
+        "margin": settings.get_setting("Debug/cascade_margin", 0.1),
+        "precision": (
+            precision if precision in ("float32", "float16", "int8") else "float32"
+        ),
+        "projection_dims": max(0, settings.get_setting("Debug/projection_dims", 0)),
+        "projection_margin": settings.get_setting("Debug/projection_margin", 0.05),
+        "slot_embeddings": settings.get_setting("Debug/slot_embeddings", False),
+        "decoder": decoder if decoder in ("pil", "opencv") else "pil",
+        "pack_priors": settings.get_setting("Debug/pack_priors", False),
+        "set_lock": settings.get_setting("Debug/set_lock", True),
+    }
+
+
+def load_pack_priors():
+    """Return PackPriors learned from the confidently recognized cards in the database."""
+    from app.db.models import ScreenshotCard
+    from app.image_processing import PackPriors
+
+    rows = (
+        ScreenshotCard.objects.filter(confidence__gte=REMATCH_CONFIDENCE)
+        .values_list("position", "card__set", "card__rarity")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    return PackPriors(rows)
+
+
 class WorkerSignals(QObject):
     """Signals available from worker threads"""
 
@@ -481,6 +567,8 @@ class CardArtDownloadWorker(QRunnable):
                     try:
                         filename = f"{set_id}_{card_num}.webp"
                         out_path = os.path.join(dest_root, set_id, filename)
+                        if not os.path.exists(out_path):
+                            new_set_ids.add(set_id)
                         with open(out_path, "wb") as f:
                             f.write(content)
 
@@ -520,6 +608,8 @@ class CardArtDownloadWorker(QRunnable):
                 return images_saved
 
             total_saved = 0
+            # Sets that gained card art they didn't have before
+            new_set_ids = set()
             self._executor = ThreadPoolExecutor(
                 max_workers=self.max_workers,
                 thread_name_prefix=f"ArtDL-{self.task_id or 'pool'}",
@@ -565,9 +655,11 @@ class CardArtDownloadWorker(QRunnable):
                     self.signals.status.emit(
                         "Precomputing pHashes for downloaded cards..."
                     )
-                    from app.image_processing import ImageProcessor
+                    from app.image_processing import get_shared_processor
 
-                    processor = ImageProcessor(dest_root)
+                    # Only the downloaded sets' shards are built; a processor
+                    # that is already loaded picks them up in place
+                    get_shared_processor(dest_root, match_options=get_match_options())
 
                     # Also update image_path for cards that might have been downloaded but not in DB
                     # (though update_or_create above should handle most cases during the download)
@@ -582,6 +674,8 @@ class CardArtDownloadWorker(QRunnable):
             self.signals.result.emit(
                 {
                     "sets": len(set_ids),
+                    "set_ids": list(set_ids),
+                    "new_set_ids": sorted(new_set_ids),
                     "images_saved": total_saved,
                     "destination": "resources/card_imgs",
                 }
@@ -592,6 +686,191 @@ class CardArtDownloadWorker(QRunnable):
             self.signals.finished.emit()
 
 
+class PipelineStage:
+    """
+    One stage of a processing pipeline: a bounded queue and its threads
+
+    Each thread waits for an item, takes whatever else is queued up to
+    batch_size and hands the batch to work(). Producers block in put() while
+    the queue is full, so a slow stage holds back the stages before it rather
+    than letting work pile up in memory. The stage records how long its
+    threads spend in work() and how many items were waiting each time a batch
+    was taken, which shows where a run is bottlenecked. close() finishes the
+    queued items before returning; after cancel() they are dropped instead.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        name: str,
+        work,
+        logger: logging.Logger,
+        workers: int = 1,
+        batch_size: int = 1,
+        maxsize: int = 0,
+        on_error=None,
+    ):
+        self.name = name
+        self._work = work
+        self._on_error = on_error
+        self._batch_size = batch_size
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._closed = False
+        self._cancelled = False
+        self._stats_lock = threading.Lock()
+        self.logger = logger
+        self.items = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+        self._total_depth = 0
+        self._started = time.perf_counter()
+        self._stopped = None
+        self._threads = [
+            threading.Thread(target=self._run, name=f"{name}-{n}", daemon=True)
+            for n in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def put(self, item, label: str = None) -> bool:
+        """Queue one item, waiting while the queue is full"""
+        while not self._closed and not self._cancelled:
+            try:
+                self._queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        if not self._cancelled:
+            self.logger.warning(
+                f"{self.name} stage closed, dropping {label or 'an item'}"
+            )
+        return False
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def cancel(self):
+        """Drop queued and newly put items instead of processing them"""
+        self._cancelled = True
+
+    def close(self):
+        """Process the queued items and stop the stage's threads"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._STOP)
+        for thread in self._threads:
+            thread.join()
+        self._stopped = time.perf_counter()
+
+    def stats(self) -> Dict[str, Any]:
+        """Busy time and queue depth figures for the stage so far"""
+        elapsed = (self._stopped or time.perf_counter()) - self._started
+        with self._stats_lock:
+            return {
+                "threads": len(self._threads),
+                "items": self.items,
+                "batches": self.batches,
+                "busy_seconds": self.busy_seconds,
+                "utilization": (
+                    self.busy_seconds / (elapsed * len(self._threads))
+                    if elapsed > 0
+                    else 0.0
+                ),
+                "queue_avg": self._total_depth / self.batches if self.batches else 0.0,
+                "queue_max": self.max_depth,
+            }
+
+    def _run(self):
+        from django.db import connection
+
+        try:
+            stopping = False
+            while not stopping:
+                # Wait for the first item, then take whatever else is queued
+                batch = []
+                item = self._queue.get()
+                depth = self._queue.qsize() + 1
+                while True:
+                    if item is self._STOP:
+                        stopping = True
+                        # Leave the marker for the stage's other threads
+                        self._queue.put(self._STOP)
+                        break
+                    batch.append(item)
+                    if len(batch) >= self._batch_size:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                if not batch or self._cancelled:
+                    continue
+
+                started = time.perf_counter()
+                try:
+                    self._work(batch)
+                except Exception as e:
+                    self.logger.error(f"Error in {self.name} stage: {e}")
+                    if self._on_error is not None:
+                        self._on_error(batch, e)
+                busy = time.perf_counter() - started
+                with self._stats_lock:
+                    self.items += len(batch)
+                    self.batches += 1
+                    self.busy_seconds += busy
+                    self._total_depth += depth
+                    self.max_depth = max(self.max_depth, depth)
+        finally:
+            # Stages that touch the database open a connection per thread
+            connection.close()
+
+
+class ScreenshotResultWriter(PipelineStage):
+    """
+    Single-writer stage for screenshot recognition results
+
+    Recognition threads put() results on a bounded queue and carry on; one
+    writer thread hands them to store_batch in batches, so SQLite sees one
+    writer and one transaction per batch instead of one per screenshot.
+    close() stores whatever is still queued before returning.
+    """
+
+    def __init__(self, store_batch, logger: logging.Logger, batch_size: int = None):
+        self._store_batch = store_batch
+        self.stored = 0
+        self.transactions = 0
+        super().__init__(
+            "write",
+            self._write,
+            logger,
+            batch_size=batch_size or WRITE_BATCH_SIZE,
+            maxsize=WRITE_QUEUE_SIZE,
+        )
+
+    def put(self, filename: str, cards_found: list, content_hash: str = None):
+        """Queue one screenshot's results, waiting while the queue is full"""
+        return super().put((filename, cards_found, content_hash), label=filename)
+
+    def _write(self, batch: list):
+        try:
+            self.stored += self._store_batch(batch)
+            self.transactions += 1
+        except Exception as e:
+            # Retry one screenshot at a time so one bad record doesn't lose
+            # the rest of the batch
+            self.logger.error(f"Error storing a batch of {len(batch)} results: {e}")
+            for item in batch:
+                filename = item[0]
+                try:
+                    self.stored += self._store_batch([item])
+                    self.transactions += 1
+                except Exception as e:
+                    self.logger.error(f"Error storing results for {filename}: {e}")
+
+
 class ScreenshotProcessingWorker(QRunnable):
     """Worker for processing screenshot images in the background"""
 
@@ -602,8 +881,14 @@ class ScreenshotProcessingWorker(QRunnable):
         self.task_id = task_id
         self.signals = WorkerSignals()
         self._is_cancelled = False
-        self._executor = None
-        self._db_lock = threading.Lock()
+        self._stages = []
+        self._recognizer = None
+        self._writer = None
+        self._template_version = None
+        self._embedding_store = None
+        self._counter_lock = threading.Lock()
+        self._unchanged_files = 0
+        self._reused_files = 0
 
         logger_name = f"{__name__}.{self.__class__.__name__}"
         if self.task_id:
@@ -612,7 +897,7 @@ class ScreenshotProcessingWorker(QRunnable):
 
     def run(self):
         """Process screenshot images in background thread"""
-        from app.db.models import Screenshot
+        from app.db.models import card_identities
 
         try:
             if self._is_cancelled:
@@ -632,117 +917,15 @@ class ScreenshotProcessingWorker(QRunnable):
                     ).replace("%1", self.directory_path)
                 )
 
-            # Get list of image files in batches to identify unprocessed ones first
-            image_extensions = (".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif")
-            image_files = []
-            all_found_count = 0
-            cutoff_date = datetime(2025, 10, 28).date()
-            skipped_files, skipped_total_count = load_skipped_screenshots()
-            newly_skipped = []
-
-            self.signals.status.emit(
-                QCoreApplication.translate(
-                    "ScreenshotProcessingWorker", "Scanning directory for images..."
-                )
-            )
-
-            batch = []
-            batch_size = 1000
-
-            with os.scandir(self.directory_path) as it:
-                for entry in it:
-                    if self._is_cancelled:
-                        return
-                    if entry.is_file() and entry.name.lower().endswith(
-                        image_extensions
-                    ):
-                        all_found_count += 1
-                        if entry.name in skipped_files:
-                            continue
-
-                        file_date = extract_screenshot_date(entry.name)
-                        if file_date and file_date < cutoff_date:
-                            newly_skipped.append(entry.name)
-                            skipped_files.add(entry.name)
-                            continue
-
-                        if self.overwrite:
-                            image_files.append(entry.name)
-                        else:
-                            batch.append(entry.name)
-
-                        if not self.overwrite and len(batch) >= batch_size:
-                            unprocessed_names = Screenshot.objects.filter(
-                                name__in=batch, processed=True
-                            ).values_list("name", flat=True)
-                            unprocessed = [
-                                f for f in batch if f not in unprocessed_names
-                            ]
-                            image_files.extend(unprocessed)
-                            batch = []
-                            self.signals.status.emit(
-                                QCoreApplication.translate(
-                                    "ScreenshotProcessingWorker",
-                                    "Scanned %1 files, found %2 new images...",
-                                )
-                                .replace("%1", str(all_found_count))
-                                .replace("%2", str(len(image_files)))
-                            )
-
-            if not self.overwrite and batch:
-                unprocessed_names = Screenshot.objects.filter(
-                    name__in=batch, processed=True
-                ).values_list("name", flat=True)
-                unprocessed = [f for f in batch if f not in unprocessed_names]
-                image_files.extend(unprocessed)
-
-            if newly_skipped:
-                added_count, skipped_total_count = record_skipped_screenshots(
-                    newly_skipped
-                )
-                if added_count > 0:
-                    self.signals.status.emit(
-                        QCoreApplication.translate(
-                            "ScreenshotProcessingWorker",
-                            "Skipped %1 pre-S4T screenshots (total skipped: %2)",
-                        )
-                        .replace("%1", str(added_count))
-                        .replace("%2", str(skipped_total_count))
-                    )
+            found = self._find_image_files()
+            if found is None:
+                return
+            image_files, all_found_count, newly_skipped, skipped_total_count = found
 
             total_files = len(image_files)
             if total_files == 0:
-                if all_found_count > 0:
-                    self.signals.status.emit(
-                        QCoreApplication.translate(
-                            "ScreenshotProcessingWorker",
-                            "All images already processed.",
-                        )
-                    )
-                    self.signals.progress.emit(100, 100)
-                    self.signals.result.emit(
-                        {
-                            "directory_path": self.directory_path,
-                            "total_files": 0,
-                            "successful_files": 0,
-                            "failed_files": 0,
-                            "overwrite": self.overwrite,
-                            "skipped_files": 0,
-                            "skipped_total": skipped_total_count,
-                            "message": QCoreApplication.translate(
-                                "ScreenshotProcessingWorker",
-                                "All images already processed",
-                            ),
-                        }
-                    )
-                    return
-                else:
-                    raise ValueError(
-                        QCoreApplication.translate(
-                            "ScreenshotProcessingWorker",
-                            "No image files found in directory",
-                        )
-                    )
+                self._finish_without_files(all_found_count, skipped_total_count)
+                return
 
             self.signals.status.emit(
                 QCoreApplication.translate(
@@ -751,12 +934,25 @@ class ScreenshotProcessingWorker(QRunnable):
                 ).replace("%1", str(total_files))
             )
 
-            # Initialize image processor
-            from app.image_processing import ImageProcessor
+            # Initialize image processor (loaded once, shared between runs)
+            from app.image_processing import get_shared_processor
             from settings import BASE_DIR
 
             template_dir = BASE_DIR / "resources" / "card_imgs"
-            processor = ImageProcessor(template_dir)
+            processor = get_shared_processor(
+                template_dir, match_options=get_match_options()
+            )
+            # Stored with each result so unchanged files can be skipped later
+            self._template_version = processor.template_version
+            if processor.match_options["pack_priors"]:
+                processor.pack_priors = load_pack_priors()
+                self.logger.info(f"Pack priors: {processor.pack_priors}")
+            if processor.match_options["slot_embeddings"]:
+                from app.slot_embeddings import SlotEmbeddingStore
+
+                self._embedding_store = SlotEmbeddingStore(
+                    BASE_DIR / "data" / "slot_embeddings"
+                )
 
             # Load card templates from resources
             try:
@@ -789,97 +985,236 @@ class ScreenshotProcessingWorker(QRunnable):
                 )
                 raise
 
-            # Process images in parallel using ThreadPoolExecutor for better performance
-            from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
-
+            # Files flow through pipeline stages, each with its own threads:
+            # reading (with the database lookups), decoding, matching and a
+            # single database writer.
             max_workers = get_max_thread_count()
             processed_count = 0
             successful_files = 0
 
-            self.signals.status.emit(
-                f"Processing images in parallel using {max_workers} threads..."
-            )
+            # Optionally hand decoding and matching off to worker processes;
+            # the threads below then only handle file and database work.
+            recognizer = processor
+            backend = get_recognition_backend()
+            if backend == "processes":
+                from app.image_processing import ProcessPoolRecognizer
+
+                self.signals.status.emit(
+                    QCoreApplication.translate(
+                        "ScreenshotProcessingWorker",
+                        "Starting %1 recognition processes...",
+                    ).replace("%1", str(max_workers))
+                )
+                recognizer = ProcessPoolRecognizer(processor, max_workers)
+                self._recognizer = recognizer
+                self.signals.status.emit(
+                    f"Processing images in parallel using {max_workers} processes..."
+                )
+            else:
+                self.signals.status.emit(
+                    f"Processing images in parallel using {max_workers} threads..."
+                )
+
+            # Stages report finished files here as (files, files with results)
+            finished = queue.SimpleQueue()
+            # Files the current batch of a read or decode thread has passed on
+            handled = threading.local()
 
-            def process_single_file(filename):
-                """Helper function to process a single file in a thread"""
+            def read_files(items):
+                """Read a batch of planned files and look up stored results for them"""
                 # Use a child logger that includes the thread name to distinguish parallel workers
                 logger = self.logger.getChild(threading.current_thread().name)
+                handled.files = set()
 
-                if self._is_cancelled:
-                    return None
-
-                file_path = os.path.join(self.directory_path, filename)
-                try:
+                loaded = {}
+                content_hashes = {}
+                force_sets = {}
+                for filename, file_size, force_set in items:
                     # Check for blank/empty images: files under 1KB should be marked as completed
-                    try:
-                        file_size = os.path.getsize(file_path)
-                    except OSError:
-                        file_size = None
-
-                    if file_size is not None and file_size < 1024:
+                    if file_size < 1024:
                         # Store an entry with zero cards and mark as processed
                         logger.debug(
                             f"Blank image detected ({file_size} bytes) in {filename}. Marking as processed."
                         )
                         # Reuse storage routine with no detected cards
-                        self._store_results_in_database(
-                            filename, [], full_path=file_path, logger=logger
-                        )
+                        self._writer.put(filename, [])
                         # Do not count as "with results" but it's successfully handled
-                        return False
+                        continue
 
-                    # Try to get existing set if any (e.g. from CSV import)
-                    existing_set = (
-                        Screenshot.objects.filter(name=filename)
-                        .values_list("set", flat=True)
-                        .first()
+                    file_path = os.path.join(self.directory_path, filename)
+                    try:
+                        with open(file_path, "rb") as f:
+                            data = f.read()
+                    except OSError as e:
+                        logger.error(f"Error reading {filename}: {e}")
+                        continue
+                    loaded[filename] = data
+                    content_hashes[filename] = screenshot_data_hash(data)
+                    force_sets[filename] = force_set
+
+                # Files already recognized against these templates, under this
+                # name or another, don't need recognizing again
+                successful = 0
+                known_results = (
+                    self._find_known_results(list(loaded), content_hashes, logger)
+                    if loaded
+                    else {}
+                )
+                for filename, (unchanged, cards_found) in known_results.items():
+                    del loaded[filename]
+                    # Copies are stored even without cards, so the next run
+                    # finds them unchanged instead of hashing them again
+                    if not unchanged:
+                        self._writer.put(
+                            filename, cards_found, content_hashes[filename]
+                        )
+                    successful += bool(cards_found)
+
+                for filename, data in loaded.items():
+                    read_target.put(
+                        (
+                            filename,
+                            data,
+                            content_hashes[filename],
+                            force_sets[filename],
+                        ),
+                        label=filename,
                     )
+                    handled.files.add(filename)
+                finished.put((len(items) - len(loaded), successful))
 
-                    # Process the image with OpenCV
-                    cards_found = processor.process_screenshot(
-                        file_path, force_set=existing_set
+            def decode_files(items):
+                """Decode read files into RGB screenshots"""
+                logger = self.logger.getChild(threading.current_thread().name)
+                handled.files = set()
+
+                failed = 0
+                for filename, data, content_hash, force_set in items:
+                    try:
+                        screenshot = processor.decode_screenshot(data)
+                    except Exception as e:
+                        logger.error(f"Error decoding {filename}: {e}")
+                        failed += 1
+                        continue
+                    match_stage.put(
+                        (filename, screenshot, content_hash, force_set),
+                        label=filename,
                     )
+                    handled.files.add(filename)
+                if failed:
+                    finished.put((failed, 0))
 
-                    # Store results in database
+            def match_files(items):
+                """Match a batch of screenshots, all card slots together"""
+                logger = self.logger.getChild(threading.current_thread().name)
+
+                filenames, images, content_hashes, force_sets = map(list, zip(*items))
+                try:
+                    batch_results = match_images(images, force_sets, filenames)
+                except Exception:
+                    # Fall back to one screenshot at a time so a single bad
+                    # file doesn't fail the rest of the batch
+                    batch_results = []
+                    for filename, image, force_set in zip(
+                        filenames, images, force_sets
+                    ):
+                        try:
+                            batch_results.extend(
+                                match_images([image], [force_set], [filename])
+                            )
+                        except Exception as e:
+                            logger.error(f"Error processing {filename}: {e}")
+                            batch_results.append(None)
+
+                successful = 0
+                for filename, content_hash, cards_found in zip(
+                    filenames, content_hashes, batch_results
+                ):
                     if cards_found:
-                        self._store_results_in_database(
-                            filename, cards_found, full_path=file_path, logger=logger
-                        )
-                        return True
-                    else:
+                        # Store results in database (written behind by self._writer)
+                        self._writer.put(filename, cards_found, content_hash)
+                        successful += 1
+                    elif cards_found is not None:
                         logger.info(f"No cards detected in {filename}")
-                        return False
-                except Exception as e:
-                    logger.error(f"Error processing {filename}: {e}")
-                    return False
+                finished.put((len(items), successful))
+
+            def stage_failed(batch, error):
+                # Files the failed batch already passed on are counted
+                # downstream; only the rest failed here
+                passed_on = getattr(handled, "files", set())
+                batch = [item for item in batch if item[0] not in passed_on]
+                if not batch:
+                    self.logger.error(f"Pipeline stage failed: {error}")
+                    return
+                filenames = [item[0] for item in batch]
+                self.signals.status.emit(
+                    QCoreApplication.translate(
+                        "ScreenshotProcessingWorker",
+                        "Critical error processing %1: %2",
+                    )
+                    .replace("%1", ", ".join(filenames))
+                    .replace("%2", str(error))
+                )
+                finished.put((len(batch), 0))
 
-            self._executor = ThreadPoolExecutor(
-                max_workers=max_workers,
-                thread_name_prefix=f"ImgProc-{self.task_id or 'pool'}",
+            # Card ids are resolved from memory while storing results
+            card_identities.preload()
+            self._writer = ScreenshotResultWriter(
+                self._store_results_in_database, self.logger
+            )
+            match_stage = PipelineStage(
+                "match",
+                match_files,
+                self.logger,
+                workers=max_workers,
+                batch_size=RECOGNITION_BATCH_SIZE,
+                maxsize=PIPELINE_QUEUE_SIZE,
+                on_error=stage_failed,
+            )
+            if backend == "processes":
+                # The worker processes decode the files they match, so only
+                # the encoded bytes cross the process boundary
+                decode_stage = None
+                read_target = match_stage
+                match_images = recognizer.match_encoded_screenshots
+            else:
+                decode_stage = PipelineStage(
+                    "decode",
+                    decode_files,
+                    self.logger,
+                    workers=max_workers,
+                    maxsize=PIPELINE_QUEUE_SIZE,
+                    on_error=stage_failed,
+                )
+                read_target = decode_stage
+                match_images = recognizer.match_screenshots
+            # Work items are small, so the reader's own queue is unbounded;
+            # it is held back by the next stage's queue instead
+            read_stage = PipelineStage(
+                "read",
+                read_files,
+                self.logger,
+                workers=READ_THREADS,
+                batch_size=READ_BATCH_SIZE,
+                on_error=stage_failed,
             )
+            self._stages = [
+                stage
+                for stage in (read_stage, decode_stage, match_stage)
+                if stage is not None
+            ]
+            if self._is_cancelled:
+                for stage in self._stages:
+                    stage.cancel()
+
+            processing_started = time.perf_counter()
+            next_log = processing_started + PIPELINE_LOG_INTERVAL
             try:
-                max_in_flight = max(1, max_workers * 4)
-                file_iter = iter(image_files)
-                future_to_file = {}
+                for work_item in image_files:
+                    read_stage.put(work_item, label=work_item[0])
 
-                def submit_next():
-                    try:
-                        next_file = next(file_iter)
-                    except StopIteration:
-                        return False
-                    future_to_file[
-                        self._executor.submit(process_single_file, next_file)
-                    ] = next_file
-                    return True
-
-                while len(future_to_file) < max_in_flight and submit_next():
-                    pass
-
-                # Process results as they complete, keeping a bounded queue
-                while future_to_file:
+                while processed_count < total_files:
                     if self._is_cancelled:
-                        # Attempt to cancel remaining tasks without blocking
-                        self._shutdown_executor(wait=False, cancel_futures=True)
                         self.signals.status.emit(
                             QCoreApplication.translate(
                                 "ScreenshotProcessingWorker",
@@ -888,44 +1223,79 @@ class ScreenshotProcessingWorker(QRunnable):
                         )
                         return
 
-                    done, _ = wait(future_to_file, return_when=FIRST_COMPLETED)
-                    for future in done:
-                        filename = future_to_file.pop(future)
-                        try:
-                            result = future.result()
-                            if result is True:
-                                successful_files += 1
-                        except Exception as e:
-                            self.signals.status.emit(
-                                QCoreApplication.translate(
-                                    "ScreenshotProcessingWorker",
-                                    "Critical error processing %1: %2",
-                                )
-                                .replace("%1", filename)
-                                .replace("%2", str(e))
+                    if time.perf_counter() >= next_log:
+                        next_log += PIPELINE_LOG_INTERVAL
+                        self.logger.debug(
+                            "Queue depths: "
+                            + ", ".join(
+                                f"{stage.name} {stage.depth()}"
+                                for stage in self._stages + [self._writer]
                             )
+                        )
+                    try:
+                        files, successful = finished.get(timeout=0.5)
+                    except queue.Empty:
+                        continue
 
-                        processed_count += 1
+                    successful_files += successful
+                    previous_count = processed_count
+                    processed_count += files
 
-                        # Update progress every 5 files or at the end
-                        if processed_count % 5 == 0 or processed_count == total_files:
-                            self.signals.progress.emit(processed_count, total_files)
-                            self.signals.status.emit(
-                                QCoreApplication.translate(
-                                    "ScreenshotProcessingWorker",
-                                    "Processed %1 of %2 images",
-                                )
-                                .replace("%1", str(processed_count))
-                                .replace("%2", str(total_files))
+                    # Update progress every 5 files or at the end
+                    if (
+                        processed_count // 5 != previous_count // 5
+                        or processed_count == total_files
+                    ):
+                        self.signals.progress.emit(processed_count, total_files)
+                        self.signals.status.emit(
+                            QCoreApplication.translate(
+                                "ScreenshotProcessingWorker",
+                                "Processed %1 of %2 images",
                             )
-
-                        while len(future_to_file) < max_in_flight and submit_next():
-                            pass
+                            .replace("%1", str(processed_count))
+                            .replace("%2", str(total_files))
+                        )
             finally:
-                # Ensure executor threads are cleaned up appropriately
-                self._shutdown_executor(
+                # Stop the stages in pipeline order; cancelled stages drop
+                # their queued work instead of finishing it
+                for stage in self._stages:
+                    stage.close()
+                self._shutdown_recognizer(
                     wait=not self._is_cancelled, cancel_futures=self._is_cancelled
                 )
+                # Write out everything recognized so far, even when cancelled
+                self._writer.close()
+                self.logger.info(
+                    f"Stored {self._writer.stored} screenshots in "
+                    f"{self._writer.transactions} transactions"
+                )
+                pipeline_stats = {
+                    stage.name: stage.stats() for stage in self._stages + [self._writer]
+                }
+                for name, stats in pipeline_stats.items():
+                    self.logger.info(
+                        f"Stage {name}: {stats['threads']} threads, "
+                        f"{stats['items']} items, busy {stats['busy_seconds']:.1f}s "
+                        f"({stats['utilization']:.0%}), queue depth "
+                        f"avg {stats['queue_avg']:.1f} max {stats['queue_max']}"
+                    )
+                if (
+                    self._embedding_store is not None
+                    and self._embedding_store.chunk_count() > SLOT_EMBEDDING_MAX_CHUNKS
+                ):
+                    self._embedding_store.compact()
+                if self._unchanged_files or self._reused_files:
+                    self.logger.info(
+                        f"Skipped recognition for {self._unchanged_files} unchanged "
+                        f"and {self._reused_files} duplicate screenshots"
+                    )
+
+            elapsed = time.perf_counter() - processing_started
+            throughput = total_files / elapsed if elapsed > 0 else 0.0
+            self.logger.info(
+                f"Recognized {total_files} screenshots in {elapsed:.1f}s "
+                f"({throughput:.2f} screenshots/sec with {max_workers} {backend})"
+            )
 
             self.signals.progress.emit(total_files, total_files)
             self.signals.status.emit(
@@ -945,6 +1315,12 @@ class ScreenshotProcessingWorker(QRunnable):
                     "overwrite": self.overwrite,
                     "skipped_files": len(newly_skipped),
                     "skipped_total": skipped_total_count,
+                    "threads": max_workers,
+                    "backend": backend,
+                    "screenshots_per_second": throughput,
+                    "unchanged_files": self._unchanged_files,
+                    "duplicate_files": self._reused_files,
+                    "pipeline": pipeline_stats,
                 }
             )
 
@@ -957,6 +1333,229 @@ class ScreenshotProcessingWorker(QRunnable):
         finally:
             self.signals.finished.emit()
 
+    def _find_image_files(self):
+        """
+        List the image files this run should process
+
+        Returns:
+            tuple: (work_items, all_found_count, newly_skipped, skipped_total_count),
+                or None if the run was cancelled. work_items are as returned
+                by _plan_work.
+        """
+        # Collect the candidate files with one stat each, then plan them all
+        image_extensions = (".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif")
+        files = []
+        all_found_count = 0
+        cutoff_date = S4T_CUTOFF.date()
+        skipped_files, skipped_total_count = load_skipped_screenshots()
+        newly_skipped = []
+
+        self.signals.status.emit(
+            QCoreApplication.translate(
+                "ScreenshotProcessingWorker", "Scanning directory for images..."
+            )
+        )
+
+        with os.scandir(self.directory_path) as it:
+            for entry in it:
+                if self._is_cancelled:
+                    return None
+                if entry.is_file() and entry.name.lower().endswith(image_extensions):
+                    all_found_count += 1
+                    if entry.name in skipped_files:
+                        continue
+
+                    file_date = extract_screenshot_date(entry.name)
+                    if file_date and file_date < cutoff_date:
+                        newly_skipped.append(entry.name)
+                        skipped_files.add(entry.name)
+                        continue
+
+                    stat = entry.stat()
+                    files.append((entry.name, stat.st_size, stat.st_mtime))
+
+        image_files = self._plan_work(files)
+        self.signals.status.emit(
+            QCoreApplication.translate(
+                "ScreenshotProcessingWorker",
+                "Scanned %1 files, found %2 new images...",
+            )
+            .replace("%1", str(all_found_count))
+            .replace("%2", str(len(image_files)))
+        )
+
+        if newly_skipped:
+            added_count, skipped_total_count = record_skipped_screenshots(newly_skipped)
+            if added_count > 0:
+                self.signals.status.emit(
+                    QCoreApplication.translate(
+                        "ScreenshotProcessingWorker",
+                        "Skipped %1 pre-S4T screenshots (total skipped: %2)",
+                    )
+                    .replace("%1", str(added_count))
+                    .replace("%2", str(skipped_total_count))
+                )
+
+        return image_files, all_found_count, newly_skipped, skipped_total_count
+
+    def _plan_work(self, files: list) -> list:
+        """
+        Resolve what to do with each of a directory's files in one pass
+
+        The stored screenshots for the directory's files are looked up by
+        name, PLAN_LOOKUP_BATCH_SIZE names per query. Names are unique across
+        accounts and the files carry no account, so the name alone identifies
+        a file's screenshot. Files already processed are dropped unless
+        overwriting, and the rest get the set stored for them (e.g. from a
+        CSV import) as a hint. A file stored under a differently cased name
+        is still recognized as unchanged by its content hash when read.
+
+        Args:
+            files: (name, size, modification time) tuples
+
+        Returns:
+            list: (name, size, set) work items, newest screenshots first so
+            fresh pulls show up soonest
+        """
+        from app.db.models import Screenshot
+
+        names = [name for name, _, _ in files]
+        stored = {}
+        for start in range(0, len(names), PLAN_LOOKUP_BATCH_SIZE):
+            stored.update(
+                (name, (processed, set_name))
+                for name, processed, set_name in Screenshot.objects.filter(
+                    name__in=names[start : start + PLAN_LOOKUP_BATCH_SIZE]
+                ).values_list("name", "processed", "set")
+            )
+
+        planned = []
+        for name, size, modified in files:
+            processed, set_name = stored.get(name, (False, None))
+            if processed and not self.overwrite:
+                continue
+            planned.append((self._capture_time(name, modified), name, size, set_name))
+        planned.sort(reverse=True)
+        return [(name, size, set_name or None) for _, name, size, set_name in planned]
+
+    @staticmethod
+    def _capture_time(filename: str, modified: float) -> str:
+        """Sortable capture time: the filename's timestamp, else the file's mtime"""
+        # Screenshot names start with YYYYMMDDHHMMSS
+        prefix = filename[:14]
+        if len(prefix) == 14 and prefix.isdigit():
+            return prefix
+        return datetime.fromtimestamp(modified).strftime("%Y%m%d%H%M%S")
+
+    def _finish_without_files(self, all_found_count: int, skipped_total_count: int):
+        """Report a run that found nothing to process"""
+        if all_found_count > 0:
+            self.signals.status.emit(
+                QCoreApplication.translate(
+                    "ScreenshotProcessingWorker",
+                    "All images already processed.",
+                )
+            )
+            self.signals.progress.emit(100, 100)
+            self.signals.result.emit(
+                {
+                    "directory_path": self.directory_path,
+                    "total_files": 0,
+                    "successful_files": 0,
+                    "failed_files": 0,
+                    "overwrite": self.overwrite,
+                    "skipped_files": 0,
+                    "skipped_total": skipped_total_count,
+                    "message": QCoreApplication.translate(
+                        "ScreenshotProcessingWorker",
+                        "All images already processed",
+                    ),
+                }
+            )
+        else:
+            raise ValueError(
+                QCoreApplication.translate(
+                    "ScreenshotProcessingWorker",
+                    "No image files found in directory",
+                )
+            )
+
+    def _find_known_results(
+        self, filenames: list, content_hashes: dict, logger: logging.Logger = None
+    ) -> dict:
+        """
+        Look up stored results for files whose contents were already recognized
+
+        A processed screenshot with the same content hash and template version
+        has the results recognition would produce. When it is the file itself
+        (unchanged since the last run) nothing needs storing; when it is a
+        copy saved under another name its cards, or lack of them, are stored
+        for this file too.
+
+        Returns:
+            dict: filename -> (unchanged, cards_found) for every known file
+        """
+        from app.db.models import Screenshot, ScreenshotCard
+
+        if logger is None:
+            logger = self.logger
+
+        wanted = set(content_hashes.values())
+        if not wanted or not self._template_version:
+            return {}
+
+        # hash -> names stored under it, and one screenshot to take cards from
+        stored_names = {}
+        source_ids = {}
+        for pk, name, content_hash in Screenshot.objects.filter(
+            content_hash__in=wanted,
+            template_version=self._template_version,
+            processed=True,
+        ).values_list("pk", "name", "content_hash"):
+            stored_names.setdefault(content_hash, set()).add((name or "").lower())
+            source_ids.setdefault(content_hash, pk)
+        if not source_ids:
+            return {}
+
+        stored_cards = {pk: [] for pk in source_ids.values()}
+        for screenshot_card in (
+            ScreenshotCard.objects.filter(screenshot_id__in=stored_cards)
+            .select_related("card")
+            .order_by("position")
+        ):
+            card = screenshot_card.card
+            stored_cards[screenshot_card.screenshot_id].append(
+                {
+                    "position": screenshot_card.position,
+                    "card_code": card.code,
+                    "card_name": (
+                        f"{card.name} ({card.rarity})" if card.rarity else card.name
+                    ),
+                    "card_set": card.set,
+                    "confidence": screenshot_card.confidence,
+                }
+            )
+
+        known = {}
+        unchanged = reused = 0
+        for filename in filenames:
+            content_hash = content_hashes.get(filename)
+            if content_hash not in source_ids:
+                continue
+            cards_found = stored_cards[source_ids[content_hash]]
+            if filename.lower() in stored_names[content_hash]:
+                known[filename] = (True, cards_found)
+                unchanged += 1
+            else:
+                logger.debug(f"{filename} is a copy of a processed screenshot")
+                known[filename] = (False, cards_found)
+                reused += 1
+
+        with self._counter_lock:
+            self._unchanged_files += unchanged
+            self._reused_files += reused
+        return known
+
     def _extract_pack_type(self, filename: str) -> str:
         """
         Extract the pack name from the filename.
@@ -1016,145 +1615,323 @@ class ScreenshotProcessingWorker(QRunnable):
             return "Unknown"
 
     def _store_results_in_database(
-        self,
-        filename: str,
-        cards_found: list,
-        full_path: str = None,
-        logger: logging.Logger = None,
-    ):
-        """Store processing results in the database"""
+        self, results: list, logger: logging.Logger = None, card_cache=None
+    ) -> int:
+        """
+        Store a batch of processing results in the database in one transaction
+
+        Args:
+            results: (filename, cards_found, content_hash) tuples. An empty
+                cards_found marks the screenshot as processed with no cards.
+            card_cache: CardIdentityCache to resolve cards with (defaults to
+                the process-wide one)
+
+        Returns:
+            int: Number of screenshots written
+        """
         from app.db.models import (
             Screenshot,
-            Card,
             ScreenshotCard,
             CardSet,
             translate_set_name,
+            card_identities,
         )
 
         if logger is None:
             logger = self.logger
+        if card_cache is None:
+            card_cache = card_identities
+
+        # Keyed case-insensitively; the last result for a file wins
+        pending = {
+            filename.lower(): (filename, cards, content_hash)
+            for filename, cards, content_hash in results
+        }
+
+        with transaction.atomic():
+            # Check which screenshots already exist (might have been created by CSVImportWorker)
+            # We compare lowercased names to handle potential case-sensitivity issues between CSV and filesystem
+            existing_screenshots = {}
+            for screenshot_obj in (
+                Screenshot.objects.annotate(lower_name=Lower("name"))
+                .filter(lower_name__in=list(pending))
+                .order_by("pk")
+            ):
+                existing_screenshots.setdefault(
+                    screenshot_obj.name.lower(), screenshot_obj
+                )
 
-        with self._db_lock:
-            # Identify set from cards found
-            pack_type = self._identify_set(cards_found, logger=logger)
-
-            # Fallback to filename if set is unknown
-            if pack_type == "Unknown":
-                pack_type = self._extract_pack_type(filename)
-
-            try:
-                with transaction.atomic():
-                    # Check if screenshot already exists (might have been created by CSVImportWorker)
-                    # We use iexact to handle potential case-sensitivity issues between CSV and filesystem
-                    screenshot_obj = Screenshot.objects.filter(
-                        name__iexact=filename
-                    ).first()
-                    created = False
-
-                    if not screenshot_obj:
-                        screenshot_obj = Screenshot.objects.create(
-                            name=filename,
-                            timestamp=datetime.now().isoformat(),
-                            set=(
-                                CardSet(translate_set_name(pack_type))
-                                if translate_set_name(pack_type)
-                                else None
-                            ),
-                        )
-                        created = True
-
-                    if not created and not self.overwrite and screenshot_obj.processed:
-                        self.signals.status.emit(
-                            f"Skipping {filename}: Already processed in database"
-                        )
-                        return
+            to_create = []
+            to_update = []
+            to_store = []
+            for key, (filename, cards_found, content_hash) in pending.items():
+                screenshot_obj = existing_screenshots.get(key)
+                if screenshot_obj is None:
+                    # Identify set from cards found
+                    pack_type = self._identify_set(cards_found, logger=logger)
+
+                    # Fallback to filename if set is unknown
+                    if pack_type == "Unknown":
+                        pack_type = self._extract_pack_type(filename)
+
+                    screenshot_obj = Screenshot(
+                        name=filename,
+                        timestamp=datetime.now().isoformat(),
+                        set=(
+                            CardSet(translate_set_name(pack_type))
+                            if translate_set_name(pack_type)
+                            else None
+                        ),
+                        processed=True,
+                        content_hash=content_hash,
+                        template_version=self._template_version,
+                    )
+                    to_create.append(screenshot_obj)
+                elif not self.overwrite and screenshot_obj.processed:
+                    self.signals.status.emit(
+                        f"Skipping {filename}: Already processed in database"
+                    )
+                    continue
+                else:
+                    # Mark screenshot as processed
+                    screenshot_obj.processed = True
+                    screenshot_obj.content_hash = content_hash
+                    screenshot_obj.template_version = self._template_version
+                    to_update.append(screenshot_obj)
+                to_store.append((screenshot_obj, cards_found))
+
+            # If we are here, we are either newly processing or overwriting.
+            # Clear existing cards to ensure we only have the latest detection results.
+            if to_update:
+                ScreenshotCard.objects.filter(screenshot__in=to_update).delete()
+                Screenshot.objects.bulk_update(
+                    to_update, ["processed", "content_hash", "template_version"]
+                )
+            if to_create:
+                Screenshot.objects.bulk_create(to_create)
+
+            # Work out every card the batch refers to
+            wanted_cards = {}
+            detections = []
+            for screenshot_obj, cards_found in to_store:
+                for card_data in cards_found:
+                    # Extract card code if available
+                    card_code = card_data.get("card_code", "")
+                    card_name = card_data.get("card_name", "Unknown")
+                    card_set = card_data.get("card_set", "Unknown")
+                    card_key = (card_code, card_set)
+                    detections.append((screenshot_obj, card_key, card_data))
+
+                    # Log the card detection
+                    logger.debug(
+                        f"Stored card {card_name} ({card_set}) with confidence {card_data.get('confidence', 0.0):.2f}"
+                    )
 
-                    # If we are here, we are either newly processing or overwriting.
-                    # Clear existing cards to ensure we only have the latest detection results.
-                    ScreenshotCard.objects.filter(screenshot=screenshot_obj).delete()
-
-                    # Add each card to database and create relationships
-                    screenshot_cards = []
-                    for card_data in cards_found:
-                        # Extract card code if available
-                        card_code = card_data.get("card_code", "")
-                        card_name = card_data.get("card_name", "Unknown")
-                        card_set = card_data.get("card_set", "Unknown")
-
-                        # Try to extract card number from code for better image path
-                        if card_code and "_" in card_code:
-                            set_code, card_number = card_code.split("_", 1)
-                            # Use the card number for the image path
-                            image_path = f"{set_code}/{card_code}.webp"
-                        else:
-                            # Fallback to name-based path
-                            image_path = f"{card_set}/{card_name}.webp"
-
-                        # Extract rarity from name if possible
-                        rarity = "1D"
-                        if "(" in card_name:
-                            import re
-
-                            match = re.search(r"\(([^)]+)\)", card_name)
-                            if match:
-                                rarity = match.group(1)
-
-                        # Add card (if not already exists)
-                        # Note: Card table has unique_together = (("code", "set"),)
-                        card_obj, created = Card.objects.get_or_create(
-                            code=card_code,
-                            set=card_set,
-                            defaults={
-                                "name": card_name,
-                                "image_path": image_path,
-                                "rarity": rarity,
-                            },
-                        )
+                    if card_key in wanted_cards:
+                        continue
 
-                        # If card already exists but has default rarity, update it
-                        if not created and card_obj.rarity == "1D" and rarity != "1D":
-                            card_obj.rarity = rarity
-                            card_obj.save()
-
-                        # Add relationship between screenshot and card
-                        screenshot_cards.append(
-                            ScreenshotCard(
-                                screenshot=screenshot_obj,
-                                card=card_obj,
-                                position=card_data.get("position", 1),
-                                confidence=card_data.get("confidence", 0.0),
-                            )
-                        )
+                    # Try to extract card number from code for better image path
+                    if card_code and "_" in card_code:
+                        set_code, card_number = card_code.split("_", 1)
+                        # Use the card number for the image path
+                        image_path = f"{set_code}/{card_code}.webp"
+                    else:
+                        # Fallback to name-based path
+                        image_path = f"{card_set}/{card_name}.webp"
+
+                    # Extract rarity from name if possible
+                    rarity = "1D"
+                    if "(" in card_name:
+                        match = RARITY_PATTERN.search(card_name)
+                        if match:
+                            rarity = match.group(1)
+
+                    wanted_cards[card_key] = {
+                        # bulk_create skips Card.save(), which strips the
+                        # rarity suffix from the name
+                        "name": card_name.split("(")[0].strip(),
+                        "image_path": image_path,
+                        "rarity": rarity,
+                    }
 
-                        # Log the card detection
-                        logger.debug(
-                            f"Stored card {card_name} ({card_set}) with confidence {card_data.get('confidence', 0.0):.2f}"
-                        )
+            # Add cards (if not already existing) and upgrade default rarities
+            # Note: Card table has unique_together = (("code", "set"),)
+            card_ids = card_cache.ensure(wanted_cards) if wanted_cards else {}
+
+            # Add relationships between screenshots and cards
+            ScreenshotCard.objects.bulk_create(
+                [
+                    ScreenshotCard(
+                        screenshot=screenshot_obj,
+                        card_id=card_ids[card_key],
+                        position=card_data.get("position", 1),
+                        confidence=card_data.get("confidence", 0.0),
+                    )
+                    for screenshot_obj, card_key, card_data in detections
+                ]
+            )
 
-                    ScreenshotCard.objects.bulk_create(screenshot_cards)
-                    # Mark screenshot as processed
-                    screenshot_obj.processed = True
-                    screenshot_obj.save()
+        # Keep the features the slots were matched with, once the rows are in
+        if self._embedding_store is not None:
+            self._embedding_store.append(
+                [
+                    (
+                        screenshot_obj.name,
+                        card_data["position"],
+                        card_data["phash"],
+                        card_data["embedding"],
+                        card_data["embedding_scale"],
+                    )
+                    for screenshot_obj, _, card_data in detections
+                    if "embedding" in card_data
+                ],
+                # Slots from earlier results, matched or not now, are stale
+                replaced=[screenshot_obj.name for screenshot_obj, _ in to_store],
+            )
 
-            except Exception as e:
-                logger.error(f"Error storing results for {filename}: {e}")
-                raise
+        return len(to_store)
 
     def cancel(self):
         """Cancel the worker"""
         self._is_cancelled = True
-        self._shutdown_executor(wait=False, cancel_futures=True)
-
-    def _shutdown_executor(self, wait: bool = True, cancel_futures: bool = False):
-        """Shut down the internal executor safely"""
-        executor = getattr(self, "_executor", None)
-        if executor:
+        # The stages drop their queued work; run() shuts them down
+        for stage in self._stages:
+            stage.cancel()
+
+    def _shutdown_recognizer(self, wait: bool = True, cancel_futures: bool = False):
+        """Shut down the recognition processes, if any, safely"""
+        recognizer = getattr(self, "_recognizer", None)
+        if recognizer:
             try:
-                executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+                recognizer.shutdown(wait=wait, cancel_futures=cancel_futures)
             except Exception:
                 pass
             finally:
-                self._executor = None
+                self._recognizer = None
+
+
+class ScreenshotRematchWorker(ScreenshotProcessingWorker):
+    """
+    Worker for re-recognizing only the screenshots a template update may change
+
+    Screenshots are selected in the database instead of scanning the
+    directory: those recognized against an older template pack that have a
+    card matched below max_confidence or (with missing_cards) a slot with no
+    match, i.e. fewer cards than their pack holds. Given sets, only the screenshots of those sets
+    among them are selected, or all of those sets' screenshots when there
+    are no other criteria. With no criteria every screenshot recognized
+    against an older pack is selected. They are then processed as an
+    overwrite run.
+    """
+
+    def __init__(
+        self,
+        directory_path: str,
+        sets: List[str] = None,
+        max_confidence: float = None,
+        missing_cards: bool = False,
+        task_id: str = None,
+    ):
+        super().__init__(directory_path, overwrite=True, task_id=task_id)
+        self.sets = sets
+        self.max_confidence = max_confidence
+        self.missing_cards = missing_cards
+
+    def _find_image_files(self):
+        """Select the screenshots to re-match from the database"""
+        from app.image_processing import get_shared_processor
+        from settings import BASE_DIR
+
+        self.signals.status.emit(
+            QCoreApplication.translate(
+                "ScreenshotRematchWorker", "Selecting screenshots to re-match..."
+            )
+        )
+
+        # Shared with the processing that follows, so this loads it only once
+        processor = get_shared_processor(
+            BASE_DIR / "resources" / "card_imgs", match_options=get_match_options()
+        )
+        names = self._select_screenshots(processor.template_version)
+        if self._is_cancelled:
+            return None
+
+        files = []
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(self.directory_path, name))
+            except OSError:
+                continue
+            files.append((name, stat.st_size, stat.st_mtime))
+        if len(files) < len(names):
+            self.logger.info(
+                f"{len(names) - len(files)} screenshots selected for "
+                f"re-matching are no longer in {self.directory_path}"
+            )
+        _, skipped_total_count = load_skipped_screenshots()
+        return self._plan_work(files), len(names), [], skipped_total_count
+
+    def _select_screenshots(self, template_version: str) -> List[str]:
+        """Names of the processed screenshots matching the re-match criteria"""
+        from app.db.models import Screenshot
+
+        # Results from the current templates would come out the same
+        candidates = Screenshot.objects.filter(processed=True).exclude(
+            template_version=template_version
+        )
+
+        criteria = Q()
+        if self.max_confidence is not None:
+            criteria |= Q(screenshotcard__confidence__lt=self.max_confidence)
+        if self.missing_cards:
+            # Positions run from 1 across the pack's slots, so a pack holds
+            # at least as many cards as its last matched position: 6 when
+            # the sixth slot matched, else 5, or 4 for Deluxe packs (A4b).
+            # Fewer cards than that means some slot has no match.
+            criteria |= Q(
+                pk__in=candidates.annotate(
+                    card_count=Count("screenshotcard"),
+                    pack_size=Greatest(
+                        Coalesce(Max("screenshotcard__position"), 0),
+                        Case(When(set="A4b", then=Value(4)), default=Value(5)),
+                    ),
+                )
+                .filter(card_count__lt=F("pack_size"))
+                .values("pk")
+            )
+        if self.sets:
+            # Narrows the criteria above rather than adding to them
+            criteria &= Q(set__in=self.sets) | Q(
+                screenshotcard__card__set__in=self.sets
+            )
+
+        return list(
+            candidates.filter(criteria)
+            .distinct()
+            .order_by("name")
+            .values_list("name", flat=True)
+        )
+
+    def _finish_without_files(self, all_found_count: int, skipped_total_count: int):
+        """Report a re-match that found nothing to re-match"""
+        message = QCoreApplication.translate(
+            "ScreenshotRematchWorker", "No screenshots need re-matching"
+        )
+        self.signals.status.emit(message)
+        self.signals.progress.emit(100, 100)
+        self.signals.result.emit(
+            {
+                "directory_path": self.directory_path,
+                "total_files": 0,
+                "successful_files": 0,
+                "failed_files": 0,
+                "overwrite": self.overwrite,
+                "skipped_files": 0,
+                "skipped_total": skipped_total_count,
+                "selected_files": all_found_count,
+                "message": message,
+            }
+        )
 
 
 class DatabaseBackupWorker(QRunnable):
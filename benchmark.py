@@ -0,0 +1,778 @@
+"""
+Recognition benchmarks
+
+Standalone measurements for the screenshot recognition pipeline. Run from the
+repository root, e.g.:
+
+    uv run python benchmark.py throughput D:\\ptcgp\\Screenshots --threads 1,2,4,8,16
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Turn off bytecode generation
+sys.dont_write_bytecode = True
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+
+import django
+
+django.setup()
+
+from settings import BASE_DIR
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif")
+
+
+def list_screenshots(directory: str, limit: int = 0) -> list:
+    files = sorted(
+        os.path.join(directory, f)
+        for f in os.listdir(directory)
+        if f.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    return files[:limit] if limit else files
+
+
+def load_processor(template_dir: str):
+    from app.image_processing import ImageProcessor
+
+    started = time.perf_counter()
+    processor = ImageProcessor(template_dir)
+    print(
+        f"Loaded {processor.get_template_count()} templates "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+    return processor
+
+
+def throughput(args):
+    """Screenshots/sec for each requested thread count"""
+    processor = load_processor(args.templates)
+    files = list_screenshots(args.screenshots, args.limit)
+    if not files:
+        print(f"No screenshots found in {args.screenshots}")
+        return
+
+    # Warm up BLAS and the decoders so the first run isn't penalized
+    processor.process_screenshot(files[0])
+
+    print(f"{args.backend:>9} {'seconds':>9} {'shots/sec':>10} {'speedup':>8}")
+    baseline = None
+    for threads in [int(t) for t in args.threads.split(",")]:
+        recognizer = processor
+        if args.backend == "processes":
+            from app.image_processing import ProcessPoolRecognizer
+
+            recognizer = ProcessPoolRecognizer(processor, threads)
+            # Pay the process start-up cost outside the timed section
+            list(map(recognizer.process_screenshot, files[:threads]))
+
+        batches = [
+            files[i : i + args.batch_size]
+            for i in range(0, len(files), args.batch_size)
+        ]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(recognizer.process_screenshots, batches))
+        elapsed = time.perf_counter() - started
+        if recognizer is not processor:
+            recognizer.shutdown()
+        rate = len(files) / elapsed
+        baseline = baseline or rate
+        print(f"{threads:>9} {elapsed:>9.2f} {rate:>10.2f} {rate / baseline:>7.2f}x")
+
+
+def load_ground_truth(screenshot: str) -> dict:
+    """
+    Card codes by position from a screenshot's .json sidecar (written by
+    generate_screenshots.py) or .md description (see examples/)
+    """
+    json_path = os.path.splitext(screenshot)[0] + ".json"
+    if os.path.exists(json_path):
+        with open(json_path, encoding="utf-8") as f:
+            return {card["position"]: card["code"] for card in json.load(f)["cards"]}
+    md_path = os.path.splitext(screenshot)[0] + ".md"
+    if not os.path.exists(md_path):
+        return None
+    codes = []
+    with open(md_path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith(("Top row IDs:", "Bottom row IDs:")):
+                codes.extend(c.strip() for c in line.split(":", 1)[1].split(","))
+    return {position: code for position, code in enumerate(codes, 1)}
+
+
+def load_labelled(directory: str, limit: int = 0) -> list:
+    """(screenshot, ground truth) pairs for the screenshots that have a .md"""
+    labelled = []
+    for path in list_screenshots(directory, limit):
+        truth = load_ground_truth(path)
+        if truth:
+            labelled.append((path, truth))
+    if not labelled:
+        print(f"No screenshots with .md ground truth found in {directory}")
+    return labelled
+
+
+def score_labelled(processor, labelled: list, repeat: int = 1) -> dict:
+    """Accuracy, throughput and per-slot confidences of a processor"""
+    # Warm up BLAS and the decoders so the first run isn't penalized
+    processor.process_screenshot(labelled[0][0])
+
+    correct = total = 0
+    confidences = {}
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for path, truth in labelled:
+            found = {}
+            for r in processor.process_screenshot(path):
+                found[r["position"]] = r["card_code"]
+                confidences[(path, r["position"])] = r["confidence"]
+            correct += sum(found.get(pos) == code for pos, code in truth.items())
+            total += len(truth)
+    return {
+        "correct": correct,
+        "total": total,
+        "rate": len(labelled) * repeat / (time.perf_counter() - started),
+        "confidences": confidences,
+    }
+
+
+def strategies(args):
+    """Accuracy and speed of the detailed-search strategies on labelled screenshots"""
+    from app.image_processing import ImageProcessor
+
+    labelled = load_labelled(args.screenshots, args.limit)
+    if not labelled:
+        return
+
+    options = {"top_k": args.top_k, "shortlist": args.shortlist, "margin": args.margin}
+    print(f"{'strategy':>9} {'correct':>9} {'accuracy':>9} {'shots/sec':>10}")
+    for strategy in ("sets", "cascade"):
+        processor = ImageProcessor(
+            args.templates, match_options=dict(options, strategy=strategy)
+        )
+        result = score_labelled(processor, labelled, args.repeat)
+        correct, total = result["correct"], result["total"]
+        print(
+            f"{strategy:>9} {f'{correct}/{total}':>9} "
+            f"{correct / total:>9.1%} {result['rate']:>10.2f}"
+        )
+
+
+def precision(args):
+    """Template memory and accuracy of each matrix precision on labelled screenshots"""
+    from app.image_processing import ImageProcessor
+
+    labelled = load_labelled(args.screenshots, args.limit)
+    if not labelled:
+        return
+
+    print(
+        f"{'precision':>9} {'matrix MB':>10} {'correct':>9} {'accuracy':>9} "
+        f"{'max conf diff':>14} {'shots/sec':>10}"
+    )
+    reference = None
+    for mode in ("float32", "float16", "int8"):
+        processor = ImageProcessor(args.templates, match_options={"precision": mode})
+        index = processor._index
+        if index["quantized_vectors"] is not None:
+            matrix_bytes = (
+                index["quantized_vectors"].nbytes + index["quantized_scales"].nbytes
+            )
+        else:
+            matrix_bytes = index["vectors"].nbytes
+
+        result = score_labelled(processor, labelled, args.repeat)
+        reference = reference or result["confidences"]
+        diff = max(
+            (
+                abs(confidence - reference[slot])
+                for slot, confidence in result["confidences"].items()
+                if slot in reference
+            ),
+            default=0.0,
+        )
+        correct, total = result["correct"], result["total"]
+        print(
+            f"{mode:>9} {matrix_bytes / 1024 ** 2:>10.1f} "
+            f"{f'{correct}/{total}':>9} {correct / total:>9.1%} "
+            f"{diff:>14.6f} {result['rate']:>10.2f}"
+        )
+
+
+def projection(args):
+    """Accuracy and speed of PCA-projected matching on labelled screenshots"""
+    from app.image_processing import ImageProcessor
+
+    labelled = load_labelled(args.screenshots, args.limit)
+    if not labelled:
+        return
+
+    print(f"{'dims':>6} {'load s':>7} {'correct':>9} {'accuracy':>9} {'shots/sec':>10}")
+    for dims in [int(d) for d in args.dims.split(",")]:
+        started = time.perf_counter()
+        processor = ImageProcessor(
+            args.templates,
+            match_options={"projection_dims": dims, "projection_margin": args.margin},
+        )
+        load_time = time.perf_counter() - started
+        result = score_labelled(processor, labelled, args.repeat)
+        correct, total = result["correct"], result["total"]
+        print(
+            f"{dims or 'off':>6} {load_time:>7.2f} {f'{correct}/{total}':>9} "
+            f"{correct / total:>9.1%} {result['rate']:>10.2f}"
+        )
+
+
+def rescore(args):
+    """Re-score stored slot embeddings against re-recognizing the screenshots"""
+    from app.image_processing import ImageProcessor
+    from app.slot_embeddings import SlotEmbeddingStore
+
+    labelled = load_labelled(args.screenshots, args.limit)
+    if not labelled:
+        return
+    processor = ImageProcessor(args.templates, match_options={"slot_embeddings": True})
+
+    started = time.perf_counter()
+    records = []
+    decoded_correct = total = 0
+    for path, truth in labelled:
+        name = os.path.basename(path)
+        found = processor.process_screenshot(path)
+        for r in found:
+            records.append(
+                (
+                    name,
+                    r["position"],
+                    r["phash"],
+                    r["embedding"],
+                    r["embedding_scale"],
+                )
+            )
+        codes = {r["position"]: r["card_code"] for r in found}
+        decoded_correct += sum(codes.get(p) == c for p, c in truth.items())
+        total += len(truth)
+    decode_time = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as directory:
+        embedding_store = SlotEmbeddingStore(directory)
+        # About one chunk per write batch of 200 screenshots
+        for start in range(0, len(records), 1000):
+            embedding_store.append(records[start : start + 1000])
+        size = sum(
+            os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory)
+        )
+
+        started = time.perf_counter()
+        slots = embedding_store.load()
+        load_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    matches = processor.match_slot_embeddings(
+        slots["phashes"], slots["vectors"], slots["scales"]
+    )
+    match_time = time.perf_counter() - started
+
+    truth_by_name = {os.path.basename(path): truth for path, truth in labelled}
+    rescored_correct = sum(
+        match is not None
+        and match["card_name"] == truth_by_name[name].get(int(position))
+        for name, position, match in zip(slots["names"], slots["positions"], matches)
+    )
+    print(
+        f"{len(slots['names'])} slots, {size / max(len(records), 1):.0f} bytes/slot "
+        f"on disk"
+    )
+    print(
+        f"decode+recognize {decode_time:.2f}s " f"({decoded_correct}/{total} correct)"
+    )
+    print(
+        f"load+re-score    {load_time + match_time:.2f}s "
+        f"(load {load_time:.3f}s, {rescored_correct}/{total} correct)"
+    )
+
+
+def store_legacy(worker, results):
+    """Per-screenshot, per-card storage as it was before the batched writer"""
+    from django.db import transaction
+
+    from app.db.models import Card, Screenshot, ScreenshotCard
+
+    for filename, cards_found, _ in results:
+        with transaction.atomic():
+            screenshot = Screenshot.objects.filter(name__iexact=filename).first()
+            if not screenshot:
+                screenshot = Screenshot.objects.create(name=filename)
+            ScreenshotCard.objects.filter(screenshot=screenshot).delete()
+            rows = []
+            for card_data in cards_found:
+                card_name = card_data["card_name"]
+                match = re.search(r"\(([^)]+)\)", card_name)
+                rarity = match.group(1) if match else "1D"
+                card, created = Card.objects.get_or_create(
+                    code=card_data["card_code"],
+                    set=card_data["card_set"],
+                    defaults={"name": card_name, "rarity": rarity},
+                )
+                if not created and card.rarity == "1D" and rarity != "1D":
+                    card.rarity = rarity
+                    card.save()
+                rows.append(
+                    ScreenshotCard(
+                        screenshot=screenshot,
+                        card=card,
+                        position=card_data["position"],
+                        confidence=card_data["confidence"],
+                    )
+                )
+            ScreenshotCard.objects.bulk_create(rows)
+            screenshot.processed = True
+            screenshot.save()
+    return len(results)
+
+
+def store(args):
+    """ScreenshotCard rows/sec stored for a synthetic run, per storage mode"""
+    import random
+
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connections
+
+    from app.db.models import CardIdentityCache, card_identities
+    from app.workers import WRITE_BATCH_SIZE, ScreenshotProcessingWorker
+
+    # Never touch the application database
+    settings.DATABASES["default"]["NAME"] = args.database
+
+    rng = random.Random(0)
+    rarities = ["1D", "2D", "3D", "4D", "1S"]
+    catalogue = [
+        {
+            "card_code": f"{card_set}_{number}",
+            "card_set": card_set,
+            "card_name": f"Card {number} ({rng.choice(rarities)})",
+        }
+        for card_set in ("A1", "A2", "A3", "A4", "B1", "B2")
+        for number in range(1, args.cards // 6 + 1)
+    ]
+    results = [
+        (
+            f"20251206{n:08d}_1_Tradeable_1_packs.png",
+            [
+                dict(card, position=position, confidence=0.9)
+                for position, card in enumerate(rng.sample(catalogue, 5), 1)
+            ],
+            f"{n:032x}",
+        )
+        for n in range(args.screenshots)
+    ]
+    worker = ScreenshotProcessingWorker("", overwrite=True)
+    worker.logger.setLevel("WARNING")
+
+    modes = {
+        "legacy": lambda batch: store_legacy(worker, batch),
+        # One card lookup per batch, as without the process-wide cache
+        "batched": lambda batch: worker._store_results_in_database(
+            batch, card_cache=CardIdentityCache()
+        ),
+        "cached": lambda batch: worker._store_results_in_database(batch),
+    }
+
+    print(f"{'mode':>8} {'seconds':>9} {'rows/sec':>10}")
+    for mode in args.modes.split(","):
+        connections.close_all()
+        if os.path.exists(args.database):
+            os.remove(args.database)
+        call_command("migrate", verbosity=0)
+        card_identities.preload()
+
+        started = time.perf_counter()
+        for start in range(0, len(results), WRITE_BATCH_SIZE):
+            modes[mode](results[start : start + WRITE_BATCH_SIZE])
+        elapsed = time.perf_counter() - started
+        rows = sum(len(cards) for _, cards, _ in results)
+        print(f"{mode:>8} {elapsed:>9.2f} {rows / elapsed:>10.0f}")
+
+    connections.close_all()
+    os.remove(args.database)
+
+
+def phash(args):
+    """Check the batched pHash against imagehash and phashes.json on the card art"""
+    import json
+
+    import imagehash
+    from PIL import Image
+
+    from app.image_processing import ImageProcessor, phash_batch
+
+    processor = ImageProcessor.__new__(ImageProcessor)
+    processor.card_imgs_dir = args.templates
+    entries = processor._scan_card_files()[: args.limit or None]
+    hash_file = os.path.join(args.templates, "phashes.json")
+    stored = {}
+    if os.path.exists(hash_file):
+        with open(hash_file, encoding="utf-8") as f:
+            stored = json.load(f)
+
+    mismatches = stale = 0
+    reference_time = batch_time = 0.0
+    for start in range(0, len(entries), args.batch_size):
+        batch = entries[start : start + args.batch_size]
+        images = [
+            processor._load_and_preprocess_card(
+                os.path.join(args.templates, entry["set"], entry["file"])
+            )
+            for entry in batch
+        ]
+
+        started = time.perf_counter()
+        expected = [str(imagehash.phash(Image.fromarray(image))) for image in images]
+        reference_time += time.perf_counter() - started
+
+        started = time.perf_counter()
+        actual = [f"{int(value):016x}" for value in phash_batch(images)]
+        batch_time += time.perf_counter() - started
+
+        for entry, want, got in zip(batch, expected, actual):
+            if want != got:
+                mismatches += 1
+                print(f"MISMATCH {entry['set']}/{entry['file']}: {want} != {got}")
+            known = stored.get(entry["set"], {}).get(entry["card"])
+            if known is not None and known != got:
+                stale += 1
+                print(f"phashes.json differs for {entry['set']}/{entry['card']}")
+
+    count = max(len(entries), 1)
+    print(
+        f"{len(entries)} cards, {mismatches} mismatches against imagehash, "
+        f"{stale} against phashes.json"
+    )
+    print(
+        f"imagehash {reference_time / count * 1000:.3f}ms/card, "
+        f"batched {batch_time / count * 1000:.3f}ms/card"
+    )
+    if mismatches:
+        sys.exit(1)
+
+
+def decode(args):
+    """Compare the PIL and OpenCV screenshot decoders, with the slot probes"""
+    import numpy as np
+
+    from app.image_processing import (
+        DEFAULT_MATCH_OPTIONS,
+        SCREENSHOT_DECODERS,
+        ImageProcessor,
+    )
+
+    files = list_screenshots(args.screenshots, args.limit)
+    if not files:
+        print(f"No screenshots found in {args.screenshots}")
+        return
+    contents = []
+    for file_path in files:
+        with open(file_path, "rb") as f:
+            contents.append(f.read())
+
+    decoded = {}
+    for decoder in SCREENSHOT_DECODERS:
+        processor = ImageProcessor.__new__(ImageProcessor)
+        processor.match_options = dict(DEFAULT_MATCH_OPTIONS, decoder=decoder)
+
+        decode_time = probe_time = 0.0
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            screenshots = [processor.decode_screenshot(data) for data in contents]
+            decode_time += time.perf_counter() - started
+
+            # Layout detection and empty-slot checks
+            started = time.perf_counter()
+            layouts = [
+                [slot["box"] for slot in processor._extract_card_slots(screenshot)]
+                for screenshot in screenshots
+            ]
+            probe_time += time.perf_counter() - started
+        decoded[decoder] = (screenshots, layouts)
+
+        count = len(files) * args.repeat
+        print(
+            f"{decoder:>7}: decode {decode_time / count * 1000:.3f}ms/screenshot, "
+            f"probes {probe_time / count * 1000:.3f}ms/screenshot"
+        )
+
+    reference_screenshots, reference_layouts = decoded[SCREENSHOT_DECODERS[0]]
+    for decoder in SCREENSHOT_DECODERS[1:]:
+        screenshots, layouts = decoded[decoder]
+        max_difference = max(
+            (
+                int(np.abs(a.astype(np.int16) - b).max()) if a.shape == b.shape else 255
+                for a, b in zip(reference_screenshots, screenshots)
+            ),
+            default=0,
+        )
+        layout_changes = sum(a != b for a, b in zip(reference_layouts, layouts))
+        print(
+            f"{decoder} vs {SCREENSHOT_DECODERS[0]}: max pixel difference "
+            f"{max_difference}, {layout_changes} screenshots with a different layout"
+        )
+
+
+def priors(args):
+    """Templates scored per slot and accuracy with and without pack priors"""
+    from app.image_processing import ImageProcessor, PackPriors
+
+    labelled = load_labelled(args.screenshots, args.limit)
+    if not labelled:
+        return
+
+    processor = ImageProcessor(args.templates, match_options={"pack_priors": True})
+    if args.from_db:
+        from app.workers import load_pack_priors
+
+        pack_priors = load_pack_priors()
+    else:
+        # As if the labelled screenshots had been processed before
+        card_sets = {card: s for s, card in processor.phash_metadata}
+        counts = {}
+        for _, truth in labelled:
+            for position, code in truth.items():
+                if code in card_sets:
+                    key = (
+                        position,
+                        card_sets[code],
+                        processor._card_rarity(code, card_sets[code]),
+                    )
+                    counts[key] = counts.get(key, 0) + 1
+        pack_priors = PackPriors(
+            (position, s, rarity, count)
+            for (position, s, rarity), count in counts.items()
+        )
+    print(f"Priors: {pack_priors}")
+
+    print(
+        f"{'priors':>7} {'templates/slot':>15} {'correct':>9} {'accuracy':>9} "
+        f"{'shots/sec':>10}"
+    )
+    for label, slot_priors in (("off", None), ("on", pack_priors)):
+        processor.pack_priors = slot_priors
+        processor.search_stats = {"slots": 0, "templates": 0}
+        result = score_labelled(processor, labelled, args.repeat)
+        stats = processor.search_stats
+        correct, total = result["correct"], result["total"]
+        print(
+            f"{label:>7} {stats['templates'] / max(stats['slots'], 1):>15.1f} "
+            f"{f'{correct}/{total}':>9} {correct / total:>9.1%} "
+            f"{result['rate']:>10.2f}"
+        )
+
+
+def hide_best_set(processor, share: float, seed: int = 0):
+    """
+    Drop the best pHash set from a share of the slots' candidate sets
+
+    As if pHash had missed the screenshot's set for those slots, so the set
+    lock searches a set that is not among their candidates.
+    """
+    import random
+
+    rng = random.Random(seed)
+    candidate_sets = processor._candidate_sets
+
+    def hidden_candidate_sets(set_scores, force_set=None):
+        found = candidate_sets(set_scores, force_set)
+        if not force_set and len(found) > 1 and rng.random() < share:
+            return found[1:]
+        return found
+
+    processor._candidate_sets = hidden_candidate_sets
+
+
+def set_lock(args):
+    """Templates scored per slot and accuracy with and without the screenshot set lock"""
+    from app.image_processing import ImageProcessor
+
+    labelled = load_labelled(args.screenshots, args.limit)
+    if not labelled:
+        return
+
+    print(
+        f"{'strategy':>9} {'lock':>5} {'templates/slot':>15} {'correct':>9} "
+        f"{'accuracy':>9} {'shots/sec':>10}"
+    )
+    # The last case hides the screenshot's set from some slots' pHash
+    # candidates; the cascade shortlists are template rows, so it only
+    # applies to the "sets" strategy
+    cases = [("sets", 0.0), ("cascade", 0.0)]
+    if args.hidden_share > 0:
+        cases.append(("sets", args.hidden_share))
+    for strategy, hidden_share in cases:
+        for lock in (False, True):
+            processor = ImageProcessor(
+                args.templates, match_options={"strategy": strategy, "set_lock": lock}
+            )
+            label = strategy
+            if hidden_share:
+                hide_best_set(processor, hidden_share)
+                label = f"{strategy}*"
+            result = score_labelled(processor, labelled, args.repeat)
+            stats = processor.search_stats
+            correct, total = result["correct"], result["total"]
+            print(
+                f"{label:>9} {'on' if lock else 'off':>5} "
+                f"{stats['templates'] / max(stats['slots'], 1):>15.1f} "
+                f"{f'{correct}/{total}':>9} {correct / total:>9.1%} "
+                f"{result['rate']:>10.2f}"
+            )
+    if args.hidden_share > 0:
+        print(
+            f"* best pHash set hidden from {args.hidden_share:.0%} of the slots' "
+            "candidates"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--templates",
+        default=str(BASE_DIR / "resources" / "card_imgs"),
+        help="Card art directory (default: resources/card_imgs)",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p = subparsers.add_parser("throughput", help=throughput.__doc__)
+    p.add_argument("screenshots", help="Directory of S4T screenshots")
+    p.add_argument("--threads", default="1,2,4,8,16")
+    p.add_argument("--limit", type=int, default=0, help="Use at most N screenshots")
+    p.add_argument("--backend", choices=("threads", "processes"), default="threads")
+    p.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Screenshots per recognition call (default: 1)",
+    )
+    p.set_defaults(func=throughput)
+
+    p = subparsers.add_parser("strategies", help=strategies.__doc__)
+    p.add_argument(
+        "screenshots",
+        nargs="?",
+        default=str(BASE_DIR / "examples"),
+        help="Directory of screenshots with .md ground truth (default: examples)",
+    )
+    p.add_argument("--limit", type=int, default=0, help="Use at most N screenshots")
+    p.add_argument("--repeat", type=int, default=1, help="Passes over the screenshots")
+    p.add_argument("--top-k", type=int, default=64)
+    p.add_argument("--shortlist", type=int, default=8)
+    p.add_argument("--margin", type=float, default=0.1)
+    p.set_defaults(func=strategies)
+
+    p = subparsers.add_parser("precision", help=precision.__doc__)
+    p.add_argument(
+        "screenshots",
+        nargs="?",
+        default=str(BASE_DIR / "examples"),
+        help="Directory of screenshots with .md ground truth (default: examples)",
+    )
+    p.add_argument("--limit", type=int, default=0, help="Use at most N screenshots")
+    p.add_argument("--repeat", type=int, default=1, help="Passes over the screenshots")
+    p.set_defaults(func=precision)
+
+    p = subparsers.add_parser("projection", help=projection.__doc__)
+    p.add_argument(
+        "screenshots",
+        nargs="?",
+        default=str(BASE_DIR / "examples"),
+        help="Directory of screenshots with .md ground truth (default: examples)",
+    )
+    p.add_argument("--limit", type=int, default=0, help="Use at most N screenshots")
+    p.add_argument("--repeat", type=int, default=1, help="Passes over the screenshots")
+    p.add_argument("--dims", default="0,64,128,256")
+    p.add_argument("--margin", type=float, default=0.05)
+    p.set_defaults(func=projection)
+
+    p = subparsers.add_parser("rescore", help=rescore.__doc__)
+    p.add_argument(
+        "screenshots",
+        nargs="?",
+        default=str(BASE_DIR / "examples"),
+        help="Directory of screenshots with .md ground truth (default: examples)",
+    )
+    p.add_argument("--limit", type=int, default=0, help="Use at most N screenshots")
+    p.set_defaults(func=rescore)
+
+    p = subparsers.add_parser("store", help=store.__doc__)
+    p.add_argument("--screenshots", type=int, default=100000)
+    p.add_argument("--cards", type=int, default=3000, help="Distinct cards")
+    p.add_argument("--modes", default="legacy,batched,cached")
+    p.add_argument(
+        "--database",
+        default=os.path.join(tempfile.gettempdir(), "ptcgpb_store_benchmark.sqlite3"),
+        help="Scratch SQLite file (deleted afterwards)",
+    )
+    p.set_defaults(func=store)
+
+    p = subparsers.add_parser("decode", help=decode.__doc__)
+    p.add_argument(
+        "screenshots",
+        nargs="?",
+        default=str(BASE_DIR / "examples"),
+        help="Directory of S4T screenshots (default: examples)",
+    )
+    p.add_argument("--limit", type=int, default=0, help="Use at most N screenshots")
+    p.add_argument("--repeat", type=int, default=5, help="Passes over the screenshots")
+    p.set_defaults(func=decode)
+
+    p = subparsers.add_parser("priors", help=priors.__doc__)
+    p.add_argument(
+        "screenshots",
+        nargs="?",
+        default=str(BASE_DIR / "examples"),
+        help="Directory of screenshots with .md ground truth (default: examples)",
+    )
+    p.add_argument("--limit", type=int, default=0, help="Use at most N screenshots")
+    p.add_argument("--repeat", type=int, default=1, help="Passes over the screenshots")
+    p.add_argument(
+        "--from-db",
+        action="store_true",
+        help="Learn the priors from the database instead of the ground truth",
+    )
+    p.set_defaults(func=priors)
+
+    p = subparsers.add_parser("set-lock", help=set_lock.__doc__)
+    p.add_argument(
+        "screenshots",
+        nargs="?",
+        default=str(BASE_DIR / "examples"),
+        help="Directory of screenshots with .md ground truth (default: examples)",
+    )
+    p.add_argument("--limit", type=int, default=0, help="Use at most N screenshots")
+    p.add_argument("--repeat", type=int, default=1, help="Passes over the screenshots")
+    p.add_argument(
+        "--hidden-share",
+        type=float,
+        default=0.3,
+        help="Share of slots whose best pHash set is hidden in the last case "
+        "(0 to skip it)",
+    )
+    p.set_defaults(func=set_lock)
+
+    p = subparsers.add_parser("phash", help=phash.__doc__)
+    p.add_argument("--limit", type=int, default=0, help="Check at most N cards")
+    p.add_argument("--batch-size", type=int, default=64)
+    p.set_defaults(func=phash)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Synthetic S4T screenshots
+
+Composes card art from resources/card_imgs into the S4T pack layouts, with a
+JSON ground-truth sidecar per screenshot, for benchmarking and regression
+testing recognition at scale. The same seed always produces the same corpus,
+whatever the number of workers. Run from the repository root, e.g.:
+
+    uv run python generate_screenshots.py D:\\ptcgp\\Synthetic --count 100000 --seed 1
+"""
+
+import argparse
+import functools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+# Turn off bytecode generation
+sys.dont_write_bytecode = True
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+
+import django
+
+django.setup()
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from app.image_processing import (
+    CARD_IMAGE_EXTENSIONS,
+    PROMO_SET_PREFIX,
+    RARITY_PATTERN,
+    screenshot_layout,
+)
+from app.workers import S4T_CUTOFF
+from settings import BASE_DIR
+
+# Colours of the S4T capture: page background (#e7f0f7), an empty card slot
+# (#bdcee2) and the card count badges
+BACKGROUND = (0xE7, 0xF0, 0xF7)
+EMPTY_SLOT = (0xBD, 0xCE, 0xE2)
+BADGE = (0x4A, 0x5A, 0x6E)
+
+# Cards per pack: 4-card packs are Deluxe Pack Ex (A4b), laid out 2 + 2;
+# other packs hold 5 (3 + 2) or 6 (3 + 3) cards
+PACK_SIZES = {4: 0.1, 5: 0.8, 6: 0.1}
+ROWS = {4: (2, 2), 5: (3, 2), 6: (3, 3)}
+DELUXE_SET = "A4b"
+
+# Rarity odds per slot position, roughly those of real packs. Positions whose
+# rarities have no art in a set draw from the whole set.
+SLOT_RARITIES = {
+    1: {"1D": 1.0},
+    2: {"1D": 1.0},
+    3: {"1D": 1.0},
+    4: {"2D": 0.8, "3D": 0.2},
+    5: {"3D": 0.5, "4D": 0.3, "1S": 0.12, "2S": 0.08},
+    6: {"4D": 0.5, "1S": 0.3, "2S": 0.15, "CR": 0.05},
+}
+
+# Screenshot timestamps count up one second per image from this time, by
+# default the first day the processing worker accepts
+FIRST_CAPTURE = S4T_CUTOFF
+
+# Per-process generation options, set by the pool initializer
+_options = None
+
+
+def load_library(template_dir: str) -> dict:
+    """{set: {rarity: [(card code, art path), ...]}} for every card with art"""
+    from app import names
+
+    library = {}
+    for set_name in sorted(os.listdir(template_dir)):
+        set_path = os.path.join(template_dir, set_name)
+        if set_name.startswith(".") or not os.path.isdir(set_path):
+            continue
+        for file_name in sorted(os.listdir(set_path)):
+            if not file_name.lower().endswith(CARD_IMAGE_EXTENSIONS):
+                continue
+            code = os.path.splitext(file_name)[0]
+            match = RARITY_PATTERN.search(names.cards.get(code, ""))
+            rarity = match.group(1) if match else "1D"
+            library.setdefault(set_name, {}).setdefault(rarity, []).append(
+                (code, os.path.join(set_path, file_name))
+            )
+    return library
+
+
+@functools.lru_cache(maxsize=4096)
+def load_art(path: str, width: int, height: int) -> Image.Image:
+    with Image.open(path) as art:
+        return art.convert("RGB").resize((width, height), Image.LANCZOS)
+
+
+def pick_card(rng, cards_by_rarity: dict, position: int) -> tuple:
+    odds = {
+        rarity: odds
+        for rarity, odds in SLOT_RARITIES[position].items()
+        if rarity in cards_by_rarity
+    }
+    if odds:
+        rarities = list(odds)
+        weights = np.array([odds[r] for r in rarities])
+        cards = cards_by_rarity[
+            rarities[rng.choice(len(rarities), p=weights / weights.sum())]
+        ]
+    else:
+        cards = [
+            card
+            for rarity in sorted(cards_by_rarity)
+            for card in cards_by_rarity[rarity]
+        ]
+    return cards[rng.integers(len(cards))]
+
+
+def _init_generator_process(options: dict):
+    global _options
+    _options = options
+
+
+def generate_screenshot(index: int, options: dict = None) -> str:
+    """Render screenshot number index of the corpus and write it with its sidecar"""
+    options = options or _options
+    library = options["library"]
+    # Every screenshot has its own generator, so images don't depend on the
+    # order or the worker they were rendered in
+    rng = np.random.default_rng([options["seed"], index])
+
+    pack_sizes = [n for n in PACK_SIZES if n != 4 or DELUXE_SET in library]
+    weights = np.array([PACK_SIZES[n] for n in pack_sizes])
+    card_count = pack_sizes[rng.choice(len(pack_sizes), p=weights / weights.sum())]
+    if card_count == 4:
+        set_name = DELUXE_SET
+    else:
+        pack_sets = options["pack_sets"]
+        set_name = pack_sets[rng.integers(len(pack_sets))]
+
+    scale = options["scales"][rng.integers(len(options["scales"]))]
+    width, height = int(round(240 * scale)), int(round(227 * scale))
+    layout = screenshot_layout(width, height)
+    top_cards, bottom_cards = ROWS[card_count]
+    boxes = list(layout["top"][top_cards]) + list(layout["bottom"][bottom_cards])
+
+    image = Image.new("RGB", (width, height), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    cards = []
+    empty = []
+    for position, (x, y, w, h) in enumerate(boxes, 1):
+        if rng.random() < options["empty"]:
+            draw.rectangle([x, y, x + w - 1, y + h - 1], fill=EMPTY_SLOT)
+            empty.append(position)
+            continue
+        code, art_path = pick_card(rng, library[set_name], position)
+        image.paste(load_art(art_path, w, h), (x, y))
+        # Count badge over the card's bottom left corner
+        badge = max(int(round(11 * scale)), 1)
+        bx, by = x + int(round(2 * scale)), y + h - badge - int(round(scale))
+        draw.rectangle([bx, by, bx + badge - 1, by + badge - 1], fill=BADGE)
+        cards.append(
+            {"position": position, "code": code, "set": set_name, "box": [x, y, w, h]}
+        )
+
+    if options["noise"] > 0:
+        pixels = np.asarray(image, dtype=np.float32)
+        pixels += options["noise"] * rng.standard_normal(pixels.shape, np.float32)
+        image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+    captured = options["first_capture"] + timedelta(seconds=index)
+    name = (
+        f"{captured:%Y%m%d%H%M%S}_{int(rng.integers(1, 100))}_Tradeable_"
+        f"{int(rng.integers(1, 40))}_packs"
+    )
+    if rng.random() < options["jpeg"]:
+        low, high = options["jpeg_quality"]
+        quality = int(rng.integers(low, high + 1))
+        file_name = name + ".jpg"
+        image.save(os.path.join(options["output"], file_name), quality=quality)
+    else:
+        quality = None
+        file_name = name + ".png"
+        # Noise barely compresses; the fastest level keeps PNG writes cheap
+        image.save(os.path.join(options["output"], file_name), compress_level=1)
+
+    truth = {
+        "seed": options["seed"],
+        "index": index,
+        "file": file_name,
+        "width": width,
+        "height": height,
+        "quality": quality,
+        "set": set_name,
+        "rows": [top_cards, bottom_cards],
+        "cards": cards,
+        "empty": empty,
+    }
+    with open(os.path.join(options["output"], name + ".json"), "w") as f:
+        json.dump(truth, f)
+    return file_name
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("output", help="Directory to write the screenshots to")
+    parser.add_argument(
+        "--templates",
+        default=str(BASE_DIR / "resources" / "card_imgs"),
+        help="Card art directory (default: resources/card_imgs)",
+    )
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--start", type=int, default=0, help="Index of the first screenshot"
+    )
+    parser.add_argument(
+        "--scales",
+        default="1,1.5,2,3",
+        help="Sizes relative to the 240x227 capture of a 540x960 emulator",
+    )
+    parser.add_argument(
+        "--empty", type=float, default=0.03, help="Share of empty card slots"
+    )
+    parser.add_argument(
+        "--noise", type=float, default=2.0, help="Pixel noise standard deviation"
+    )
+    parser.add_argument(
+        "--jpeg", type=float, default=0.25, help="Share of screenshots saved as JPEG"
+    )
+    parser.add_argument("--jpeg-quality", default="70,95", help="JPEG quality range")
+    parser.add_argument(
+        "--first-capture",
+        type=datetime.fromisoformat,
+        default=FIRST_CAPTURE,
+        help=f"Timestamp of screenshot 0 (default: {FIRST_CAPTURE:%Y-%m-%d})",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    library = load_library(args.templates)
+    pack_sets = [
+        s for s in library if s != DELUXE_SET and not s.startswith(PROMO_SET_PREFIX)
+    ]
+    if not pack_sets:
+        print(f"No card art found in {args.templates}")
+        return
+    if args.first_capture < S4T_CUTOFF:
+        parser.error(
+            f"--first-capture must not be before {S4T_CUTOFF:%Y-%m-%d}; "
+            "earlier screenshots are skipped as pre-S4T"
+        )
+    os.makedirs(args.output, exist_ok=True)
+
+    options = {
+        "library": library,
+        "pack_sets": pack_sets,
+        "output": args.output,
+        "seed": args.seed,
+        "first_capture": args.first_capture,
+        "scales": [float(s) for s in args.scales.split(",")],
+        "empty": args.empty,
+        "noise": args.noise,
+        "jpeg": args.jpeg,
+        "jpeg_quality": tuple(int(q) for q in args.jpeg_quality.split(",")),
+    }
+    indices = range(args.start, args.start + args.count)
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_init_generator_process,
+        initargs=(options,),
+    ) as executor:
+        for done, _ in enumerate(
+            executor.map(generate_screenshot, indices, chunksize=64), 1
+        ):
+            if done % 1000 == 0 or done == len(indices):
+                print(f"{done}/{len(indices)} screenshots")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ It initializes the application, checks dependencies, and starts the main window.
 """
 
 import ctypes
+import multiprocessing
 import sys
 import os
 import logging
@@ -230,4 +231,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Required for the process-based recognition backend in frozen builds
+    multiprocessing.freeze_support()
     main()